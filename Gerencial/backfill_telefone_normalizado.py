@@ -0,0 +1,63 @@
+# backfill_telefone_normalizado.py
+# Uso (na raiz do projeto): python -m Gerencial.backfill_telefone_normalizado
+import os
+import pymongo
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+from database.indices import aplicar_indices
+from database.normalizacao import campos_telefone
+
+TAMANHO_LOTE = 1000
+
+
+def backfill_telefone_normalizado():
+    print("Iniciando preenchimento de telefone_normalizado nos clientes existentes...")
+    load_dotenv()
+    connection_string = os.getenv('MONGO_URI')
+    if not connection_string: print("ERRO: MONGO_URI não encontrada."); return
+
+    client = None
+    try:
+        client = pymongo.MongoClient(connection_string)
+        db = client ['bot_vendas']
+        collection_clientes = db ['clientes']
+        client.admin.command('ping')
+        print("✅ Conectado ao MongoDB.")
+
+        aplicar_indices(db)
+
+        # Só pega quem ainda não foi preenchido, então pode ser interrompido e rodado de novo.
+        filtro = {"telefone_normalizado": {"$exists": False}}
+        total_pendente = collection_clientes.count_documents(filtro)
+        print(f"Clientes sem telefone normalizado: {total_pendente}")
+
+        ultimo_id = None
+        total_atualizado = 0
+        while True:
+            filtro_lote = dict(filtro)
+            if ultimo_id is not None:
+                filtro_lote["_id"] = {"$gt": ultimo_id}
+            lote = list(collection_clientes.find(filtro_lote, {"telefone": 1}).sort("_id", 1).limit(TAMANHO_LOTE))
+            if not lote:
+                break
+
+            operacoes = [UpdateOne({"_id": doc['_id']}, {"$set": campos_telefone(doc.get('telefone'))}) for doc in lote]
+            result = collection_clientes.bulk_write(operacoes, ordered=False)
+            total_atualizado += result.modified_count
+            ultimo_id = lote[-1]['_id']
+            print(f"  ... {total_atualizado}/{total_pendente} clientes atualizados")
+
+        print("\n--- Preenchimento Finalizado ---")
+        print(f"Total de clientes atualizados: {total_atualizado}")
+
+    except Exception as e:
+        print(f"❌ Ocorreu um erro durante o processo: {e}")
+    finally:
+        if client:
+            client.close()
+            print("Conexão com MongoDB fechada.")
+
+
+if __name__ == "__main__":
+    backfill_telefone_normalizado()
@@ -0,0 +1,306 @@
+# importar_base.py
+# Importa uma nova base de leads (CSV ou XLSX) para `clientes` e cria o registro em `bases`.
+# Uso (na raiz do projeto):
+#   python -m Gerencial.importar_base planilha.xlsx --nome-base "Base Março"
+#   python -m Gerencial.importar_base leads.csv --nome-base "Base Março" --lote 5000 --inativa
+#
+# O arquivo é lido em streaming (csv.DictReader / openpyxl read_only) e gravado em lotes com
+# insert_many desordenado, então o uso de memória não cresce com o tamanho da planilha.
+# Se o processo cair, rode o mesmo comando de novo: o progresso fica em `importacoes` e cada
+# linha tem um _id determinístico, então o lote interrompido é regravado sem duplicar.
+# A base só aparece em `bases` (e, portanto, no /proximo) quando a importação termina.
+#
+# CPF e telefone já existentes em outras bases (ou repetidos dentro do próprio arquivo) não são
+# importados: vão para <arquivo>.rejeitados.csv com o motivo. A checagem é feita em memória,
+# contra um conjunto de hashes carregado uma vez do banco, sem consulta por linha.
+import os
+import csv
+import sys
+import struct
+import hashlib
+import argparse
+from itertools import islice
+from datetime import datetime, UTC
+import pymongo
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+from database.indices import aplicar_indices
+from database.normalizacao import campos_telefone, normalizar_cpf, telefone_nacional
+from database.deduplicacao import ConjuntoHashes, chaves_cliente
+from database.contadores import COLECAO_CONTADORES, chave_base, contador_base_zerado
+
+TAMANHO_LOTE = 5000
+COLECAO_IMPORTACOES = 'importacoes'
+ERRO_CHAVE_DUPLICADA = 11000
+LOTE_CARGA_CHAVES = 500_000
+COLUNAS_REJEITADOS = ["linha", "motivo", "nome_cliente", "cpf", "telefone"]
+
+# Cabeçalhos aceitos (minúsculos) -> campo em `clientes`.
+APELIDOS_COLUNAS = {
+    "nome": "nome_cliente", "nome_cliente": "nome_cliente", "cliente": "nome_cliente",
+    "telefone": "telefone", "fone": "telefone", "celular": "telefone", "whatsapp": "telefone",
+    "cpf": "cpf",
+}
+
+
+def ler_linhas(caminho: str):
+    """Gera um dict por linha (chaves = cabeçalho em minúsculas), sem carregar o arquivo inteiro."""
+    if caminho.lower().endswith(('.xlsx', '.xlsm')):
+        from openpyxl import load_workbook
+        workbook = load_workbook(caminho, read_only=True, data_only=True)
+        try:
+            linhas = workbook.active.iter_rows(values_only=True)
+            cabecalho = [str(c).strip().lower() if c is not None else "" for c in next(linhas, [])]
+            for valores in linhas:
+                yield dict(zip(cabecalho, valores))
+        finally:
+            workbook.close()
+    else:
+        with open(caminho, newline='', encoding='utf-8-sig') as f:
+            dialeto = csv.Sniffer().sniff(f.readline(), delimiters=',;\t|')
+            f.seek(0)
+            leitor = csv.reader(f, dialeto)
+            cabecalho = [c.strip().lower() for c in next(leitor, [])]
+            for valores in leitor:
+                yield dict(zip(cabecalho, valores))
+
+
+def total_linhas(caminho: str):
+    """Total de linhas de dados, quando dá para saber sem ler o arquivo (XLSX); senão None."""
+    if caminho.lower().endswith(('.xlsx', '.xlsm')):
+        from openpyxl import load_workbook
+        workbook = load_workbook(caminho, read_only=True)
+        try:
+            max_row = workbook.active.max_row
+            return max_row - 1 if max_row else None
+        finally:
+            workbook.close()
+    return None
+
+
+def montar_cliente(linha: dict, nome_base: str):
+    """Documento de `clientes` a partir de uma linha, ou None se não tiver telefone utilizável."""
+    doc = {}
+    for coluna, valor in linha.items():
+        if not coluna or valor is None or valor == "":
+            continue
+        doc[APELIDOS_COLUNAS.get(coluna, coluna)] = valor.strip() if isinstance(valor, str) else valor
+
+    telefone = telefone_nacional(doc.get('telefone'))
+    if len(telefone) < 8:
+        return None
+    doc['telefone'] = telefone
+    doc.update(campos_telefone(telefone))
+    if 'cpf' in doc:
+        doc['cpf'] = normalizar_cpf(doc['cpf'])
+    if 'nome_cliente' in doc:
+        doc['nome_cliente'] = str(doc['nome_cliente'])
+    doc['status'] = "Pendente"
+    doc['nome_base'] = nome_base
+    return doc
+
+
+def id_linha(importacao: dict, numero_linha: int) -> ObjectId:
+    """_id determinístico: instante do início da importação + hash do nome da base + número da linha."""
+    return ObjectId(struct.pack(">I", importacao['timestamp']) + bytes.fromhex(importacao['prefixo'])
+                    + struct.pack(">I", numero_linha))
+
+
+def numero_linha_do_id(cliente_id) -> int:
+    return struct.unpack(">I", cliente_id.binary[8:12])[0]
+
+
+def carregar_chaves_existentes(collection_clientes, importacao: dict):
+    """
+    Lê CPF/telefone de todos os clientes (só esses campos) e separa os hashes em:
+    - no_banco: clientes de outras bases;
+    - no_arquivo: linhas desta importação já gravadas antes de uma queda (até o checkpoint).
+    """
+    no_banco, no_arquivo = ConjuntoHashes(), ConjuntoHashes()
+    nome_base = importacao['_id']
+    acumulado = []
+    cursor = collection_clientes.find({}, {"cpf": 1, "telefone": 1, "nome_base": 1}).batch_size(10_000)
+    for doc in tqdm(cursor, unit=" clientes", desc="Carregando CPFs/telefones existentes"):
+        chaves = chaves_cliente(doc.get('cpf'), doc.get('telefone'))
+        if doc.get('nome_base') == nome_base:
+            if numero_linha_do_id(doc['_id']) <= importacao['linhas_lidas']:
+                no_arquivo.adicionar_varios(chaves)
+            continue
+        acumulado.extend(chaves)
+        if len(acumulado) >= LOTE_CARGA_CHAVES:
+            no_banco.adicionar_varios(acumulado)
+            acumulado = []
+    no_banco.adicionar_varios(acumulado)
+    return no_banco, no_arquivo
+
+
+def classificar(chaves: list, no_banco: ConjuntoHashes, no_arquivo: ConjuntoHashes) -> str:
+    """'novo', 'duplicado_no_banco' ou 'duplicado_no_arquivo'; linhas novas entram em `no_arquivo`."""
+    if any(chave in no_banco for chave in chaves):
+        return "duplicado_no_banco"
+    if any(chave in no_arquivo for chave in chaves):
+        return "duplicado_no_arquivo"
+    for chave in chaves:
+        no_arquivo.adicionar(chave)
+    return "novo"
+
+
+def inserir_lote(collection_clientes, documentos: list) -> int:
+    """insert_many desordenado; linhas já gravadas antes de uma queda (chave duplicada) são ignoradas."""
+    if not documentos:
+        return 0
+    try:
+        return len(collection_clientes.insert_many(documentos, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        outros_erros = [erro for erro in e.details.get('writeErrors', []) if erro.get('code') != ERRO_CHAVE_DUPLICADA]
+        if outros_erros:
+            raise
+        return e.details.get('nInserted', 0)
+
+
+def importar_base(caminho: str, nome_base: str, tamanho_lote: int = TAMANHO_LOTE, ativa: bool = True) -> int:
+    print(f"Iniciando importação de '{caminho}' como base '{nome_base}'...")
+    load_dotenv()
+    connection_string = os.getenv('MONGO_URI')
+    if not connection_string: print("ERRO: MONGO_URI não encontrada."); return 1
+    if not os.path.exists(caminho): print(f"ERRO: arquivo '{caminho}' não encontrado."); return 1
+
+    client = None
+    try:
+        client = pymongo.MongoClient(connection_string)
+        db = client ['bot_vendas']
+        collection_clientes = db ['clientes']
+        collection_bases = db ['bases']
+        collection_importacoes = db [COLECAO_IMPORTACOES]
+        client.admin.command('ping')
+        print("✅ Conectado ao MongoDB.")
+
+        if collection_bases.find_one({"nome_base": nome_base}):
+            print(f"❌ Já existe uma base com o nome '{nome_base}'. Operação cancelada.")
+            return 1
+
+        aplicar_indices(db)
+
+        importacao = collection_importacoes.find_one({"_id": nome_base})
+        if importacao is not None and importacao['status'] == "concluida":
+            # A base foi importada e depois removida de `bases`: começa uma importação nova.
+            collection_importacoes.delete_one({"_id": nome_base})
+            importacao = None
+        if importacao is None:
+            importacao = {
+                "_id": nome_base,
+                "arquivo": os.path.basename(caminho),
+                "timestamp": int(datetime.now(UTC).timestamp()),
+                "prefixo": hashlib.md5(nome_base.encode()).hexdigest()[:8],
+                "linhas_lidas": 0,
+                "inseridos": 0,
+                "invalidas": 0,
+                "duplicado_no_banco": 0,
+                "duplicado_no_arquivo": 0,
+                "status": "em_andamento",
+            }
+            collection_importacoes.insert_one(importacao)
+        elif importacao['arquivo'] != os.path.basename(caminho):
+            print(f"❌ Há uma importação pendente de '{importacao['arquivo']}' para essa base. Use o mesmo arquivo.")
+            return 1
+        else:
+            print(f"Retomando a partir da linha {importacao['linhas_lidas']} "
+                  f"({importacao['inseridos']} clientes já gravados).")
+
+        linhas_lidas = importacao['linhas_lidas']
+        inseridos = importacao['inseridos']
+        invalidas = importacao['invalidas']
+        duplicados = {motivo: importacao[motivo] for motivo in ("duplicado_no_banco", "duplicado_no_arquivo")}
+
+        no_banco, no_arquivo = carregar_chaves_existentes(collection_clientes, importacao)
+        print(f"Chaves de CPF/telefone em outras bases: {len(no_banco)}")
+
+        caminho_rejeitados = f"{caminho}.rejeitados.csv"
+        arquivo_rejeitados = open(caminho_rejeitados, 'a' if linhas_lidas else 'w', newline='', encoding='utf-8')
+        rejeitados = csv.DictWriter(arquivo_rejeitados, fieldnames=COLUNAS_REJEITADOS, extrasaction='ignore')
+        if not linhas_lidas:
+            rejeitados.writeheader()
+
+        linhas = islice(ler_linhas(caminho), linhas_lidas, None)
+        progresso = tqdm(total=total_linhas(caminho), initial=linhas_lidas, unit=" linhas", desc="Importando")
+        try:
+            while True:
+                documentos, rejeitados_no_lote = [], []
+                lidas_no_lote = 0
+                for linha in islice(linhas, tamanho_lote):
+                    lidas_no_lote += 1
+                    doc = montar_cliente(linha, nome_base)
+                    if doc is None:
+                        invalidas += 1
+                        continue
+                    numero_linha = linhas_lidas + lidas_no_lote
+                    motivo = classificar(chaves_cliente(doc.get('cpf'), doc['telefone']), no_banco, no_arquivo)
+                    if motivo != "novo":
+                        duplicados[motivo] += 1
+                        rejeitados_no_lote.append({**doc, "linha": numero_linha, "motivo": motivo})
+                        continue
+                    doc['_id'] = id_linha(importacao, numero_linha)
+                    documentos.append(doc)
+                if not lidas_no_lote:
+                    break
+
+                inseridos += inserir_lote(collection_clientes, documentos)
+                linhas_lidas += lidas_no_lote
+                rejeitados.writerows(rejeitados_no_lote)
+                arquivo_rejeitados.flush()
+                collection_importacoes.update_one({"_id": nome_base}, {"$set": {
+                    "linhas_lidas": linhas_lidas, "inseridos": inseridos, "invalidas": invalidas, **duplicados,
+                }})
+                progresso.update(lidas_no_lote)
+        finally:
+            progresso.close()
+            arquivo_rejeitados.close()
+
+        total_clientes = collection_clientes.count_documents({"status": "Pendente", "nome_base": nome_base})
+        base_doc = {
+            "nome_base": nome_base,
+            "data_importacao": datetime.now(UTC),
+            "total_clientes": total_clientes,
+            "ativa": ativa,
+            "atribuicao": {"tipo": "geral", "supervisor_id": None},
+        }
+        # Só agora a base passa a existir para o bot; o checkpoint é encerrado em seguida.
+        collection_bases.insert_one(base_doc)
+        db[COLECAO_CONTADORES].update_one(chave_base(nome_base), {"$set": {
+            **contador_base_zerado(nome_base, ativa), "pendentes": total_clientes,
+        }}, upsert=True)
+        collection_importacoes.update_one({"_id": nome_base}, {"$set": {
+            "status": "concluida", "total_clientes": total_clientes, "concluida_em": datetime.now(UTC),
+        }})
+
+        print("\n--- Importação Finalizada ---")
+        print(f"Linhas lidas: {linhas_lidas}")
+        print(f"Clientes na base '{nome_base}': {total_clientes}")
+        print(f"Linhas sem telefone válido (ignoradas): {invalidas}")
+        print(f"Duplicadas em outras bases: {duplicados['duplicado_no_banco']}")
+        print(f"Duplicadas dentro do arquivo: {duplicados['duplicado_no_arquivo']}")
+        if any(duplicados.values()):
+            print(f"Relatório de rejeitados: {caminho_rejeitados}")
+        return 0
+
+    except Exception as e:
+        print(f"❌ Ocorreu um erro durante o processo: {e}")
+        print("Rode o mesmo comando novamente para retomar do último lote gravado.")
+        return 1
+    finally:
+        if client:
+            client.close()
+            print("Conexão com MongoDB fechada.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa uma base de leads (CSV/XLSX) para o MongoDB.")
+    parser.add_argument("arquivo", help="caminho do .csv ou .xlsx (primeira linha = cabeçalho)")
+    parser.add_argument("--nome-base", required=True, help="nome da base (aparece no painel de bases)")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="linhas por lote gravado")
+    parser.add_argument("--inativa", action="store_true", help="cria a base desativada")
+    args = parser.parse_args()
+    sys.exit(importar_base(args.arquivo, args.nome_base, args.lote, ativa=not args.inativa))
@@ -0,0 +1,88 @@
+# migrar_observacoes.py
+# Move o array clientes.observacoes para a coleção historico_clientes (buckets por cliente).
+# Uso (na raiz do projeto): python -m Gerencial.migrar_observacoes
+# Pode ser interrompido e rodado de novo: cada lote apaga os buckets que ele mesmo já tinha
+# criado para aqueles clientes antes de recriá-los, e só remove o array depois de gravar os buckets.
+import os
+import sys
+import pymongo
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+from database.indices import aplicar_indices
+from database.historico import COLECAO_HISTORICO, montar_buckets
+
+TAMANHO_LOTE = 500
+
+
+def migrar_observacoes() -> int:
+    print("Iniciando migração das observações para o histórico em buckets...")
+    load_dotenv()
+    connection_string = os.getenv('MONGO_URI')
+    if not connection_string: print("ERRO: MONGO_URI não encontrada."); return 1
+
+    client = None
+    try:
+        client = pymongo.MongoClient(connection_string)
+        db = client ['bot_vendas']
+        collection_clientes = db ['clientes']
+        collection_historico = db [COLECAO_HISTORICO]
+        client.admin.command('ping')
+        print("✅ Conectado ao MongoDB.")
+
+        aplicar_indices(db)
+
+        filtro = {"observacoes": {"$exists": True}}
+        total_pendente = collection_clientes.count_documents(filtro)
+        print(f"Clientes com observações a migrar: {total_pendente}")
+
+        ultimo_id = None
+        total_clientes = total_entradas = 0
+        while True:
+            filtro_lote = dict(filtro)
+            if ultimo_id is not None:
+                filtro_lote["_id"] = {"$gt": ultimo_id}
+            lote = list(collection_clientes.find(filtro_lote, {"observacoes": 1, "data_finalizacao": 1})
+                        .sort("_id", 1).limit(TAMANHO_LOTE))
+            if not lote:
+                break
+
+            buckets = []
+            for doc in lote:
+                entradas = []
+                for obs in doc.get('observacoes') or []:
+                    entrada = {"tipo": "consulta" if str(obs.get('nota', '')).startswith("Consulta no banco") else "nota", **obs}
+                    if not entrada.get('data'):
+                        entrada['data'] = doc.get('data_finalizacao') or doc['_id'].generation_time.replace(tzinfo=None)
+                    entradas.append(entrada)
+                buckets.extend(montar_buckets(doc['_id'], entradas, migrado=True))
+                total_entradas += len(entradas)
+
+            ids = [doc['_id'] for doc in lote]
+            collection_historico.delete_many({"cliente_id": {"$in": ids}, "migrado": True})
+            if buckets:
+                collection_historico.insert_many(buckets, ordered=False)
+            collection_clientes.bulk_write(
+                [UpdateOne({"_id": cliente_id}, {"$unset": {"observacoes": ""}}) for cliente_id in ids], ordered=False
+            )
+
+            total_clientes += len(lote)
+            ultimo_id = ids[-1]
+            print(f"  ... {total_clientes}/{total_pendente} clientes migrados ({total_entradas} entradas)")
+
+        print("\n--- Migração Finalizada ---")
+        print(f"Clientes migrados: {total_clientes}")
+        print(f"Entradas movidas para {COLECAO_HISTORICO}: {total_entradas}")
+        return 0
+
+    except Exception as e:
+        print(f"❌ Ocorreu um erro durante o processo: {e}")
+        return 1
+    finally:
+        if client:
+            client.close()
+            print("Conexão com MongoDB fechada.")
+
+
+if __name__ == "__main__":
+    sys.exit(migrar_observacoes())
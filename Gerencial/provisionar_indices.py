@@ -0,0 +1,60 @@
+# provisionar_indices.py
+# Uso (na raiz do projeto):
+#   python -m Gerencial.provisionar_indices          -> cria os índices do manifesto
+#   python -m Gerencial.provisionar_indices --check  -> também roda explain() nas consultas dos handlers
+import os
+import sys
+import argparse
+import pymongo
+from dotenv import load_dotenv
+
+from database.indices import INDICES, aplicar_indices, verificar_consultas
+
+
+def provisionar_indices(verificar: bool) -> int:
+    load_dotenv()
+    connection_string = os.getenv('MONGO_URI')
+    if not connection_string: print("ERRO: MONGO_URI não encontrada."); return 1
+
+    client = None
+    try:
+        client = pymongo.MongoClient(connection_string)
+        db = client ['bot_vendas']
+        client.admin.command('ping')
+        print("✅ Conectado ao MongoDB.")
+
+        aplicar_indices(db)
+        for nome_colecao in INDICES:
+            nomes = sorted(db[nome_colecao].index_information())
+            print(f"Índices em '{nome_colecao}': {', '.join(nomes)}")
+
+        if not verificar:
+            return 0
+
+        print("\n--- Verificando planos de execução ---")
+        falhas = 0
+        for nome, estagios, ok in verificar_consultas(db):
+            print(f"{'✅' if ok else '❌'} {nome}: {' -> '.join(estagios)}")
+            if not ok:
+                falhas += 1
+
+        if falhas:
+            print(f"\n❌ {falhas} consulta(s) fazendo COLLSCAN.")
+            return 1
+        print("\n✅ Nenhuma consulta faz COLLSCAN.")
+        return 0
+
+    except Exception as e:
+        print(f"❌ Ocorreu um erro durante o processo: {e}")
+        return 1
+    finally:
+        if client:
+            client.close()
+            print("Conexão com MongoDB fechada.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cria os índices do bot e verifica os planos das consultas.")
+    parser.add_argument("--check", action="store_true", help="falha se alguma consulta canônica fizer COLLSCAN")
+    args = parser.parse_args()
+    sys.exit(provisionar_indices(args.check))
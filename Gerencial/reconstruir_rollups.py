@@ -0,0 +1,63 @@
+# reconstruir_rollups.py
+# Uso (na raiz do projeto):
+#   python -m Gerencial.reconstruir_rollups                   -> recalcula rollups_diarios inteiro
+#   python -m Gerencial.reconstruir_rollups --desde 2025-01-01 -> recalcula só a partir do dia informado
+import os
+import sys
+import argparse
+from datetime import datetime, time, UTC
+import pymongo
+from dotenv import load_dotenv
+
+from database.indices import aplicar_indices
+from database.rollups import COLECAO_ROLLUPS, TZ_SAO_PAULO, pipeline_reconstrucao
+
+
+def reconstruir_rollups(desde: str = None) -> int:
+    print("Iniciando reconstrução dos rollups diários...")
+    load_dotenv()
+    connection_string = os.getenv('MONGO_URI')
+    if not connection_string: print("ERRO: MONGO_URI não encontrada."); return 1
+
+    client = None
+    try:
+        client = pymongo.MongoClient(connection_string)
+        db = client ['bot_vendas']
+        collection_clientes = db ['clientes']
+        client.admin.command('ping')
+        print("✅ Conectado ao MongoDB.")
+
+        if desde is None:
+            # Gera numa coleção temporária e troca de uma vez, para os relatórios nunca lerem pela metade.
+            colecao_temp = f"{COLECAO_ROLLUPS}_reconstrucao"
+            collection_clientes.aggregate(pipeline_reconstrucao() + [{"$out": colecao_temp}])
+            db [colecao_temp].rename(COLECAO_ROLLUPS, dropTarget=True)
+        else:
+            dia_inicio = datetime.strptime(desde, '%Y-%m-%d').date()
+            inicio_utc = TZ_SAO_PAULO.localize(datetime.combine(dia_inicio, time.min)).astimezone(UTC)
+            db [COLECAO_ROLLUPS].delete_many({"dia": {"$gte": desde}})
+            collection_clientes.aggregate(pipeline_reconstrucao({"data_finalizacao": {"$gte": inicio_utc}}) + [
+                {"$merge": {"into": COLECAO_ROLLUPS, "on": ["dia", "vendedor", "status_final", "nome_base"],
+                            "whenMatched": "replace", "whenNotMatched": "insert"}}
+            ])
+
+        aplicar_indices(db)
+        total_docs = db [COLECAO_ROLLUPS].count_documents({})
+        print("\n--- Reconstrução Finalizada ---")
+        print(f"Documentos em {COLECAO_ROLLUPS}: {total_docs}")
+        return 0
+
+    except Exception as e:
+        print(f"❌ Ocorreu um erro durante o processo: {e}")
+        return 1
+    finally:
+        if client:
+            client.close()
+            print("Conexão com MongoDB fechada.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula a coleção rollups_diarios a partir de clientes.")
+    parser.add_argument("--desde", help="dia inicial (AAAA-MM-DD) para reconstrução parcial")
+    args = parser.parse_args()
+    sys.exit(reconstruir_rollups(args.desde))
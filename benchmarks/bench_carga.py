@@ -0,0 +1,423 @@
+# benchmarks/bench_carga.py
+"""
+Teste de carga ponta a ponta com vendedores e supervisores simulados; serve de portão de regressão
+para mudanças de desempenho.
+
+Monta o mesmo Application do bot.py (construir_aplicacao) contra a Bot API falsa de
+benchmarks.telegram_falso e o MongoDB informado (o banco `bench_carga` é apagado e populado).
+Cada vendedor virtual faz login e repete /proximo -> consulta no banco ou status direto -> finalização,
+lendo os botões das mensagens que o bot enviou, como um usuário real. Os supervisores fazem login
+e pedem relatórios enquanto os vendedores trabalham. Cada update só é enviado depois que o bot
+terminou o anterior do mesmo usuário.
+
+Relata a vazão, p50/p95/p99 por handler (medidos pelos próprios wrappers de services.metricas) e as
+violações: lead entregue a um vendedor enquanto outro ainda o atendia, lead finalizado mais de uma
+vez, vendedor com mais de um lead Em_Atendimento e finalizações confirmadas que não batem com o banco.
+
+Sai com código 1 se houver violação, handler com exceção, login recusado ou update sem resposta,
+se algum handler passar de `--max-p95-ms`, ou se o p95 de algum handler piorar mais que
+`--tolerancia` em relação ao resultado salvo em `--comparar` (gerado antes com `--salvar-resultado`).
+
+O tempo até o próximo lead é o do handler do /proximo. Para medir a pré-reserva de leads, rode com e sem
+`--pre-reserva-s` (com uma `--pausa-ms` realista, o vendedor demora um pouco entre finalizar e pedir o próximo).
+
+Uso: python -m benchmarks.bench_carga --mongo-uri mongodb://localhost:27017
+                                       [--vendedores 50] [--supervisores 5] [--ciclos 10] [--simultaneos 64]
+                                       [--latencia-ms 30] [--pausa-ms 0] [--pre-reserva-s 60] [--max-p95-ms 500]
+                                       [--salvar-resultado base.json] [--comparar base.json] [--tolerancia 0.25]
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, UTC
+import pymongo
+from telegram import Update
+from telegram.ext import TypeHandler
+from werkzeug.security import generate_password_hash
+
+from bot import construir_aplicacao
+from benchmarks.telegram_falso import RequisicaoFalsa, mensagem, callback
+from database.rollups import chave_rollup
+from services.metricas import Metricas
+from handlers import callbacks
+from handlers.vendedor_handlers import MSG_ATENDIMENTO_EXPIRADO
+
+NOME_BASE = "Base Carga"
+SENHA = "carga123"
+PRIMEIRO_ID_SUPERVISOR = 500
+PRIMEIRO_ID_VENDEDOR = 1000
+TIMEOUT_PASSO_S = 30.0
+# p95 abaixo disso nunca conta como regressão (ruído de medição em handlers muito rápidos).
+FOLGA_COMPARACAO_MS = 5.0
+
+STATUS_DIRETOS = [callbacks.STATUS.codificar(status)
+                  for status in ("contatado", "sem_interesse", "venda_fechada", "sem_whatsapp")]
+BANCOS = ["DREX Pix", "Simplix", "GRANAPIX", "LOTUS", "Grandino", "V8", "PH Tech"]
+RESULTADOS = ["Possui Saldo", "Nao Autorizado", "Sem Saldo", "Nao Elegivel"]
+RELATORIOS_SUPERVISOR = [callbacks.RELATORIO_GERAL.codificar("hoje"), callbacks.RELATORIO_GERAL.codificar("mes_atual"),
+                         callbacks.RELATORIO_GERAL.codificar("comparar_semana"),
+                         callbacks.RELATORIO_TOTAIS.codificar("semana_atual"), callbacks.SUP_DESEMPENHO_HOJE.codificar()]
+CONFIRMACOES = ("Cliente finalizado com sucesso", "Consulta registrada com sucesso")
+
+
+def popular_banco(db, vendedores: int, supervisores: int, leads: int) -> None:
+    for nome in db.list_collection_names():
+        db.drop_collection(nome)
+    agora = datetime.now(UTC)
+    senha_hash = generate_password_hash(SENHA)
+    db['bases'].insert_one({"nome_base": NOME_BASE, "ativa": True, "data_importacao": agora})
+    db['mensagens'].insert_one({"nome_template": "Padrão", "texto": "Olá {cliente}, aqui é {vendedor}!", "ativo": True})
+
+    ids_supervisores = [
+        db['vendedores'].insert_one({
+            "nome_vendedor": f"Supervisor {i}", "usuario_login": f"sup{i}", "senha_hash": senha_hash,
+            "role": "supervisor", "supervisor_id": None,
+        }).inserted_id
+        for i in range(supervisores)
+    ]
+    ids_vendedores = [
+        db['vendedores'].insert_one({
+            "nome_vendedor": f"Vendedor {i}", "usuario_login": f"vend{i}", "senha_hash": senha_hash, "role": "vendedor",
+            # Um em cada quatro é autônomo.
+            "supervisor_id": ids_supervisores[i % supervisores] if ids_supervisores and i % 4 else None,
+        }).inserted_id
+        for i in range(vendedores)
+    ]
+
+    db['clientes'].insert_many([
+        {"nome_cliente": f"Cliente {i}", "cpf": f"{i:011d}", "telefone": f"119{i:08d}",
+         "status": "Pendente", "nome_base": NOME_BASE}
+        for i in range(leads)
+    ])
+
+    # Histórico do mês para os relatórios terem o que agregar.
+    finalizados = []
+    for i in range(leads // 2):
+        vendedor_id = random.choice(ids_vendedores)
+        status_final = random.choice(["✅ Contatado", "❌ Sem Interesse", "💰 Venda Fechada"])
+        data = agora - timedelta(days=1, hours=random.randint(0, 24 * 20))
+        finalizados.append({
+            "nome_cliente": f"Antigo {i}", "telefone": f"118{i:08d}", "status": "Concluido", "nome_base": NOME_BASE,
+            "vendedor_atribuido": vendedor_id, "status_final": status_final, "data_finalizacao": data,
+        })
+        db['rollups_diarios'].update_one(chave_rollup(data, vendedor_id, status_final, NOME_BASE),
+                                         {"$inc": {"total": 1}}, upsert=True)
+    if finalizados:
+        db['clientes'].insert_many(finalizados)
+
+
+class BotApiCarga(RequisicaoFalsa):
+    """Bot API falsa que guarda, por chat, o texto e os callback_data de cada mensagem enviada ou editada."""
+
+    def __init__(self, latencia_s: float = 0.0):
+        super().__init__(latencia_s)
+        self.caixas = defaultdict(list)
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        resposta = await super().do_request(url, method, request_data, read_timeout, write_timeout,
+                                            connect_timeout, pool_timeout)
+        parametros = request_data.parameters if request_data else {}
+        if "chat_id" in parametros and "text" in parametros:
+            teclado = (parametros.get("reply_markup") or {}).get("inline_keyboard", [])
+            botoes = [botao["callback_data"] for linha in teclado for botao in linha if botao.get("callback_data")]
+            self.caixas[int(parametros["chat_id"])].append((str(parametros["text"]), botoes))
+        return resposta
+
+
+class MetricasCarga(Metricas):
+    """Metricas que também guarda cada duração, para percentis exatos por handler."""
+
+    def __init__(self):
+        super().__init__(limite_lento_ms=float("inf"))
+        self.amostras_ms = defaultdict(list)
+
+    def registrar_handler(self, handler: str, gatilho: str, segundos: float, erro: bool = False) -> None:
+        super().registrar_handler(handler, gatilho, segundos, erro)
+        self.amostras_ms[handler].append(segundos * 1000)
+
+    def total_erros(self) -> int:
+        return int(sum(self.erros_handlers._valores.values()))
+
+
+class Simulacao:
+    """Entrega updates em nome dos usuários virtuais e confere a posse dos leads."""
+
+    def __init__(self, application, api: BotApiCarga, pausa_s: float):
+        self.application = application
+        self.api = api
+        self.pausa_s = pausa_s
+        self._pendentes = {}
+        self.donos = {}
+        self.finalizacoes = Counter()
+        self.violacoes = []
+        self.passos = 0
+        self.sem_resposta = 0
+        self.logins_recusados = 0
+        self.recusas_expiradas = 0
+
+    async def concluido(self, update, context) -> None:
+        """Último handler (grupo 1000): o bot terminou este update."""
+        futuro = self._pendentes.pop(update.update_id, None)
+        if futuro is not None and not futuro.done():
+            futuro.set_result(None)
+
+    async def enviar(self, usuario: int, update: dict) -> list:
+        """Entrega o update, espera o bot terminar e devolve [(texto, botões)] enviados ao usuário nesse meio tempo."""
+        caixa = self.api.caixas[usuario]
+        inicio_caixa = len(caixa)
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendentes[update["update_id"]] = futuro
+        await self.application.update_queue.put(Update.de_json(update, self.application.bot))
+        try:
+            await asyncio.wait_for(futuro, TIMEOUT_PASSO_S)
+        except asyncio.TimeoutError:
+            self._pendentes.pop(update["update_id"], None)
+            self.sem_resposta += 1
+        self.passos += 1
+        if self.pausa_s:
+            await asyncio.sleep(random.uniform(0, 2 * self.pausa_s))
+        return caixa[inicio_caixa:]
+
+    def ultimo_texto(self, usuario: int) -> str:
+        caixa = self.api.caixas[usuario]
+        return caixa[-1][0] if caixa else ""
+
+    async def login(self, usuario: int, login: str) -> bool:
+        await self.enviar(usuario, mensagem(usuario, "/login"))
+        await self.enviar(usuario, mensagem(usuario, login))
+        respostas = await self.enviar(usuario, mensagem(usuario, SENHA))
+        if any("Login bem-sucedido" in texto for texto, _ in respostas):
+            return True
+        self.logins_recusados += 1
+        return False
+
+    def atribuir(self, usuario: int, lead: str) -> None:
+        dono = self.donos.get(lead)
+        if dono is not None and dono != usuario:
+            self.violacoes.append(f"lead {lead} entregue a {usuario} enquanto estava com {dono}")
+        self.donos[lead] = usuario
+
+    def liberar(self, usuario: int, lead: str, respostas: list) -> None:
+        if self.donos.get(lead) == usuario:
+            del self.donos[lead]
+        if any(texto == MSG_ATENDIMENTO_EXPIRADO for texto, _ in respostas):
+            self.recusas_expiradas += 1
+        elif any(confirmacao in texto for texto, _ in respostas for confirmacao in CONFIRMACOES):
+            self.finalizacoes[lead] += 1
+            if self.finalizacoes[lead] > 1:
+                self.violacoes.append(f"lead {lead} finalizado {self.finalizacoes[lead]} vezes")
+
+
+def _lead_recebido(respostas: list):
+    for _, botoes in reversed(respostas):
+        for dado in botoes:
+            acao, args = callbacks.decodificar(dado)
+            if acao is callbacks.CONSULTA:
+                return str(args[0])
+    return None
+
+
+async def vendedor_virtual(sim: Simulacao, usuario: int, login: str, ciclos: int, rng: random.Random) -> None:
+    if not await sim.login(usuario, login):
+        return
+    for _ in range(ciclos):
+        respostas = await sim.enviar(usuario, mensagem(usuario, "/proximo"))
+        lead = _lead_recebido(respostas)
+        if lead is None:
+            break
+        sim.atribuir(usuario, lead)
+
+        if rng.random() < 0.5:
+            respostas = await sim.enviar(usuario, callback(usuario, rng.choice(STATUS_DIRETOS), sim.ultimo_texto(usuario)))
+        else:
+            await sim.enviar(usuario, callback(usuario, callbacks.CONSULTA.codificar(lead), sim.ultimo_texto(usuario)))
+            await sim.enviar(usuario, callback(usuario, callbacks.BANCO.codificar(rng.choice(BANCOS)), sim.ultimo_texto(usuario)))
+            resultado = rng.choice(RESULTADOS)
+            respostas = await sim.enviar(usuario, callback(usuario, callbacks.RESULTADO.codificar(resultado), sim.ultimo_texto(usuario)))
+            if resultado == "Possui Saldo":
+                respostas = await sim.enviar(usuario, mensagem(usuario, f"{rng.randint(100, 9000)},{rng.randint(0, 99):02d}"))
+        sim.liberar(usuario, lead, respostas)
+
+        if rng.random() < 0.2:
+            await sim.enviar(usuario, mensagem(usuario, "/hoje"))
+
+
+async def supervisor_virtual(sim: Simulacao, usuario: int, login: str, vendedores_ativos: asyncio.Event,
+                             intervalo_s: float, rng: random.Random) -> None:
+    if not await sim.login(usuario, login):
+        return
+    while not vendedores_ativos.is_set():
+        await sim.enviar(usuario, callback(usuario, rng.choice(RELATORIOS_SUPERVISOR), sim.ultimo_texto(usuario)))
+        try:
+            await asyncio.wait_for(vendedores_ativos.wait(), rng.uniform(0, 2 * intervalo_s))
+        except asyncio.TimeoutError:
+            pass
+
+
+def conferir_banco(db, sim: Simulacao, inicio) -> None:
+    """Confere no banco o que a simulação viu pelas mensagens."""
+    for item in db['clientes'].aggregate([
+        {"$match": {"status": "Em_Atendimento"}},
+        {"$group": {"_id": "$vendedor_atribuido", "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+    ]):
+        sim.violacoes.append(f"vendedor {item['_id']} com {item['n']} leads Em_Atendimento")
+    no_banco = db['clientes'].count_documents({"status": "Concluido", "data_finalizacao": {"$gte": inicio}})
+    confirmadas = sum(sim.finalizacoes.values())
+    if no_banco != confirmadas:
+        sim.violacoes.append(f"{confirmadas} finalizações confirmadas ao vendedor, {no_banco} no banco")
+
+
+def _percentil(valores: list, p: float) -> float:
+    if len(valores) < 2:
+        return valores[0] if valores else 0.0
+    return statistics.quantiles(valores, n=100, method='inclusive')[int(p) - 1]
+
+
+async def rodar(db, args) -> dict:
+    api = BotApiCarga(latencia_s=args.latencia_ms / 1000)
+    metricas = MetricasCarga()
+    application = construir_aplicacao(db, "1:carga", max_simultaneos=args.simultaneos, intervalo_persistencia=60,
+                                      request=api, metricas=metricas, pre_reserva_leads_s=args.pre_reserva_s)
+    sim = Simulacao(application, api, args.pausa_ms / 1000)
+    application.add_handler(TypeHandler(Update, sim.concluido), group=1000)
+
+    await application.initialize()
+    await application.start()
+    inicio_utc = datetime.now(UTC)
+    inicio = time.perf_counter()
+
+    rng = random.Random(args.semente)
+    vendedores_ativos = asyncio.Event()
+    supervisores = [
+        asyncio.create_task(supervisor_virtual(sim, PRIMEIRO_ID_SUPERVISOR + i, f"sup{i}", vendedores_ativos,
+                                               args.intervalo_supervisor_s, random.Random(rng.random())))
+        for i in range(args.supervisores)
+    ]
+    await asyncio.gather(*[
+        vendedor_virtual(sim, PRIMEIRO_ID_VENDEDOR + i, f"vend{i}", args.ciclos, random.Random(rng.random()))
+        for i in range(args.vendedores)
+    ])
+    vendedores_ativos.set()
+    await asyncio.gather(*supervisores)
+    duracao = time.perf_counter() - inicio
+
+    fila_leads = application.bot_data['fila_leads']
+    pre_reservas = {"usadas": fila_leads.pre_reservas_usadas, "expiradas": fila_leads.pre_reservas_expiradas,
+                    "perdidas": fila_leads.pre_reservas_perdidas}
+    await application.stop()
+    await application.shutdown()
+    conferir_banco(db, sim, inicio_utc)
+
+    handlers = {
+        nome: {
+            "chamadas": len(amostras),
+            "p50_ms": _percentil(amostras, 50),
+            "p95_ms": _percentil(amostras, 95),
+            "p99_ms": _percentil(amostras, 99),
+            "max_ms": max(amostras),
+        }
+        for nome, amostras in metricas.amostras_ms.items()
+    }
+    return {
+        "duracao_s": duracao,
+        "updates": sim.passos,
+        "vazao_updates_s": sim.passos / duracao if duracao else 0.0,
+        "finalizacoes": sum(sim.finalizacoes.values()),
+        "vazao_finalizacoes_s": sum(sim.finalizacoes.values()) / duracao if duracao else 0.0,
+        "handlers": handlers,
+        "erros_handlers": metricas.total_erros(),
+        "sem_resposta": sim.sem_resposta,
+        "logins_recusados": sim.logins_recusados,
+        "recusas_expiradas": sim.recusas_expiradas,
+        "violacoes": sim.violacoes,
+        "pre_reservas": pre_reservas,
+    }
+
+
+def reprovacoes(resultado: dict, max_p95_ms: float = None, base: dict = None, tolerancia: float = 0.25) -> list:
+    """Motivos para o portão de regressão falhar (lista vazia = aprovado)."""
+    motivos = [f"violação: {v}" for v in resultado["violacoes"]]
+    for chave, descricao in (("erros_handlers", "handler(s) com exceção"), ("sem_resposta", "update(s) sem resposta"),
+                             ("logins_recusados", "login(s) recusado(s)")):
+        if resultado[chave]:
+            motivos.append(f"{resultado[chave]} {descricao}")
+    for nome, item in resultado["handlers"].items():
+        if max_p95_ms is not None and item["p95_ms"] > max_p95_ms:
+            motivos.append(f"{nome}: p95 {item['p95_ms']:.1f}ms acima do limite de {max_p95_ms:.0f}ms")
+        anterior = (base or {}).get("handlers", {}).get(nome)
+        if anterior and item["p95_ms"] > max(anterior["p95_ms"] * (1 + tolerancia), FOLGA_COMPARACAO_MS):
+            motivos.append(f"{nome}: p95 {item['p95_ms']:.1f}ms contra {anterior['p95_ms']:.1f}ms na base")
+    return motivos
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", required=True)
+    parser.add_argument("--vendedores", type=int, default=50)
+    parser.add_argument("--supervisores", type=int, default=5)
+    parser.add_argument("--ciclos", type=int, default=10, help="leads que cada vendedor atende")
+    parser.add_argument("--simultaneos", type=int, default=64, help="updates processados ao mesmo tempo pelo bot")
+    parser.add_argument("--latencia-ms", type=float, default=30.0, help="latência simulada da Bot API")
+    parser.add_argument("--pausa-ms", type=float, default=0.0, help="pausa média de cada usuário entre cliques")
+    parser.add_argument("--intervalo-supervisor-s", type=float, default=1.0)
+    parser.add_argument("--pre-reserva-s", type=float, default=0.0,
+                        help="liga a pré-reserva do próximo lead com essa validade (0 = desligada)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--max-p95-ms", type=float)
+    parser.add_argument("--salvar-resultado", help="grava o resultado em JSON (base para --comparar)")
+    parser.add_argument("--comparar", help="resultado JSON anterior; falha se algum p95 piorar além da tolerância")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args()
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+
+    db = pymongo.MongoClient(args.mongo_uri)['bench_carga']
+    popular_banco(db, args.vendedores, args.supervisores, leads=args.vendedores * args.ciclos * 2)
+    print(f"{args.vendedores} vendedores x {args.ciclos} ciclos, {args.supervisores} supervisores, "
+          f"{args.simultaneos} updates simultâneos, Bot API a {args.latencia_ms:.0f}ms.")
+    resultado = asyncio.run(rodar(db, args))
+
+    print(f"\n{resultado['updates']} updates em {resultado['duracao_s']:.1f}s: "
+          f"{resultado['vazao_updates_s']:.1f} updates/s, {resultado['vazao_finalizacoes_s']:.1f} finalizações/s "
+          f"({resultado['finalizacoes']} no total)\n")
+    print(f"{'handler':<36} {'chamadas':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9}")
+    for nome, item in sorted(resultado["handlers"].items(), key=lambda par: par[1]["p95_ms"], reverse=True):
+        print(f"{nome:<36} {item['chamadas']:>8} {item['p50_ms']:>7.1f}ms {item['p95_ms']:>7.1f}ms "
+              f"{item['p99_ms']:>7.1f}ms {item['max_ms']:>7.1f}ms")
+    proximo = resultado["handlers"].get("proximo_cliente")
+    if proximo:
+        print(f"\nTempo até o próximo lead (/proximo): p50 {proximo['p50_ms']:.1f}ms, p95 {proximo['p95_ms']:.1f}ms")
+    if args.pre_reserva_s:
+        print("Pré-reservas: {usadas} usadas, {expiradas} expiradas, {perdidas} perdidas".format(**resultado["pre_reservas"]))
+    print(f"\nViolações de posse de lead: {len(resultado['violacoes'])}")
+    for violacao in resultado["violacoes"][:20]:
+        print(f"  - {violacao}")
+    if resultado["recusas_expiradas"]:
+        print(f"Finalizações recusadas por lease expirado: {resultado['recusas_expiradas']}")
+
+    if args.salvar_resultado:
+        with open(args.salvar_resultado, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    motivos = reprovacoes(resultado, args.max_p95_ms, base, args.tolerancia)
+    if motivos:
+        print("\nREPROVADO:")
+        for motivo in motivos:
+            print(f"  - {motivo}")
+        return 1
+    print("\nAPROVADO")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# benchmarks/bench_fila_leads.py
+"""
+Benchmark da distribuição de leads do /proximo.
+
+Compara a estratégia antiga ($sample + find_one_and_update com até 3 tentativas) com a
+FilaLeads, com 1, 10 e 100 vendedores simulados disputando a mesma base. O banco é um
+repositório em memória que imita a latência de ida e volta do MongoDB.
+
+Uso: python -m benchmarks.bench_fila_leads [--leads 20000] [--latencia-ms 2]
+"""
+import sys
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+
+from services.fila_leads import FilaLeads
+
+
+class RepositorioEmMemoria:
+    def __init__(self, total_leads: int, latencia_s: float):
+        self.latencia_s = latencia_s
+        self.status = {lead_id: "Pendente" for lead_id in range(total_leads)}
+        self.pendentes = set(self.status)
+        self.atribuicoes = Counter()
+
+    async def _ida_e_volta(self):
+        await asyncio.sleep(self.latencia_s)
+
+    async def listar_nomes_bases_ativas(self):
+        await self._ida_e_volta()
+        return ["Base Benchmark"]
+
+    async def amostrar_ids_pendentes(self, nome_base, tamanho):
+        await self._ida_e_volta()
+        return random.sample(list(self.pendentes), min(tamanho, len(self.pendentes)))
+
+    async def atribuir_cliente(self, cliente_id, vendedor_id, data_atribuicao):
+        await self._ida_e_volta()
+        if self.status.get(cliente_id) != "Pendente":
+            return None
+        self.status[cliente_id] = "Em_Atendimento"
+        self.pendentes.discard(cliente_id)
+        self.atribuicoes[cliente_id] += 1
+        return {"_id": cliente_id, "vendedor_atribuido": vendedor_id}
+
+
+async def _vendedor_legado(repo, vendedor_id, metricas):
+    while True:
+        for _ in range(3):
+            if not repo.pendentes:
+                return
+            amostra = await repo.amostrar_ids_pendentes("Base Benchmark", 1)
+            if not amostra:
+                return
+            if await repo.atribuir_cliente(amostra[0], vendedor_id, None):
+                metricas["reservas"] += 1
+                break
+            metricas["colisoes"] += 1
+        else:
+            metricas["fila_concorrida"] += 1
+
+
+async def _vendedor_fila(fila, vendedor_id, metricas):
+    while True:
+        cliente = await fila.reservar(vendedor_id)
+        if cliente is None:
+            return
+        metricas["reservas"] += 1
+
+
+async def rodar(estrategia: str, vendedores: int, total_leads: int, latencia_s: float) -> dict:
+    repo = RepositorioEmMemoria(total_leads, latencia_s)
+    metricas = Counter()
+    inicio = time.perf_counter()
+    if estrategia == "legado":
+        await asyncio.gather(*(_vendedor_legado(repo, v, metricas) for v in range(vendedores)))
+    else:
+        fila = FilaLeads(repo)
+        await asyncio.gather(*(_vendedor_fila(fila, v, metricas) for v in range(vendedores)))
+    duracao = time.perf_counter() - inicio
+    duplicados = sum(1 for n in repo.atribuicoes.values() if n > 1)
+    return {
+        "reservas_por_s": metricas["reservas"] / duracao,
+        "reservas": metricas["reservas"],
+        "colisoes": metricas["colisoes"],
+        "fila_concorrida": metricas["fila_concorrida"],
+        "duplicados": duplicados,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=20000)
+    parser.add_argument("--latencia-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{'estratégia':<10} {'vendedores':>10} {'reservas/s':>12} {'colisões':>9} {'concorrida':>11} {'duplicados':>11}")
+    for vendedores in (1, 10, 100):
+        for estrategia in ("legado", "fila"):
+            r = asyncio.run(rodar(estrategia, vendedores, args.leads, args.latencia_ms / 1000))
+            print(f"{estrategia:<10} {vendedores:>10} {r['reservas_por_s']:>12.0f} {r['colisoes']:>9} "
+                  f"{r['fila_concorrida']:>11} {r['duplicados']:>11}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
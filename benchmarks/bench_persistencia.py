@@ -0,0 +1,111 @@
+# benchmarks/bench_persistencia.py
+"""
+Benchmark de updates por segundo com e sem a PersistenciaMongo.
+
+Cada usuário simulado percorre uma conversa persistente de dois passos que grava em
+`user_data` (como o fluxo de /consulta). A Bot API é a falsa de benchmarks.telegram_falso,
+então o número medido é o custo do processamento + persistência, sem rede do Telegram.
+
+Uso: python -m benchmarks.bench_persistencia [--usuarios 200] [--rodadas 20] [--intervalo 1]
+                                             --mongo-uri mongodb://localhost:27017
+"""
+import sys
+import time
+import asyncio
+import argparse
+import pymongo
+from telegram import Update
+from telegram.ext import Application, CommandHandler, ConversationHandler, MessageHandler, filters
+
+from benchmarks.telegram_falso import RequisicaoFalsa, mensagem
+from services.persistencia import PersistenciaMongo
+
+PASSO_A, PASSO_B = range(2)
+
+
+async def _iniciar(update, context):
+    context.user_data['consulta_iniciada'] = time.time()
+    return PASSO_A
+
+
+async def _passo_a(update, context):
+    context.user_data['consulta_cpf'] = update.message.text
+    return PASSO_B
+
+
+async def _passo_b(update, context):
+    context.user_data['consulta_valor'] = update.message.text
+    context.user_data['consultas'] = context.user_data.get('consultas', 0) + 1
+    return ConversationHandler.END
+
+
+def _construir(persistencia) -> Application:
+    builder = Application.builder().token("0:benchmark").request(RequisicaoFalsa()).updater(None)
+    if persistencia is not None:
+        builder = builder.persistence(persistencia)
+    app = builder.build()
+    app.add_handler(ConversationHandler(
+        entry_points=[CommandHandler('consulta', _iniciar)],
+        states={
+            PASSO_A: [MessageHandler(filters.TEXT & ~filters.COMMAND, _passo_a)],
+            PASSO_B: [MessageHandler(filters.TEXT & ~filters.COMMAND, _passo_b)],
+        },
+        fallbacks=[],
+        name="bench_consulta",
+        persistent=persistencia is not None,
+    ))
+    return app
+
+
+async def rodar(persistencia, usuarios: int, rodadas: int) -> dict:
+    app = _construir(persistencia)
+    await app.initialize()
+    await app.start()
+
+    async def _usuario(user_id):
+        for rodada in range(rodadas):
+            for texto in ('/consulta', f'{user_id:011d}', str(rodada)):
+                await app.process_update(Update.de_json(mensagem(user_id, texto), app.bot))
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_usuario(1000 + u) for u in range(usuarios)))
+    duracao = time.perf_counter() - inicio
+
+    await app.stop()
+    inicio_desligamento = time.perf_counter()
+    await app.shutdown()  # inclui a última descarga da persistência
+    desligamento = time.perf_counter() - inicio_desligamento
+
+    updates = usuarios * rodadas * 3
+    return {
+        "updates_por_s": updates / duracao,
+        "updates": updates,
+        "gravacoes": persistencia.gravacoes if persistencia else 0,
+        "desligamento_ms": desligamento * 1000,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--rodadas", type=int, default=20)
+    parser.add_argument("--intervalo", type=float, default=1.0, help="update_interval da persistência, em segundos")
+    parser.add_argument("--mongo-uri", required=True, help="MongoDB para a persistência (usa o banco bench_persistencia)")
+    args = parser.parse_args()
+
+    db = pymongo.MongoClient(args.mongo_uri)['bench_persistencia']
+
+    print(f"{'persistência':<13} {'updates':>8} {'updates/s':>10} {'gravações':>10} {'desligamento':>13}")
+    for nome in ("desligada", "mongo"):
+        if nome == "mongo":
+            db['persistencia_usuarios'].delete_many({})
+            db['persistencia_conversas'].delete_many({})
+        persistencia = PersistenciaMongo(db, update_interval=args.intervalo) if nome == "mongo" else None
+        r = asyncio.run(rodar(persistencia, args.usuarios, args.rodadas))
+        print(f"{nome:<13} {r['updates']:>8} {r['updates_por_s']:>10.0f} {r['gravacoes']:>10} "
+              f"{r['desligamento_ms']:>11.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
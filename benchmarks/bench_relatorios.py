@@ -0,0 +1,143 @@
+# benchmarks/bench_relatorios.py
+"""
+Benchmark do relatório de desempenho por vendedor (Relatório Geral / equipe / autônomos).
+
+Compara, para o período de `--dias` dias, três formas de montar {vendedor: {status_final: n}}:
+
+  legado    -> $group por vendedor com $push de status_final (um item por cliente) + Counter no Python
+  clientes  -> database.relatorios.consulta_desempenho(origem="clientes"): contagem no servidor
+  rollups   -> database.relatorios.consulta_desempenho(origem="rollups"): o que os handlers usam
+
+Mede os bytes de resposta do servidor (aggregate + getMore, via CommandListener) e a latência.
+O banco `bench_relatorios` do MongoDB informado é apagado e populado.
+
+Uso: python -m benchmarks.bench_relatorios --mongo-uri mongodb://localhost:27017
+                                           [--leads 200000] [--vendedores 50] [--dias 30] [--repeticoes 20]
+"""
+import sys
+import time
+import random
+import argparse
+import statistics
+from collections import Counter
+from datetime import datetime, timedelta, UTC
+import bson
+import pymongo
+from pymongo import monitoring
+
+from database.indices import aplicar_indices
+from database.rollups import COLECAO_ROLLUPS, pipeline_reconstrucao
+from database.relatorios import ORIGEM_CLIENTES, ORIGEM_ROLLUPS, consulta_desempenho, mapa_desempenho
+
+STATUS = ["✅ Contatado", "❌ Sem Interesse", "💰 Venda Fechada", "📞 Sem Resposta",
+          "Consulta: Sem Saldo", "Consulta: Nao Autorizado", "Consulta: Nao Elegivel"]
+TAMANHO_LOTE = 10000
+
+
+class MedidorBytes(monitoring.CommandListener):
+    """Soma o tamanho em BSON das respostas de aggregate/getMore."""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        if event.command_name in ("aggregate", "getMore"):
+            self.bytes += len(bson.encode(event.reply))
+
+    def failed(self, event):
+        pass
+
+
+def popular_banco(db, leads: int, vendedores: int, dias: int) -> list:
+    for nome in db.list_collection_names():
+        db.drop_collection(nome)
+    ids_vendedores = [bson.ObjectId() for _ in range(vendedores)]
+    agora = datetime.now(UTC)
+    lote = []
+    for i in range(leads):
+        lote.append({
+            "nome_cliente": f"Cliente {i}", "cpf": f"{i:011d}", "telefone": f"119{i:08d}", "nome_base": "Base Bench",
+            "status": "Concluido", "vendedor_atribuido": random.choice(ids_vendedores),
+            "status_final": random.choice(STATUS),
+            "data_finalizacao": agora - timedelta(seconds=random.randint(0, dias * 86400)),
+        })
+        if len(lote) == TAMANHO_LOTE:
+            db['clientes'].insert_many(lote)
+            lote = []
+    if lote:
+        db['clientes'].insert_many(lote)
+    db['clientes'].aggregate(pipeline_reconstrucao() + [{"$out": COLECAO_ROLLUPS}])
+    aplicar_indices(db)
+    return ids_vendedores
+
+
+def legado(db, ids_vendedores, inicio_utc, fim_utc) -> dict:
+    pipeline = [
+        {"$match": {"vendedor_atribuido": {"$in": ids_vendedores},
+                    "data_finalizacao": {"$gte": inicio_utc, "$lte": fim_utc}}},
+        {"$group": {"_id": "$vendedor_atribuido", "total_finalizados": {"$sum": 1},
+                    "status_counts": {"$push": "$status_final"}}},
+        {"$sort": {"total_finalizados": -1}},
+    ]
+    return {doc['_id']: dict(Counter(doc['status_counts'])) for doc in db['clientes'].aggregate(pipeline)}
+
+
+def agrupado(origem: str):
+    def _rodar(db, ids_vendedores, inicio_utc, fim_utc) -> dict:
+        colecao, pipeline, indice = consulta_desempenho(ids_vendedores, inicio_utc, fim_utc, origem)
+        resultados = (mapa_desempenho(doc) for doc in db[colecao].aggregate(pipeline, hint=indice))
+        return {res['_id']: res['status_counts'] for res in resultados}
+    return _rodar
+
+
+def medir(db, medidor, funcao, ids_vendedores, inicio_utc, fim_utc, repeticoes: int) -> dict:
+    esperado = funcao(db, ids_vendedores, inicio_utc, fim_utc)  # aquecimento
+    medidor.bytes = 0
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(db, ids_vendedores, inicio_utc, fim_utc)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        "resultado": esperado,
+        "bytes": medidor.bytes / repeticoes,
+        "p50_ms": statistics.median(tempos),
+        "max_ms": max(tempos),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", required=True)
+    parser.add_argument("--leads", type=int, default=200000)
+    parser.add_argument("--vendedores", type=int, default=50)
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    medidor = MedidorBytes()
+    db = pymongo.MongoClient(args.mongo_uri, event_listeners=[medidor])['bench_relatorios']
+    print(f"Populando {args.leads} clientes finalizados em {args.dias} dias...")
+    ids_vendedores = popular_banco(db, args.leads, args.vendedores, args.dias)
+
+    fim_utc = datetime.now(UTC)
+    inicio_utc = fim_utc - timedelta(days=args.dias)
+    variantes = [("legado", legado), ("clientes", agrupado(ORIGEM_CLIENTES)), ("rollups", agrupado(ORIGEM_ROLLUPS))]
+
+    print(f"{'variante':<10} {'bytes/relatório':>16} {'p50':>9} {'máx':>9}  resultado")
+    referencia = None
+    for nome, funcao in variantes:
+        r = medir(db, medidor, funcao, ids_vendedores, inicio_utc, fim_utc, args.repeticoes)
+        if referencia is None:
+            referencia = r["resultado"]
+        # Rollups agregam por dia inteiro: nas bordas do período podem contar alguns clientes a mais.
+        igual = "igual ao legado" if r["resultado"] == referencia else "difere (bordas do período)"
+        print(f"{nome:<10} {r['bytes']:>16,.0f} {r['p50_ms']:>7.1f}ms {r['max_ms']:>7.1f}ms  {igual}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# benchmarks/bench_teclados.py
+"""
+Microbenchmark dos teclados dos handlers: alocações e tempo por update para obter o markup.
+
+Compara a montagem a cada chamada (como os handlers faziam: codificar o callback_data, criar os
+botões e o markup) com o registro de handlers/teclados.py. A montagem "legado" refaz exatamente
+os mesmos teclados, a partir de uma receita (texto, ação, argumentos) extraída uma vez do registro,
+fora da medição. As alocações são medidas com tracemalloc, mantendo vivos os markups de todos os
+updates (como ficariam durante o envio): blocos e bytes por update.
+
+Uso: python -m benchmarks.bench_teclados [--updates 10000]
+"""
+import sys
+import time
+import argparse
+import tracemalloc
+from bson.objectid import ObjectId
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
+
+from handlers import callbacks, teclados
+
+SUPERVISOR_ID = ObjectId()
+
+# handler -> função que obtém o markup pelo registro
+CENARIOS = {
+    "start_consulta": lambda: teclados.BANCOS,
+    "select_bank": lambda: teclados.RESULTADOS_CONSULTA,
+    "filtrar_start": lambda: teclados.FILTROS,
+    "get_password": lambda: teclados.menu_principal("supervisor"),
+    "admin_panel": lambda: teclados.PAINEL_ADMIN,
+    "relatorios_panel_inicial": lambda: teclados.painel_relatorios("administrador"),
+    "selecionar_periodo_para_relatorio": lambda: teclados.periodos_relatorio("geral"),
+    "selecionar_periodo_para_supervisor": lambda: teclados.periodos_supervisor(SUPERVISOR_ID),
+    "gerar_relatorio_de_supervisor": lambda: teclados.relatorio_supervisor_gerado(SUPERVISOR_ID, "hoje"),
+}
+
+
+def _receita(markup):
+    """Função que monta, a cada chamada, um markup igual a `markup` (o trabalho que os handlers faziam)."""
+    if isinstance(markup, ReplyKeyboardMarkup):
+        linhas = [[botao.text for botao in linha] for linha in markup.keyboard]
+        return lambda: ReplyKeyboardMarkup([[KeyboardButton(texto) for texto in linha] for linha in linhas],
+                                           resize_keyboard=markup.resize_keyboard)
+    linhas = [[(botao.text, *callbacks.decodificar(botao.callback_data)) for botao in linha]
+              for linha in markup.inline_keyboard]
+    return lambda: InlineKeyboardMarkup([
+        [InlineKeyboardButton(texto, callback_data=acao.codificar(*args)) for texto, acao, args in linha]
+        for linha in linhas
+    ])
+
+
+def _blocos() -> int:
+    return sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+
+
+def medir(obter, updates: int) -> dict:
+    vivos = [None] * updates
+    obter()
+
+    tracemalloc.start()
+    blocos_antes = _blocos()
+    bytes_antes = tracemalloc.get_traced_memory()[0]
+    for i in range(updates):
+        vivos[i] = obter()
+    bytes_depois = tracemalloc.get_traced_memory()[0]
+    blocos_depois = _blocos()
+    tracemalloc.stop()
+
+    inicio = time.perf_counter()
+    for i in range(updates):
+        vivos[i] = obter()
+    segundos = time.perf_counter() - inicio
+
+    return {
+        "blocos": (blocos_depois - blocos_antes) / updates,
+        "bytes": (bytes_depois - bytes_antes) / updates,
+        "us": segundos / updates * 1e6,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'handler':<36} {'estratégia':<9} {'blocos/update':>14} {'bytes/update':>13} {'µs/update':>10}")
+    totais = {"legado": [0.0, 0.0, 0.0], "registro": [0.0, 0.0, 0.0]}
+    for handler, obter in CENARIOS.items():
+        for estrategia, funcao in (("legado", _receita(obter())), ("registro", obter)):
+            r = medir(funcao, args.updates)
+            for i, chave in enumerate(("blocos", "bytes", "us")):
+                totais[estrategia][i] += r[chave]
+            print(f"{handler:<36} {estrategia:<9} {r['blocos']:>14.1f} {r['bytes']:>13.0f} {r['us']:>10.2f}")
+
+    n = len(CENARIOS)
+    for estrategia, (blocos, bytes_, us) in totais.items():
+        print(f"{'média':<36} {estrategia:<9} {blocos / n:>14.1f} {bytes_ / n:>13.0f} {us / n:>10.2f}")
+    for nome, info in teclados.info_cache().items():
+        print(f"cache {nome}: {info.hits} acertos, {info.misses} faltas, {info.currsize}/{info.maxsize}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
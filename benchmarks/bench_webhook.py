@@ -0,0 +1,223 @@
+# benchmarks/bench_webhook.py
+"""
+Teste de carga: reproduz um fluxo gravado de updates contra o bot completo e mede a latência
+dos handlers (p50/p99) em dois modos:
+
+  polling  -> updates processados um por vez (como o run_polling sem concurrent_updates)
+  webhook  -> servidor de webhook local + ProcessadorPorUsuario (concorrente, em ordem por usuário)
+
+A latência é medida da entrega do update ao bot até o fim do último handler. A Bot API é a falsa
+de benchmarks.telegram_falso, com `--latencia-ms` imitando a ida e volta ao Telegram. O banco
+`bench_webhook` do MongoDB informado é apagado e populado com vendedores, sessões e leads.
+
+A gravação é um JSONL com {"t": segundos desde o início, "update": <update do Telegram>}.
+Sem `--gravacao`, um fluxo sintético é gerado (e pode ser salvo com `--salvar`).
+
+Uso: python -m benchmarks.bench_webhook --mongo-uri mongodb://localhost:27017
+                                         [--vendedores 50] [--ciclos 5] [--taxa 100] [--latencia-ms 30]
+                                         [--gravacao fluxo.jsonl] [--salvar fluxo.jsonl]
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timedelta, UTC
+import httpx
+import pymongo
+from telegram import Update
+from telegram.ext import TypeHandler
+
+from bot import construir_aplicacao
+from benchmarks.telegram_falso import RequisicaoFalsa, mensagem, callback
+from database.rollups import chave_rollup
+from handlers import callbacks
+
+NOME_BASE = "Base Bench"
+ID_ADMIN = 500
+PRIMEIRO_ID_VENDEDOR = 1000
+PORTA_WEBHOOK = 8787
+SEGREDO_WEBHOOK = "bench"
+
+
+def popular_banco(db, vendedores: int, leads: int) -> None:
+    for nome in db.list_collection_names():
+        db.drop_collection(nome)
+    agora = datetime.now(UTC)
+    db['bases'].insert_one({"nome_base": NOME_BASE, "ativa": True, "data_importacao": agora})
+    db['mensagens'].insert_one({"nome": "Padrão", "texto": "Olá {cliente}, aqui é {vendedor}!", "ativo": True})
+
+    usuarios = [(ID_ADMIN, "Admin Bench", "administrador")]
+    usuarios += [(PRIMEIRO_ID_VENDEDOR + i, f"Vendedor {i}", "vendedor") for i in range(vendedores)]
+    ids_vendedores = []
+    for usuario_telegram, nome, role in usuarios:
+        vendedor_id = db['vendedores'].insert_one({
+            "nome_vendedor": nome, "usuario_login": f"login{usuario_telegram}", "role": role,
+            "supervisor_id": None, "usuario_telegram": usuario_telegram,
+        }).inserted_id
+        db['sessoes'].insert_one({
+            "_id": usuario_telegram,
+            "vendedor_logado": {"_id": vendedor_id, "nome": nome, "role": role},
+            "criada_em": agora, "expira_em": agora + timedelta(hours=16),
+        })
+        if role == "vendedor":
+            ids_vendedores.append(vendedor_id)
+
+    db['clientes'].insert_many([
+        {"nome_cliente": f"Cliente {i}", "cpf": f"{i:011d}", "telefone": f"119{i:08d}",
+         "status": "Pendente", "nome_base": NOME_BASE}
+        for i in range(leads)
+    ])
+
+    # Histórico do mês para os relatórios terem o que agregar.
+    finalizados = []
+    for i in range(leads // 2):
+        vendedor_id = random.choice(ids_vendedores)
+        status_final = random.choice(["✅ Contatado", "❌ Sem Interesse", "💰 Venda Fechada"])
+        data = agora - timedelta(hours=random.randint(0, 24 * 20))
+        finalizados.append({
+            "nome_cliente": f"Antigo {i}", "telefone": f"118{i:08d}", "status": "Concluido", "nome_base": NOME_BASE,
+            "vendedor_atribuido": vendedor_id, "status_final": status_final, "data_finalizacao": data,
+        })
+        db['rollups_diarios'].update_one(chave_rollup(data, vendedor_id, status_final, NOME_BASE),
+                                         {"$inc": {"total": 1}}, upsert=True)
+    if finalizados:
+        db['clientes'].insert_many(finalizados)
+
+
+def gerar_fluxo(vendedores: int, ciclos: int, taxa: float) -> list:
+    """Cada vendedor: /proximo -> finaliza -> /hoje -> /meucliente; o admin pede relatórios no meio."""
+    roteiros = []
+    for i in range(vendedores):
+        uid = PRIMEIRO_ID_VENDEDOR + i
+        roteiro = []
+        for _ in range(ciclos):
+            roteiro += [mensagem(uid, "/proximo"), callback(uid, callbacks.STATUS.codificar("contatado")),
+                        mensagem(uid, "/hoje"), mensagem(uid, "/meucliente")]
+        roteiros.append(roteiro)
+    roteiros.append([callback(ID_ADMIN, dado) for _ in range(ciclos)
+                     for dado in (callbacks.RELATORIO_GERAL.codificar("mes_atual"),
+                                  callbacks.RELATORIO_TOTAIS.codificar("mes_atual"))])
+
+    # Intercala os roteiros mantendo a ordem de cada usuário; cliques de um mesmo usuário chegam colados.
+    fluxo, t = [], 0.0
+    pendentes = [list(r) for r in roteiros]
+    while pendentes:
+        roteiro = random.choice(pendentes)
+        for _ in range(random.randint(1, 2)):
+            if roteiro:
+                fluxo.append({"t": round(t, 4), "update": roteiro.pop(0)})
+                t += random.expovariate(taxa)
+        pendentes = [r for r in pendentes if r]
+    return fluxo
+
+
+def _percentil(valores: list, p: float) -> float:
+    if len(valores) < 2:
+        return valores[0] if valores else 0.0
+    return statistics.quantiles(valores, n=100, method='inclusive')[int(p) - 1]
+
+
+async def rodar(modo: str, db, fluxo: list, latencia_s: float) -> dict:
+    request = RequisicaoFalsa(latencia_s=latencia_s)
+    request.guardar_enviadas = True
+    application = construir_aplicacao(
+        db, "1:bench", max_simultaneos=64 if modo == "webhook" else 1,
+        intervalo_persistencia=60, request=request,
+    )
+
+    entregues, latencias = {}, []
+
+    async def _registrar_fim(update, context):
+        latencias.append(time.perf_counter() - entregues.pop(update.update_id))
+
+    application.add_handler(TypeHandler(Update, _registrar_fim), group=1000)
+
+    await application.initialize()
+    if modo == "webhook":
+        await application.updater.start_webhook(
+            listen="127.0.0.1", port=PORTA_WEBHOOK, url_path="telegram",
+            webhook_url=f"http://127.0.0.1:{PORTA_WEBHOOK}/telegram", secret_token=SEGREDO_WEBHOOK,
+        )
+    await application.start()
+
+    # Como o Telegram, entrega os updates de um mesmo usuário um de cada vez (e em ordem).
+    conexoes = {}
+
+    async with httpx.AsyncClient() as http:
+        async def _entregar(item):
+            entregues[item["update"]["update_id"]] = time.perf_counter()
+            if modo == "webhook":
+                usuario = Update.de_json(item["update"], application.bot).effective_user.id
+                async with conexoes.setdefault(usuario, asyncio.Lock()):
+                    resposta = await http.post(f"http://127.0.0.1:{PORTA_WEBHOOK}/telegram", json=item["update"],
+                                               headers={"X-Telegram-Bot-Api-Secret-Token": SEGREDO_WEBHOOK})
+                resposta.raise_for_status()
+            else:
+                await application.update_queue.put(Update.de_json(item["update"], application.bot))
+
+        inicio = time.perf_counter()
+        envios = []
+        for item in fluxo:
+            espera = inicio + item["t"] - time.perf_counter()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            envios.append(asyncio.create_task(_entregar(item)))
+        await asyncio.gather(*envios)
+        while entregues:
+            await asyncio.sleep(0.01)
+        duracao = time.perf_counter() - inicio
+
+    if modo == "webhook":
+        await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+
+    erros_de_sessao = sum(1 for metodo, parametros in request.enviadas
+                          if "erro de sessão" in str(parametros.get("text", "")))
+    latencias_ms = [l * 1000 for l in latencias]
+    return {
+        "updates": len(latencias_ms),
+        "duracao_s": duracao,
+        "p50_ms": _percentil(latencias_ms, 50),
+        "p99_ms": _percentil(latencias_ms, 99),
+        "max_ms": max(latencias_ms, default=0.0),
+        "erros_de_sessao": erros_de_sessao,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", required=True)
+    parser.add_argument("--vendedores", type=int, default=50)
+    parser.add_argument("--ciclos", type=int, default=5)
+    parser.add_argument("--taxa", type=float, default=100.0, help="updates por segundo do fluxo sintético")
+    parser.add_argument("--latencia-ms", type=float, default=30.0, help="latência simulada da Bot API")
+    parser.add_argument("--gravacao", help="JSONL com o fluxo gravado a reproduzir")
+    parser.add_argument("--salvar", help="salva o fluxo sintético neste arquivo")
+    args = parser.parse_args()
+
+    if args.gravacao:
+        with open(args.gravacao, encoding="utf-8") as f:
+            fluxo = [json.loads(linha) for linha in f if linha.strip()]
+    else:
+        fluxo = gerar_fluxo(args.vendedores, args.ciclos, args.taxa)
+        if args.salvar:
+            with open(args.salvar, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(item, ensure_ascii=False) + "\n" for item in fluxo)
+
+    db = pymongo.MongoClient(args.mongo_uri)['bench_webhook']
+    print(f"Reproduzindo {len(fluxo)} updates ({fluxo[-1]['t']:.1f}s de fluxo).")
+    print(f"{'modo':<8} {'updates':>8} {'duração':>9} {'p50':>9} {'p99':>9} {'máx':>9} {'erros sessão':>13}")
+    for modo in ("polling", "webhook"):
+        popular_banco(db, args.vendedores, leads=args.vendedores * args.ciclos * 4)
+        r = asyncio.run(rodar(modo, db, fluxo, args.latencia_ms / 1000))
+        print(f"{modo:<8} {r['updates']:>8} {r['duracao_s']:>8.1f}s {r['p50_ms']:>7.0f}ms {r['p99_ms']:>7.0f}ms "
+              f"{r['max_ms']:>7.0f}ms {r['erros_de_sessao']:>13}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
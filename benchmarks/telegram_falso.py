@@ -0,0 +1,96 @@
+# benchmarks/telegram_falso.py
+"""
+Bot API falsa para benchmarks e testes de carga.
+
+`RequisicaoFalsa` substitui a camada HTTP do python-telegram-bot: toda chamada da API
+(sendMessage, editMessageText, answerCallbackQuery, ...) é respondida localmente com um
+payload mínimo válido, após uma latência opcional que imita a ida e volta ao Telegram.
+Os geradores `mensagem()` e `callback()` montam updates no formato que o Telegram envia.
+"""
+import json
+import time
+import asyncio
+import itertools
+from collections import Counter
+from telegram.request import BaseRequest
+
+BOT_ID = 999000
+_ids_update = itertools.count(1)
+_ids_mensagem = itertools.count(1)
+
+
+def _usuario(user_id: int, is_bot: bool = False) -> dict:
+    return {"id": user_id, "is_bot": is_bot, "first_name": f"Usuario{user_id}", "username": f"usuario{user_id}"}
+
+
+def _mensagem_dict(chat_id: int, texto: str = "", remetente: int = BOT_ID) -> dict:
+    return {
+        "message_id": next(_ids_mensagem),
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": _usuario(remetente, is_bot=remetente == BOT_ID),
+        "text": texto,
+    }
+
+
+def mensagem(user_id: int, texto: str) -> dict:
+    """Update de mensagem de texto (ou comando, se começar com '/')."""
+    msg = _mensagem_dict(user_id, texto, remetente=user_id)
+    if texto.startswith('/'):
+        msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(texto.split()[0])}]
+    return {"update_id": next(_ids_update), "message": msg}
+
+
+def callback(user_id: int, data: str, texto_mensagem: str = "") -> dict:
+    """Update de clique em botão inline."""
+    return {
+        "update_id": next(_ids_update),
+        "callback_query": {
+            "id": str(next(_ids_update)),
+            "from": _usuario(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": _mensagem_dict(user_id, texto_mensagem),
+        },
+    }
+
+
+class RequisicaoFalsa(BaseRequest):
+    def __init__(self, latencia_s: float = 0.0):
+        self.latencia_s = latencia_s
+        self.chamadas = Counter()
+        self.enviadas = []
+        self.guardar_enviadas = False
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        metodo = url.rsplit('/', 1)[-1]
+        self.chamadas[metodo] += 1
+        if self.latencia_s:
+            await asyncio.sleep(self.latencia_s)
+
+        parametros = request_data.parameters if request_data else {}
+        if self.guardar_enviadas:
+            self.enviadas.append((metodo, parametros))
+
+        if metodo == "getMe":
+            resultado = {**_usuario(BOT_ID, is_bot=True), "can_join_groups": False,
+                         "can_read_all_group_messages": False, "supports_inline_queries": False}
+        elif metodo == "getUpdates":
+            resultado = []
+        elif metodo in ("sendMessage", "editMessageText", "sendDocument", "editMessageReplyMarkup"):
+            chat_id = int(parametros.get("chat_id") or 0)
+            resultado = _mensagem_dict(chat_id, str(parametros.get("text", "")))
+        else:
+            resultado = True
+        return 200, json.dumps({"ok": True, "result": resultado}).encode()
@@ -2,14 +2,15 @@
 
 import os
 import logging
+from datetime import timedelta
 from dotenv import load_dotenv
 import pymongo
 from telegram.ext import (
     Application,
     CommandHandler,
-    CallbackQueryHandler,
     ConversationHandler,
     MessageHandler,
+    TypeHandler,
     filters,
 )
 
@@ -18,33 +19,101 @@ from handlers.vendedor_handlers import *
 from handlers.supervisor_handlers import *
 from handlers.admin_handlers import *
 from handlers.relatorios_handlers import *
+from handlers import callbacks
+from handlers.callbacks import RoteadorCallbacks, em_conversa
+from database.indices import aplicar_indices
+from database.repositorio import Repositorio
+from services.fila_leads import FilaLeads
+from services.templates_mensagem import CacheTemplates
+from services.autenticacao import Autenticador
+from services.persistencia import PersistenciaMongo
+from services.processamento_updates import ProcessadorPorUsuario
+from services.expiracao_leads import RecolhedorLeases
+from services.reconciliacao_contadores import ReconciliadorContadores
+from services.cache_relatorios import CacheRelatorios
+from services.metricas import Metricas, ListenerComandosMongo, ServidorMetricas, instrumentar_handlers
 
 
-def main() -> None:
-    load_dotenv()
-    TOKEN = os.getenv('TELEGRAM_TOKEN')
-    MONGO_URI = os.getenv('MONGO_URI')
+async def iniciar_servicos(application: Application) -> None:
+    repositorio = application.bot_data.get('repositorio')
+    if repositorio is not None and await repositorio.rollups_pendentes():
+        # Relatórios e desempenho leem só dos rollups: sem eles, tudo sairia zerado.
+        logging.error("A coleção rollups_diarios está vazia, mas há clientes finalizados: os relatórios sairão "
+                      "zerados. Rode 'python -m Gerencial.reconstruir_rollups' (ver README.md).")
+    servidor = application.bot_data.get('servidor_metricas')
+    if servidor is not None:
+        await servidor.iniciar()
 
-    application = Application.builder().token(TOKEN).build()
 
-    try:
-        client = pymongo.MongoClient(MONGO_URI)
-        db = client['bot_vendas']
+async def encerrar_servicos(application: Application) -> None:
+    servidor = application.bot_data.get('servidor_metricas')
+    if servidor is not None:
+        await servidor.parar()
+    for chave in ('autenticador', 'repositorio'):
+        servico = application.bot_data.get(chave)
+        if servico is not None:
+            servico.fechar()
 
-        application.bot_data['vendedores_collection'] = db['vendedores']
-        application.bot_data['clientes_collection'] = db['clientes']
-        application.bot_data['mensagens_collection'] = db['mensagens']
-        application.bot_data['bases'] = db['bases']
 
-        print("Conectado ao MongoDB para o bot.")
-    except Exception as e:
-        print(f"Erro ao conectar ao MongoDB: {e}")
-        return
+def construir_aplicacao(db, token: str, max_simultaneos: int = 1, intervalo_persistencia: float = 10.0,
+                        mongo_max_workers: int = 16, login_max_workers: int = 4, request=None,
+                        lease_atendimento_min: float = 240, intervalo_recolhedor_s: float = 300,
+                        intervalo_reconciliacao_s: float = 900, metricas: Metricas = None,
+                        porta_metricas: int = None, host_metricas: str = "127.0.0.1",
+                        pre_reserva_leads_s: float = 0) -> Application:
+    """
+    Monta o Application com os serviços em bot_data e todos os handlers registrados.
+    `max_simultaneos` > 1 liga o processamento concorrente (em ordem por usuário).
+    Leads em atendimento há mais de `lease_atendimento_min` minutos voltam para a fila
+    (varredura a cada `intervalo_recolhedor_s` segundos). Os contadores do painel do admin são
+    conferidos na inicialização e a cada `intervalo_reconciliacao_s` segundos.
+    Todos os handlers são medidos em `metricas` (criada aqui se não vier); com `porta_metricas`,
+    elas ficam expostas em http://host_metricas:porta_metricas/metrics.
+    Com `pre_reserva_leads_s` > 0, cada finalização já separa o próximo lead do vendedor por até esse
+    tempo (ver FilaLeads.agendar_pre_reserva).
+    `request` substitui a camada HTTP da Bot API (usado pelos benchmarks).
+    """
+    builder = (
+        Application.builder()
+        .token(token)
+        .persistence(PersistenciaMongo(db, update_interval=intervalo_persistencia))
+        .post_init(iniciar_servicos)
+        .post_shutdown(encerrar_servicos)
+    )
+    if max_simultaneos > 1:
+        builder = builder.concurrent_updates(ProcessadorPorUsuario(max_simultaneos))
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    application = builder.build()
+
+    repositorio = Repositorio(db, max_workers=mongo_max_workers)
+    application.bot_data['repositorio'] = repositorio
+    application.bot_data['fila_leads'] = FilaLeads(repositorio, validade_pre_reserva_s=pre_reserva_leads_s)
+    application.bot_data['templates_mensagem'] = CacheTemplates(repositorio)
+    application.bot_data['autenticador'] = Autenticador(repositorio, max_workers=login_max_workers)
+    application.bot_data['cache_relatorios'] = CacheRelatorios()
+    metricas = metricas or Metricas()
+    application.bot_data['metricas'] = metricas
+    if porta_metricas:
+        application.bot_data['servidor_metricas'] = ServidorMetricas(metricas, host_metricas, porta_metricas)
+
+    recolhedor = RecolhedorLeases(repositorio, application.bot_data['fila_leads'],
+                                  validade=timedelta(minutes=lease_atendimento_min))
+    application.bot_data['recolhedor_leases'] = recolhedor
+    application.job_queue.run_repeating(recolhedor.executar, interval=intervalo_recolhedor_s,
+                                        first=min(60, intervalo_recolhedor_s), name="recolher_leases")
+
+    reconciliador = ReconciliadorContadores(repositorio)
+    application.bot_data['reconciliador_contadores'] = reconciliador
+    application.job_queue.run_repeating(reconciliador.executar, interval=intervalo_reconciliacao_s,
+                                        first=5, name="reconciliar_contadores")
 
     # -------------------------------
     # Conversações
     # -------------------------------
     login_conv_handler = ConversationHandler(
+        name="login",
+        persistent=True,
         entry_points=[CommandHandler("login", login_start)],
         states={
             USERNAME: [
@@ -60,41 +129,51 @@ def main() -> None:
     )
 
     search_conv_handler = ConversationHandler(
+        name="buscar",
+        persistent=True,
         entry_points=[CommandHandler("buscar", buscar_start)],
         states={GET_PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, buscar_telefone)]},
         fallbacks=[CommandHandler("cancel", cancel)],
     )
 
     consulta_conv_handler = ConversationHandler(
-        entry_points=[CallbackQueryHandler(start_consulta, pattern="^start_consulta_")],
+        name="consulta",
+        persistent=True,
+        entry_points=[em_conversa(callbacks.CONSULTA, start_consulta)],
         states={
-            SELECT_BANK: [CallbackQueryHandler(select_bank, pattern="^banco_")],
-            SELECT_RESULT: [CallbackQueryHandler(select_result, pattern="^resultado_")],
+            SELECT_BANK: [em_conversa(callbacks.BANCO, select_bank)],
+            SELECT_RESULT: [em_conversa(callbacks.RESULTADO, select_result)],
             GET_BALANCE_AMOUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_balance_amount)],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
     )
 
     add_note_conv_handler = ConversationHandler(
-        entry_points=[CallbackQueryHandler(add_note_start, pattern="^add_note_")],
+        name="adicionar_nota",
+        persistent=True,
+        entry_points=[em_conversa(callbacks.NOTA, add_note_start)],
         states={GET_NOTE: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_note_text)]},
         fallbacks=[CommandHandler("cancel", cancel)],
     )
 
     admin_add_user_conv_handler = ConversationHandler(
-        entry_points=[CallbackQueryHandler(admin_add_user_start, pattern="^admin_add_user$")],
+        name="admin_adicionar_usuario",
+        persistent=True,
+        entry_points=[em_conversa(callbacks.ADMIN_NOVO_USUARIO, admin_add_user_start)],
         states={
             GET_NEW_USER_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_new_user_name)],
             GET_NEW_USER_LOGIN: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_new_user_login)],
             GET_NEW_USER_PASS: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_new_user_password)],
-            GET_NEW_USER_ROLE: [CallbackQueryHandler(get_new_user_role, pattern="^role_")],
-            GET_NEW_USER_SUPERVISOR: [CallbackQueryHandler(get_new_user_supervisor, pattern="^supervisor_")],
+            GET_NEW_USER_ROLE: [em_conversa(callbacks.FUNCAO, get_new_user_role)],
+            GET_NEW_USER_SUPERVISOR: [em_conversa(callbacks.SUPERVISOR, get_new_user_supervisor)],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
     )
 
     add_msg_conv_handler = ConversationHandler(
-        entry_points=[CallbackQueryHandler(admin_add_message_start, pattern="^admin_add_msg$")],
+        name="admin_adicionar_mensagem",
+        persistent=True,
+        entry_points=[em_conversa(callbacks.ADMIN_NOVA_MENSAGEM, admin_add_message_start)],
         states={
             GET_MSG_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_msg_name)],
             GET_MSG_TEXT: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_msg_text)],
@@ -103,19 +182,21 @@ def main() -> None:
     )
 
     edit_user_conv_handler = ConversationHandler(
-        entry_points=[CallbackQueryHandler(admin_edit_user_start, pattern="^admin_edit_user$")],
+        name="admin_editar_usuario",
+        persistent=True,
+        entry_points=[em_conversa(callbacks.ADMIN_EDITAR_USUARIOS, admin_edit_user_start)],
         states={
-            SELECT_USER_TO_EDIT: [CallbackQueryHandler(select_user_to_edit, pattern="^edit_user_")],
+            SELECT_USER_TO_EDIT: [em_conversa(callbacks.EDITAR_USUARIO, select_user_to_edit)],
             CHOOSE_EDIT_ACTION: [
-                CallbackQueryHandler(prompt_change_role, pattern="^edit_choice_role$"),
-                CallbackQueryHandler(prompt_change_supervisor, pattern="^edit_choice_supervisor$"),
-                CallbackQueryHandler(admin_edit_user_start, pattern="^admin_edit_user_start$")
+                em_conversa(callbacks.EDITAR_FUNCAO, prompt_change_role),
+                em_conversa(callbacks.EDITAR_SUPERVISOR, prompt_change_supervisor),
+                em_conversa(callbacks.ADMIN_EDITAR_USUARIOS, admin_edit_user_start)
             ],
-            EDIT_USER_ROLE: [CallbackQueryHandler(update_user_role, pattern="^role_")],
-            EDIT_USER_SUPERVISOR: [CallbackQueryHandler(update_user_supervisor, pattern="^new_supervisor_")],
+            EDIT_USER_ROLE: [em_conversa(callbacks.FUNCAO, update_user_role)],
+            EDIT_USER_SUPERVISOR: [em_conversa(callbacks.NOVO_SUPERVISOR, update_user_supervisor)],
         },
         fallbacks=[
-            CallbackQueryHandler(admin_edit_user_end, pattern="^admin_manage_users$"),
+            em_conversa(callbacks.ADMIN_USUARIOS, admin_edit_user_end),
             CommandHandler("cancel", cancel)
         ],
         per_message=False,
@@ -124,6 +205,7 @@ def main() -> None:
     # -------------------------------
     # Registro de Handlers
     # -------------------------------
+    application.add_handler(TypeHandler(Update, restaurar_sessao), group=-1)
     application.add_handler(CommandHandler("start", start))
     application.add_handler(login_conv_handler)
     application.add_handler(search_conv_handler)
@@ -140,38 +222,116 @@ def main() -> None:
     application.add_handler(CommandHandler("admin", admin_panel))
     application.add_handler(CommandHandler("logout", logout))
     application.add_handler(CommandHandler("relatorios", relatorios_panel_inicial))
+    application.add_handler(CommandHandler("periodo", relatorio_periodo))
+    application.add_handler(CommandHandler("diag", admin_diagnostico))
 
     # -------------------------------
     # Callbacks
     # -------------------------------
-    application.add_handler(CallbackQueryHandler(button_callback, pattern="^status_"))
-    application.add_handler(CallbackQueryHandler(view_client_details, pattern="^view_client_"))
-    application.add_handler(CallbackQueryHandler(listar_clientes_filtrados, pattern="^filtro_"))
-    application.add_handler(CallbackQueryHandler(show_history, pattern="^show_history_"))
-    application.add_handler(CallbackQueryHandler(desempenho_equipe_hoje, pattern="^sup_desempenho_hoje$"))
-    application.add_handler(CallbackQueryHandler(supervisor_back_to_main, pattern="^sup_back_to_main$"))
-    application.add_handler(CallbackQueryHandler(admin_stats_menu, pattern="^admin_stats_menu$"))
-    application.add_handler(CallbackQueryHandler(admin_manage_users, pattern="^admin_manage_users$"))
-    application.add_handler(CallbackQueryHandler(admin_manage_messages, pattern="^admin_manage_messages$"))
-    application.add_handler(CallbackQueryHandler(admin_list_messages, pattern="^admin_list_msg$"))
-    application.add_handler(CallbackQueryHandler(admin_back_to_menu, pattern="^admin_back_to_main$"))
-    application.add_handler(CallbackQueryHandler(admin_stats_geral, pattern="^admin_stats_geral$"))
-    application.add_handler(CallbackQueryHandler(admin_select_supervisor, pattern="^admin_select_supervisor$"))
-    application.add_handler(CallbackQueryHandler(admin_show_supervisor_stats, pattern="^admin_sup_stats_"))
-    application.add_handler(CallbackQueryHandler(admin_show_autonomos_stats, pattern="^admin_stats_autonomos$"))
-    application.add_handler(CallbackQueryHandler(admin_toggle_base_status, pattern="^admin_toggle_base_"))
-    application.add_handler(CallbackQueryHandler(admin_manage_bases, pattern="^admin_manage_bases$"))
-    application.add_handler(CallbackQueryHandler(relatorios_panel_inicial, pattern="^relatorio_voltar_inicial$"))
-    application.add_handler(CallbackQueryHandler(selecionar_periodo_para_relatorio, pattern="^relatorio_geral$"))
-    application.add_handler(CallbackQueryHandler(selecionar_periodo_para_relatorio, pattern="^relatorio_totais$"))
-    application.add_handler(CallbackQueryHandler(selecionar_supervisor_para_relatorio, pattern="^relatorio_por_supervisor$"))
-    application.add_handler(CallbackQueryHandler(gerar_relatorio_geral, pattern="^gerar_relatorio_geral_"))
-    application.add_handler(CallbackQueryHandler(gerar_relatorio_de_totais, pattern="^gerar_relatorio_totais_"))
-    application.add_handler(CallbackQueryHandler(selecionar_periodo_para_supervisor, pattern="^selecionar_periodo_sup_"))
-    application.add_handler(CallbackQueryHandler(gerar_relatorio_de_supervisor, pattern="^gerar_relatorio_sup_"))
-
-    print("Bot iniciado. Pressione Ctrl+C para parar.")
-    application.run_polling()
+    # Um só handler para os botões fora das conversações (ver handlers/callbacks.py); fica por último
+    # para que as conversações em andamento tenham prioridade.
+    roteador = RoteadorCallbacks()
+    for acao, callback in (
+        (callbacks.STATUS, button_callback),
+        (callbacks.VER_CLIENTE, view_client_details),
+        (callbacks.FILTRO, listar_clientes_filtrados),
+        (callbacks.FILTRO_PAGINA, listar_clientes_filtrados),
+        (callbacks.HOJE_PAGINA, clientes_hoje),
+        (callbacks.HISTORICO, show_history),
+        (callbacks.HISTORICO_PAGINA, show_history),
+        (callbacks.SUP_DESEMPENHO_HOJE, desempenho_equipe_hoje),
+        (callbacks.SUP_PAINEL, supervisor_back_to_main),
+        (callbacks.ADMIN_PAINEL, admin_back_to_menu),
+        (callbacks.ADMIN_ESTATISTICAS, admin_stats_menu),
+        (callbacks.ADMIN_ESTATISTICAS_GERAL, admin_stats_geral),
+        (callbacks.ADMIN_ESCOLHER_SUPERVISOR, admin_select_supervisor),
+        (callbacks.ADMIN_ESTATISTICAS_SUPERVISOR, admin_show_supervisor_stats),
+        (callbacks.ADMIN_ESTATISTICAS_AUTONOMOS, admin_show_autonomos_stats),
+        (callbacks.ADMIN_USUARIOS, admin_manage_users),
+        (callbacks.ADMIN_MENSAGENS, admin_manage_messages),
+        (callbacks.ADMIN_LISTAR_MENSAGENS, admin_list_messages),
+        (callbacks.ADMIN_ATIVAR_MENSAGEM, admin_toggle_message_status),
+        (callbacks.ADMIN_BASES, admin_manage_bases),
+        (callbacks.ADMIN_ATIVAR_BASE, admin_toggle_base_status),
+        (callbacks.RELATORIOS, relatorios_panel_inicial),
+        (callbacks.RELATORIO_PERIODOS, selecionar_periodo_para_relatorio),
+        (callbacks.RELATORIO_SUPERVISORES, selecionar_supervisor_para_relatorio),
+        (callbacks.RELATORIO_GERAL, gerar_relatorio_geral),
+        (callbacks.RELATORIO_TOTAIS, gerar_relatorio_de_totais),
+        (callbacks.RELATORIO_PERIODOS_SUPERVISOR, selecionar_periodo_para_supervisor),
+        (callbacks.RELATORIO_SUPERVISOR, gerar_relatorio_de_supervisor),
+        (callbacks.EXPORTAR, exportar_relatorio),
+    ):
+        roteador.registrar(acao, callback)
+    application.add_handler(roteador)
+
+    instrumentar_handlers(application, metricas)
+    return application
+
+
+def main() -> None:
+    load_dotenv()
+    TOKEN = os.getenv('TELEGRAM_TOKEN')
+    MONGO_URI = os.getenv('MONGO_URI')
+    MONGO_MAX_WORKERS = int(os.getenv('MONGO_MAX_WORKERS', '16'))
+    LOGIN_MAX_WORKERS = int(os.getenv('LOGIN_MAX_WORKERS', '4'))
+    PERSISTENCIA_INTERVALO_S = float(os.getenv('PERSISTENCIA_INTERVALO_S', '10'))
+    # polling (padrão) ou webhook
+    BOT_MODO = os.getenv('BOT_MODO', 'polling').lower()
+    UPDATES_SIMULTANEOS = int(os.getenv('UPDATES_SIMULTANEOS', '64'))
+    # Tempo que um lead fica com o vendedor antes de voltar para a fila
+    LEASE_ATENDIMENTO_MIN = float(os.getenv('LEASE_ATENDIMENTO_MIN', '240'))
+    RECOLHEDOR_INTERVALO_S = float(os.getenv('RECOLHEDOR_INTERVALO_S', '300'))
+    CONTADORES_RECONCILIACAO_S = float(os.getenv('CONTADORES_RECONCILIACAO_S', '900'))
+    # Endpoint local do Prometheus; 0 desliga
+    METRICAS_PORTA = int(os.getenv('METRICAS_PORTA', '9464'))
+    METRICAS_ESCUTA = os.getenv('METRICAS_ESCUTA', '127.0.0.1')
+    # Segundos que o próximo lead fica separado para o vendedor após cada finalização; 0 desliga
+    PRE_RESERVA_LEADS_S = float(os.getenv('PRE_RESERVA_LEADS_S', '0'))
+
+    metricas = Metricas()
+
+    try:
+        client = pymongo.MongoClient(MONGO_URI, event_listeners=[ListenerComandosMongo(metricas)])
+        db = client['bot_vendas']
+        aplicar_indices(db)
+        print("Conectado ao MongoDB para o bot.")
+    except Exception as e:
+        print(f"Erro ao conectar ao MongoDB: {e}")
+        return
+
+    application = construir_aplicacao(
+        db, TOKEN,
+        max_simultaneos=UPDATES_SIMULTANEOS,
+        intervalo_persistencia=PERSISTENCIA_INTERVALO_S,
+        mongo_max_workers=MONGO_MAX_WORKERS,
+        login_max_workers=LOGIN_MAX_WORKERS,
+        lease_atendimento_min=LEASE_ATENDIMENTO_MIN,
+        intervalo_recolhedor_s=RECOLHEDOR_INTERVALO_S,
+        intervalo_reconciliacao_s=CONTADORES_RECONCILIACAO_S,
+        metricas=metricas,
+        porta_metricas=METRICAS_PORTA,
+        host_metricas=METRICAS_ESCUTA,
+        pre_reserva_leads_s=PRE_RESERVA_LEADS_S,
+    )
+
+    if BOT_MODO == 'webhook':
+        WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+        if not WEBHOOK_URL:
+            print("ERRO: BOT_MODO=webhook exige WEBHOOK_URL (URL pública que o Telegram vai chamar).")
+            return
+        WEBHOOK_CAMINHO = os.getenv('WEBHOOK_CAMINHO', 'telegram')
+        print(f"Bot iniciado em modo webhook ({WEBHOOK_URL}). Pressione Ctrl+C para parar.")
+        application.run_webhook(
+            listen=os.getenv('WEBHOOK_ESCUTA', '0.0.0.0'),
+            port=int(os.getenv('WEBHOOK_PORTA', '8443')),
+            url_path=WEBHOOK_CAMINHO,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_CAMINHO}",
+            secret_token=os.getenv('WEBHOOK_SEGREDO'),
+        )
+    else:
+        print("Bot iniciado. Pressione Ctrl+C para parar.")
+        application.run_polling()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,52 @@
+# database/contadores.py
+COLECAO_CONTADORES = 'contadores'
+
+# Campo do contador da base para cada status de cliente.
+CAMPOS_STATUS = {"Pendente": "pendentes", "Em_Atendimento": "em_atendimento", "Concluido": "concluidos"}
+
+# Contadores que o painel do admin lê em vez de contar `clientes`:
+#   {_id: "base:<nome_base>", tipo: "base", nome_base, ativa, pendentes, em_atendimento, concluidos}
+#   {_id: "dia:<AAAA-MM-DD>:<status_final>", tipo: "dia", dia, status_final, total}
+# São mantidos com $inc pelo Repositorio e corrigidos periodicamente por Repositorio.reconciliar_contadores().
+
+
+def chave_base(nome_base) -> dict:
+    return {"_id": f"base:{nome_base}"}
+
+
+def chave_dia(dia: str, status_final) -> dict:
+    return {"_id": f"dia:{dia}:{status_final}"}
+
+
+def contador_base_zerado(nome_base, ativa: bool) -> dict:
+    return {"tipo": "base", "nome_base": nome_base, "ativa": ativa, **dict.fromkeys(CAMPOS_STATUS.values(), 0)}
+
+
+def update_mover_base(nome_base, status_anterior, status_novo, quantidade: int = 1) -> dict:
+    """$inc que move `quantidade` clientes de um status para outro no contador da base (upsert=True)."""
+    inc = {}
+    if status_anterior in CAMPOS_STATUS:
+        inc[CAMPOS_STATUS[status_anterior]] = -quantidade
+    if status_novo in CAMPOS_STATUS:
+        inc[CAMPOS_STATUS[status_novo]] = inc.get(CAMPOS_STATUS[status_novo], 0) + quantidade
+    return {"$inc": inc, "$setOnInsert": {"tipo": "base", "nome_base": nome_base}}
+
+
+def update_finalizacao_dia(dia: str, status_final, delta: int) -> dict:
+    return {"$inc": {"total": delta}, "$setOnInsert": {"tipo": "dia", "dia": dia, "status_final": status_final}}
+
+
+def pipeline_contagem_bases(nomes_bases: list) -> list:
+    """Conta os clientes das bases informadas por (nome_base, status): a contagem real usada na reconciliação."""
+    return [
+        {"$match": {"nome_base": {"$in": nomes_bases}, "status": {"$in": list(CAMPOS_STATUS)}}},
+        {"$group": {"_id": {"nome_base": "$nome_base", "status": "$status"}, "total": {"$sum": 1}}},
+    ]
+
+
+def pipeline_contagem_dia(inicio_utc, fim_utc) -> list:
+    """Finalizações por status_final entre `inicio_utc` e `fim_utc` (um dia local)."""
+    return [
+        {"$match": {"status": "Concluido", "data_finalizacao": {"$gte": inicio_utc, "$lte": fim_utc}}},
+        {"$group": {"_id": "$status_final", "total": {"$sum": 1}}},
+    ]
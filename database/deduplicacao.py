@@ -0,0 +1,59 @@
+# database/deduplicacao.py
+import hashlib
+import numpy as np
+
+from database.normalizacao import normalizar_cpf, telefone_nacional
+
+# Novos elementos ficam num set até serem fundidos ao array ordenado.
+_LIMITE_PENDENTES = 1 << 16
+
+
+def _hash64(chave: str) -> int:
+    return int.from_bytes(hashlib.blake2b(chave.encode(), digest_size=8).digest(), 'big')
+
+
+def chaves_cliente(cpf, telefone) -> list:
+    """Hashes de 64 bits do CPF e do telefone normalizados (os que existirem) de um cliente."""
+    chaves = []
+    cpf = normalizar_cpf(cpf)
+    if cpf and cpf.strip('0'):
+        chaves.append(_hash64("cpf:" + cpf))
+    nacional = telefone_nacional(telefone)
+    if nacional:
+        chaves.append(_hash64("tel:" + nacional))
+    return chaves
+
+
+class ConjuntoHashes:
+    """
+    Conjunto de hashes de 64 bits guardado como array numpy ordenado (8 bytes por elemento),
+    consultado com busca binária. 4 milhões de chaves ocupam ~32 MB, contra ~250 MB num set de ints.
+    Inserções vão para um set pequeno e são fundidas ao array de tempos em tempos.
+    """
+
+    def __init__(self):
+        self._ordenado = np.empty(0, dtype=np.uint64)
+        self._pendentes = set()
+
+    def __len__(self) -> int:
+        return len(self._ordenado) + len(self._pendentes)
+
+    def __contains__(self, chave: int) -> bool:
+        if chave in self._pendentes:
+            return True
+        posicao = np.searchsorted(self._ordenado, np.uint64(chave))
+        return posicao < len(self._ordenado) and int(self._ordenado[posicao]) == chave
+
+    def adicionar(self, chave: int) -> None:
+        self._pendentes.add(chave)
+        if len(self._pendentes) >= _LIMITE_PENDENTES:
+            self._fundir()
+
+    def adicionar_varios(self, chaves) -> None:
+        """Inserção em massa (ex.: carga inicial a partir do banco)."""
+        novos = np.fromiter(chaves, dtype=np.uint64)
+        self._ordenado = np.unique(np.concatenate([self._ordenado, novos]))
+
+    def _fundir(self) -> None:
+        self.adicionar_varios(self._pendentes)
+        self._pendentes = set()
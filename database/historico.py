@@ -0,0 +1,40 @@
+# database/historico.py
+COLECAO_HISTORICO = 'historico_clientes'
+TAMANHO_BUCKET = 50
+
+# Clientes nunca trazem o histórico antigo embutido (ver Gerencial/migrar_observacoes.py).
+PROJECAO_SEM_HISTORICO = {"observacoes": 0}
+
+
+def operacao_registrar(cliente_id, entrada: dict) -> tuple:
+    """
+    (filtro, update) que acrescenta `entrada` ao bucket aberto do cliente, criando um novo
+    quando o atual já tem TAMANHO_BUCKET entradas. Usar com upsert=True.
+
+    Bucket: {cliente_id, inicio, ultima, quantidade, entradas: [{tipo, nota, vendedor_nome, data}, ...]}
+    """
+    filtro = {"cliente_id": cliente_id, "quantidade": {"$lt": TAMANHO_BUCKET}}
+    update = {
+        "$push": {"entradas": entrada},
+        "$inc": {"quantidade": 1},
+        "$min": {"inicio": entrada['data']},
+        "$max": {"ultima": entrada['data']},
+    }
+    return filtro, update
+
+
+def montar_buckets(cliente_id, entradas: list, **extras) -> list:
+    """Documentos de bucket para uma lista de entradas já existente (usado na migração)."""
+    entradas = sorted(entradas, key=lambda e: e['data'])
+    buckets = []
+    for i in range(0, len(entradas), TAMANHO_BUCKET):
+        lote = entradas[i:i + TAMANHO_BUCKET]
+        buckets.append({
+            "cliente_id": cliente_id,
+            "inicio": lote[0]['data'],
+            "ultima": lote[-1]['data'],
+            "quantidade": len(lote),
+            "entradas": lote,
+            **extras,
+        })
+    return buckets
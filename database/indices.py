@@ -0,0 +1,143 @@
+# database/indices.py
+import logging
+from datetime import datetime, timedelta, UTC
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from bson.objectid import ObjectId
+
+# Manifesto de índices: coleção -> índices que as consultas dos handlers precisam.
+INDICES = {
+    'clientes': [
+        IndexModel([("vendedor_atribuido", ASCENDING), ("status", ASCENDING)], name="vendedor_status"),
+        IndexModel([("status", ASCENDING), ("nome_base", ASCENDING)], name="status_base"),
+        IndexModel([("status", ASCENDING), ("data_atribuicao", ASCENDING)], name="status_atribuicao"),
+        IndexModel([("vendedor_atribuido", ASCENDING), ("data_finalizacao", DESCENDING), ("_id", DESCENDING)],
+                   name="vendedor_finalizacao_id"),
+        IndexModel([("vendedor_atribuido", ASCENDING), ("resultado_consulta", ASCENDING), ("_id", DESCENDING)],
+                   name="vendedor_resultado"),
+        IndexModel([("vendedor_atribuido", ASCENDING), ("_id", DESCENDING)], name="vendedor_com_saldo",
+                   partialFilterExpression={"saldo_consulta": {"$gt": 0}}),
+        IndexModel([("data_finalizacao", DESCENDING)], name="finalizacao"),
+        IndexModel([("telefone_normalizado", ASCENDING)], name="telefone_normalizado"),
+        IndexModel([("telefone_reverso", ASCENDING)], name="telefone_reverso"),
+    ],
+    'vendedores': [
+        IndexModel([("usuario_login", ASCENDING)], name="usuario_login"),
+        IndexModel([("supervisor_id", ASCENDING)], name="supervisor"),
+        IndexModel([("role", ASCENDING), ("supervisor_id", ASCENDING)], name="role_supervisor"),
+    ],
+    'bases': [
+        IndexModel([("ativa", ASCENDING)], name="ativa"),
+    ],
+    'mensagens': [
+        IndexModel([("ativo", ASCENDING)], name="ativo"),
+    ],
+    'rollups_diarios': [
+        IndexModel([("dia", ASCENDING), ("vendedor", ASCENDING), ("status_final", ASCENDING), ("nome_base", ASCENDING)],
+                   name="chave_rollup", unique=True),
+        IndexModel([("vendedor", ASCENDING), ("dia", ASCENDING)], name="vendedor_dia"),
+    ],
+    'historico_clientes': [
+        IndexModel([("cliente_id", ASCENDING), ("ultima", DESCENDING)], name="cliente_ultima"),
+    ],
+    'contadores': [
+        IndexModel([("tipo", ASCENDING), ("dia", ASCENDING)], name="tipo_dia"),
+    ],
+    'sessoes': [
+        IndexModel([("expira_em", ASCENDING)], name="expira_em_ttl", expireAfterSeconds=0),
+    ],
+}
+
+# Índices substituídos por outros do manifesto; aplicar_indices() os remove se existirem.
+INDICES_OBSOLETOS = {
+    'clientes': ['vendedor_finalizacao'],  # virou vendedor_finalizacao_id (paginação do /hoje)
+}
+
+
+def consultas_canonicas() -> list:
+    """
+    Uma consulta representativa de cada handler, no formato (nome, coleção, filtro, ordenação).
+    Os valores são fictícios: só o formato importa para o plano de execução.
+    """
+    vendedor_id = ObjectId()
+    fim = datetime.now(UTC)
+    inicio = fim - timedelta(days=1)
+    periodo = {"$gte": inicio, "$lte": fim}
+    return [
+        ("meu_cliente / proximo_cliente", 'clientes', {"vendedor_atribuido": vendedor_id, "status": "Em_Atendimento"}, None),
+        ("fila do /proximo", 'clientes', {"status": "Pendente", "nome_base": "Base"}, None),
+        ("clientes_hoje", 'clientes', {"vendedor_atribuido": vendedor_id, "data_finalizacao": periodo},
+         [("data_finalizacao", -1), ("_id", -1)]),
+        ("filtrar por resultado", 'clientes', {"vendedor_atribuido": vendedor_id, "resultado_consulta": "Sem Saldo",
+                                               "_id": {"$lt": ObjectId()}}, [("_id", -1)]),
+        ("filtrar com saldo", 'clientes', {"vendedor_atribuido": vendedor_id, "saldo_consulta": {"$gt": 0}}, [("_id", -1)]),
+        ("relatórios por vendedor", 'clientes', {"vendedor_atribuido": {"$in": [vendedor_id]}, "data_finalizacao": periodo}, None),
+        ("relatório de totais", 'clientes', {"data_finalizacao": periodo}, None),
+        ("recolhedor de leases", 'clientes', {"status": "Em_Atendimento", "data_atribuicao": {"$lt": inicio}}, None),
+        ("contagem de pendentes", 'clientes', {"status": "Pendente", "nome_base": {"$in": ["Base"]}}, None),
+        ("buscar_telefone (exato)", 'clientes', {"telefone_normalizado": "11999990001"}, None),
+        ("buscar_telefone (final)", 'clientes', {"telefone_reverso": {"$regex": "^1000"}}, None),
+        ("get_password", 'vendedores', {"usuario_login": "login"}, None),
+        ("equipe do supervisor", 'vendedores', {"supervisor_id": vendedor_id}, None),
+        ("lista de supervisores", 'vendedores', {"role": "supervisor"}, None),
+        ("vendedores autônomos", 'vendedores', {"role": "vendedor", "supervisor_id": None}, None),
+        ("bases ativas", 'bases', {"ativa": True}, None),
+        ("mensagens ativas", 'mensagens', {"ativo": True}, None),
+        ("rollups por vendedor", 'rollups_diarios', {"vendedor": {"$in": [vendedor_id]}, "dia": {"$gte": "2025-01-01", "$lte": "2025-01-31"}}, None),
+        ("histórico do cliente", 'historico_clientes', {"cliente_id": vendedor_id}, [("ultima", -1)]),
+        ("painel do admin (contadores)", 'contadores', {"$or": [{"tipo": "base", "ativa": True},
+                                                                {"tipo": "dia", "dia": "2025-01-31"}]}, None),
+        ("rollups de totais", 'rollups_diarios', {"dia": {"$gte": "2025-01-01", "$lte": "2025-01-31"}}, None),
+    ]
+
+
+def aplicar_indices(db) -> None:
+    """
+    Cria os índices do manifesto e depois remove os obsoletos (nessa ordem, para a consulta
+    nunca ficar sem índice). É idempotente: índices já existentes são mantidos.
+    """
+    for nome_colecao, indices in INDICES.items():
+        try:
+            criados = db[nome_colecao].create_indexes(indices)
+            logging.info(f"Índices garantidos em '{nome_colecao}': {', '.join(criados)}")
+        except OperationFailure as e:
+            # Ex.: índice com as mesmas chaves, mas outro nome, criado manualmente.
+            logging.warning(f"Não foi possível criar índices em '{nome_colecao}': {e}")
+
+    for nome_colecao, nomes in INDICES_OBSOLETOS.items():
+        existentes = set(db[nome_colecao].index_information())
+        for nome in nomes:
+            if nome not in existentes:
+                continue
+            try:
+                db[nome_colecao].drop_index(nome)
+                logging.info(f"Índice obsoleto removido de '{nome_colecao}': {nome}")
+            except OperationFailure as e:
+                logging.warning(f"Não foi possível remover o índice '{nome}' de '{nome_colecao}': {e}")
+
+
+def _estagios(plano) -> list:
+    if isinstance(plano, dict):
+        estagios = [plano['stage']] if 'stage' in plano else []
+        for valor in plano.values():
+            estagios.extend(_estagios(valor))
+        return estagios
+    if isinstance(plano, list):
+        return [estagio for item in plano for estagio in _estagios(item)]
+    return []
+
+
+def verificar_consultas(db) -> list:
+    """
+    Roda explain() em cada consulta canônica.
+    Retorna uma lista de (nome, estágios do plano vencedor, ok), onde ok=False indica COLLSCAN.
+    """
+    resultado = []
+    for nome, nome_colecao, filtro, ordenacao in consultas_canonicas():
+        cursor = db[nome_colecao].find(filtro)
+        if ordenacao:
+            cursor = cursor.sort(ordenacao)
+        plano = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+        estagios = _estagios(plano)
+        resultado.append((nome, estagios, 'COLLSCAN' not in estagios))
+    return resultado
@@ -0,0 +1,61 @@
+# database/normalizacao.py
+import re
+
+CODIGO_PAIS = "55"
+_NAO_DIGITOS = re.compile(r'\D')
+
+
+def somente_digitos(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return _NAO_DIGITOS.sub('', str(valor))
+
+
+def telefone_nacional(telefone) -> str:
+    """Dígitos do telefone sem o código do país (DDD + número quando houver DDD)."""
+    digitos = somente_digitos(telefone).lstrip('0')
+    if len(digitos) in (12, 13) and digitos.startswith(CODIGO_PAIS):
+        digitos = digitos[len(CODIGO_PAIS):]
+    return digitos
+
+
+def variantes_telefone(telefone) -> list:
+    """
+    Formas pesquisáveis do telefone: com e sem código do país, com e sem DDD e,
+    para celulares, também sem o nono dígito. Ex.: 5511999990001 ->
+    ['5511999990001', '11999990001', '999990001', '99990001'].
+    """
+    nacional = telefone_nacional(telefone)
+    if not nacional:
+        return []
+
+    variantes = []
+    if len(nacional) in (10, 11):
+        variantes.append(CODIGO_PAIS + nacional)
+    variantes.append(nacional)
+    if len(nacional) in (10, 11):
+        local = nacional[2:]
+        variantes.append(local)
+        if len(local) == 9 and local.startswith('9'):
+            variantes.append(local[1:])
+    return list(dict.fromkeys(variantes))
+
+
+def campos_telefone(telefone) -> dict:
+    """
+    Campos derivados gravados junto do `telefone` do cliente:
+    - telefone_normalizado: variantes para busca exata (índice multikey);
+    - telefone_reverso: número nacional invertido, para buscar por final com regex ancorada no índice.
+    """
+    nacional = telefone_nacional(telefone)
+    return {"telefone_normalizado": variantes_telefone(telefone), "telefone_reverso": nacional[::-1]}
+
+
+def normalizar_cpf(cpf) -> str:
+    """Só os dígitos do CPF, recompondo os zeros à esquerda que planilhas costumam perder."""
+    digitos = somente_digitos(cpf)
+    if not digitos:
+        return ""
+    return digitos.zfill(11) if len(digitos) <= 11 else digitos
@@ -0,0 +1,104 @@
+# database/relatorios.py
+from database.rollups import COLECAO_ROLLUPS, dia_local
+
+# Origens possíveis de um relatório de desempenho: os rollups diários (padrão, poucos documentos)
+# ou os próprios clientes finalizados (ex.: rollups ainda não reconstruídos).
+ORIGEM_ROLLUPS = "rollups"
+ORIGEM_CLIENTES = "clientes"
+
+_INDICE_POR_ORIGEM = {ORIGEM_ROLLUPS: "vendedor_dia", ORIGEM_CLIENTES: "vendedor_finalizacao_id"}
+
+
+def consulta_desempenho(ids_vendedores: list, inicio_utc, fim_utc, origem: str = ORIGEM_ROLLUPS) -> tuple:
+    """
+    (coleção, pipeline, hint) que conta finalizações por (vendedor, status_final) no servidor e devolve
+    um documento por vendedor: {"_id": vendedor, "total_finalizados": n, "status": [{"k": status, "v": n}, ...]}.
+    A lista `status` tem um item por status distinto (não por cliente), então a resposta é pequena.
+    """
+    if origem == ORIGEM_ROLLUPS:
+        colecao = COLECAO_ROLLUPS
+        filtro = {"vendedor": {"$in": ids_vendedores},
+                  "dia": {"$gte": dia_local(inicio_utc), "$lte": dia_local(fim_utc)}}
+        chave = {"vendedor": "$vendedor", "status_final": "$status_final"}
+        soma = "$total"
+    else:
+        colecao = 'clientes'
+        filtro = {"vendedor_atribuido": {"$in": ids_vendedores},
+                  "data_finalizacao": {"$gte": inicio_utc, "$lte": fim_utc}}
+        chave = {"vendedor": "$vendedor_atribuido", "status_final": "$status_final"}
+        soma = 1
+    pipeline = [{"$match": filtro}] + _agrupar_por_vendedor(chave, soma)
+    return colecao, pipeline, _INDICE_POR_ORIGEM[origem]
+
+
+def _agrupar_por_vendedor(chave: dict, soma) -> list:
+    return [
+        {"$group": {"_id": chave, "n": {"$sum": soma}}},
+        {"$match": {"n": {"$gt": 0}}},
+        {"$group": {
+            "_id": "$_id.vendedor",
+            "total_finalizados": {"$sum": "$n"},
+            "status": {"$push": {"k": "$_id.status_final", "v": "$n"}},
+        }},
+        {"$sort": {"total_finalizados": -1}},
+    ]
+
+
+def consulta_desempenho_janelas(ids_vendedores: list, janelas: dict) -> tuple:
+    """
+    (pipeline, hint) sobre `rollups_diarios` com o desempenho por vendedor de várias janelas de tempo
+    numa única agregação: um $match pelo índice cobrindo todas as janelas e um $facet com uma saída
+    (no formato de consulta_desempenho) por janela. `janelas`: {nome: (inicio_utc, fim_utc)}.
+    """
+    dias = {nome: (dia_local(inicio), dia_local(fim)) for nome, (inicio, fim) in janelas.items()}
+    filtro = {"vendedor": {"$in": ids_vendedores},
+              "dia": {"$gte": min(inicio for inicio, _ in dias.values()), "$lte": max(fim for _, fim in dias.values())}}
+    chave = {"vendedor": "$vendedor", "status_final": "$status_final"}
+    facetas = {
+        nome: [{"$match": {"dia": {"$gte": inicio, "$lte": fim}}}] + _agrupar_por_vendedor(chave, "$total")
+        for nome, (inicio, fim) in dias.items()
+    }
+    return [{"$match": filtro}, {"$facet": facetas}], _INDICE_POR_ORIGEM[ORIGEM_ROLLUPS]
+
+
+def comparar_desempenho(atual: list, anterior: list) -> list:
+    """
+    Junta dois resultados de desempenho (mapa_desempenho) com a diferença por vendedor e por status:
+    [{"_id", "total", "total_anterior", "delta", "status": {status: {"atual", "anterior", "delta"}}}, ...],
+    do maior total atual para o menor.
+    """
+    por_vendedor = {}
+    for chave, resultados in (("atual", atual), ("anterior", anterior)):
+        for res in resultados:
+            item = por_vendedor.setdefault(res['_id'], {"_id": res['_id'], "atual": {}, "anterior": {}})
+            item[chave] = res['status_counts']
+    comparativo = []
+    for item in por_vendedor.values():
+        status = {}
+        for nome_status in set(item['atual']) | set(item['anterior']):
+            a, b = item['atual'].get(nome_status, 0), item['anterior'].get(nome_status, 0)
+            status[nome_status] = {"atual": a, "anterior": b, "delta": a - b}
+        total, total_anterior = sum(item['atual'].values()), sum(item['anterior'].values())
+        comparativo.append({"_id": item['_id'], "total": total, "total_anterior": total_anterior,
+                            "delta": total - total_anterior, "status": status})
+    comparativo.sort(key=lambda item: (item['total'], item['total_anterior']), reverse=True)
+    return comparativo
+
+
+def mapa_desempenho(documento: dict) -> dict:
+    """Converte um documento de consulta_desempenho() para {"_id", "total_finalizados", "status_counts": {status: n}}."""
+    return {
+        "_id": documento['_id'],
+        "total_finalizados": documento['total_finalizados'],
+        "status_counts": {item.get('k'): item['v'] for item in documento['status']},
+    }
+
+
+def pipeline_totais_por_status(inicio_utc, fim_utc) -> list:
+    """Finalizações por status_final no período, lidas dos rollups."""
+    return [
+        {"$match": {"dia": {"$gte": dia_local(inicio_utc), "$lte": dia_local(fim_utc)}}},
+        {"$group": {"_id": "$status_final", "count": {"$sum": "$total"}}},
+        {"$match": {"count": {"$gt": 0}}},
+        {"$sort": {"count": -1}},
+    ]
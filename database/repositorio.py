@@ -0,0 +1,620 @@
+# database/repositorio.py
+import time
+import asyncio
+import logging
+import functools
+from collections import defaultdict
+from datetime import datetime, UTC
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import UpdateOne
+from pymongo.collection import ReturnDocument
+
+from database.normalizacao import telefone_nacional
+from database.rollups import COLECAO_ROLLUPS, chave_rollup, dia_local
+from database.relatorios import (
+    ORIGEM_ROLLUPS, consulta_desempenho, consulta_desempenho_janelas, mapa_desempenho, pipeline_totais_por_status
+)
+from database.historico import COLECAO_HISTORICO, PROJECAO_SEM_HISTORICO, operacao_registrar
+from database.contadores import (
+    COLECAO_CONTADORES, CAMPOS_STATUS, chave_base, chave_dia, contador_base_zerado, update_mover_base,
+    update_finalizacao_dia, pipeline_contagem_bases, pipeline_contagem_dia
+)
+
+TAMANHO_MINIMO_BUSCA_PARCIAL = 4
+_PROJECAO_ROLLUP = {"status": 1, "status_final": 1, "data_finalizacao": 1, "vendedor_atribuido": 1, "nome_base": 1}
+# Listagens de botões (/hoje, /filtrar): só o que vai no botão + a chave de paginação.
+PROJECAO_LISTAGEM = {"nome_cliente": 1, "status_final": 1, "saldo_consulta": 1, "data_finalizacao": 1}
+
+
+def _filtro_keyset(campos: list, valores: tuple, operador: str) -> dict:
+    """
+    Condição "vem depois de `valores`" para uma ordenação composta por `campos`
+    (todos na mesma direção; `operador` é $lt para decrescente e $gt para crescente).
+    """
+    alternativas = []
+    for i, campo in enumerate(campos):
+        condicao = dict(zip(campos[:i], valores[:i]))
+        condicao[campo] = {operador: valores[i]}
+        alternativas.append(condicao)
+    limite_inicial = {campos[0]: {operador + "e": valores[0]}}
+    return {"$and": [limite_inicial, {"$or": alternativas}]} if len(campos) > 1 else alternativas[0]
+
+
+def _chave_historico(data: datetime, origem_id, indice: int) -> tuple:
+    """
+    Chave de ordenação (e cursor) de uma entrada do histórico: (data, id do bucket, posição no bucket).
+    A data vai em UTC sem fuso e truncada em milissegundos, como o BSON guarda; entradas com a mesma
+    data são desempatadas pelo bucket e pela posição.
+    """
+    if data.tzinfo is not None:
+        data = data.astimezone(UTC).replace(tzinfo=None)
+    return data.replace(microsecond=data.microsecond // 1000 * 1000), origem_id, indice
+
+
+class EstatisticasLatencia:
+    """Acumula contagem, tempo total e pior caso (em ms) por operação de banco."""
+
+    def __init__(self):
+        self._dados = defaultdict(lambda: {"chamadas": 0, "total_ms": 0.0, "max_ms": 0.0, "erros": 0})
+
+    def registrar(self, operacao: str, duracao_ms: float, erro: bool = False) -> None:
+        item = self._dados[operacao]
+        item["chamadas"] += 1
+        item["total_ms"] += duracao_ms
+        item["max_ms"] = max(item["max_ms"], duracao_ms)
+        if erro:
+            item["erros"] += 1
+
+    def resumo(self) -> dict:
+        return {
+            op: {**item, "media_ms": item["total_ms"] / item["chamadas"] if item["chamadas"] else 0.0}
+            for op, item in self._dados.items()
+        }
+
+
+class Repositorio:
+    """
+    Camada de acesso ao MongoDB usada pelos handlers.
+    Todo I/O roda num pool de threads limitado, então nenhuma consulta bloqueia o event loop,
+    e cada operação tem a latência registrada em `self.latencias`.
+    """
+
+    def __init__(self, db, max_workers: int = 16, limite_lento_ms: float = 250.0, max_exportacoes: int = 2):
+        self.db = db
+        self.vendedores = db['vendedores']
+        self.clientes = db['clientes']
+        self.mensagens = db['mensagens']
+        self.bases = db['bases']
+        self.rollups = db[COLECAO_ROLLUPS]
+        self.sessoes = db['sessoes']
+        self.historico = db[COLECAO_HISTORICO]
+        self.contadores = db[COLECAO_CONTADORES]
+        self.limite_lento_ms = limite_lento_ms
+        self.latencias = EstatisticasLatencia()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mongo")
+        # Exportações percorrem centenas de milhares de documentos: pool próprio para não ocupar o dos handlers.
+        self._executor_exportacao = ThreadPoolExecutor(max_workers=max_exportacoes, thread_name_prefix="exportacao")
+
+    async def _executar(self, operacao: str, funcao, *args, **kwargs):
+        return await self._executar_em(self._executor, operacao, funcao, *args, **kwargs)
+
+    async def _executar_em(self, executor, operacao: str, funcao, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            return await loop.run_in_executor(executor, functools.partial(funcao, *args, **kwargs))
+        except Exception:
+            erro = True
+            raise
+        finally:
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            self.latencias.registrar(operacao, duracao_ms, erro)
+            if duracao_ms > self.limite_lento_ms:
+                logging.warning(f"Operação lenta no MongoDB: {operacao} levou {duracao_ms:.1f} ms")
+            else:
+                logging.debug(f"MongoDB {operacao}: {duracao_ms:.1f} ms")
+
+    def fechar(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._executor_exportacao.shutdown(wait=True)
+
+    # -------------------------------
+    # Vendedores
+    # -------------------------------
+    async def buscar_vendedor(self, vendedor_id):
+        return await self._executar("vendedores.buscar", self.vendedores.find_one, {"_id": vendedor_id})
+
+    async def buscar_vendedor_por_login(self, login: str):
+        return await self._executar("vendedores.buscar_por_login", self.vendedores.find_one, {"usuario_login": login})
+
+    async def listar_vendedores(self, filtro: dict = None, projecao: dict = None) -> list:
+        def _listar():
+            return list(self.vendedores.find(filtro or {}, projecao))
+        return await self._executar("vendedores.listar", _listar)
+
+    async def listar_supervisores(self) -> list:
+        return await self.listar_vendedores({"role": "supervisor"})
+
+    async def listar_equipe(self, supervisor_id, projecao: dict = None) -> list:
+        return await self.listar_vendedores({"supervisor_id": supervisor_id}, projecao)
+
+    async def listar_autonomos(self) -> list:
+        return await self.listar_vendedores({"role": "vendedor", "supervisor_id": None})
+
+    async def inserir_vendedor(self, vendedor_doc: dict):
+        return await self._executar("vendedores.inserir", self.vendedores.insert_one, vendedor_doc)
+
+    async def atualizar_vendedor(self, vendedor_id, campos: dict):
+        return await self._executar(
+            "vendedores.atualizar", self.vendedores.update_one, {"_id": vendedor_id}, {"$set": campos}
+        )
+
+    # -------------------------------
+    # Sessões de login
+    # -------------------------------
+    async def salvar_sessao(self, usuario_telegram: int, sessao: dict):
+        return await self._executar(
+            "sessoes.salvar", self.sessoes.replace_one, {"_id": usuario_telegram}, sessao, upsert=True
+        )
+
+    async def buscar_sessao(self, usuario_telegram: int):
+        return await self._executar("sessoes.buscar", self.sessoes.find_one, {"_id": usuario_telegram})
+
+    async def remover_sessao(self, usuario_telegram: int):
+        return await self._executar("sessoes.remover", self.sessoes.delete_one, {"_id": usuario_telegram})
+
+    # -------------------------------
+    # Bases de leads
+    # -------------------------------
+    async def listar_bases(self) -> list:
+        def _listar():
+            return list(self.bases.find().sort("data_importacao", -1))
+        return await self._executar("bases.listar", _listar)
+
+    async def listar_nomes_bases_ativas(self) -> list:
+        def _listar():
+            return [base['nome_base'] for base in self.bases.find({"ativa": True}, {"nome_base": 1})]
+        return await self._executar("bases.listar_ativas", _listar)
+
+    async def definir_base_ativa(self, base_id, ativa: bool):
+        def _definir():
+            base = self.bases.find_one_and_update({"_id": base_id}, {"$set": {"ativa": ativa}}, {"nome_base": 1})
+            if base is not None:
+                self.contadores.update_one(
+                    chave_base(base['nome_base']),
+                    {"$set": {"ativa": ativa}, "$setOnInsert": {"tipo": "base", "nome_base": base['nome_base']}},
+                    upsert=True
+                )
+            return base
+        return await self._executar("bases.definir_ativa", _definir)
+
+    # -------------------------------
+    # Mensagens (templates de WhatsApp)
+    # -------------------------------
+    async def listar_mensagens(self, somente_ativas: bool = False) -> list:
+        def _listar():
+            return list(self.mensagens.find({"ativo": True} if somente_ativas else {}))
+        return await self._executar("mensagens.listar", _listar)
+
+    async def inserir_mensagem(self, msg_doc: dict):
+        return await self._executar("mensagens.inserir", self.mensagens.insert_one, msg_doc)
+
+    async def definir_mensagem_ativa(self, mensagem_id, ativo: bool):
+        return await self._executar(
+            "mensagens.definir_ativa", self.mensagens.update_one, {"_id": mensagem_id}, {"$set": {"ativo": ativo}}
+        )
+
+    # -------------------------------
+    # Clientes
+    # -------------------------------
+    async def buscar_cliente(self, cliente_id):
+        return await self._executar(
+            "clientes.buscar", self.clientes.find_one, {"_id": cliente_id}, PROJECAO_SEM_HISTORICO
+        )
+
+    async def buscar_cliente_em_atendimento(self, vendedor_id, exceto=None):
+        filtro = {"vendedor_atribuido": vendedor_id, "status": "Em_Atendimento"}
+        if exceto is not None:
+            filtro["_id"] = {"$ne": exceto}
+        return await self._executar(
+            "clientes.em_atendimento", self.clientes.find_one, filtro, PROJECAO_SEM_HISTORICO
+        )
+
+    async def buscar_cliente_por_telefone(self, numero_limpo: str):
+        """
+        Busca exata em `telefone_normalizado` e, se não achar, pelo final do número
+        (prefixo de `telefone_reverso`). As duas consultas usam índice.
+        """
+        def _buscar():
+            nacional = telefone_nacional(numero_limpo)
+            if not nacional:
+                return None
+            cliente = self.clientes.find_one({"telefone_normalizado": nacional}, PROJECAO_SEM_HISTORICO)
+            if not cliente and len(nacional) >= TAMANHO_MINIMO_BUSCA_PARCIAL:
+                cliente = self.clientes.find_one(
+                    {"telefone_reverso": {"$regex": f"^{nacional[::-1]}"}}, PROJECAO_SEM_HISTORICO
+                )
+            return cliente
+        return await self._executar("clientes.buscar_por_telefone", _buscar)
+
+    async def amostrar_ids_pendentes(self, nome_base: str, tamanho: int) -> list:
+        def _amostrar():
+            pipeline = [
+                {"$match": {"status": "Pendente", "nome_base": nome_base}},
+                {"$sample": {"size": tamanho}},
+                {"$project": {"_id": 1}}
+            ]
+            return [doc['_id'] for doc in self.clientes.aggregate(pipeline)]
+        return await self._executar("clientes.amostrar_pendentes", _amostrar)
+
+    async def atribuir_cliente(self, cliente_id, vendedor_id, data_atribuicao):
+        def _atribuir():
+            cliente = self.clientes.find_one_and_update(
+                {"_id": cliente_id, "status": "Pendente"},
+                {"$set": {"status": "Em_Atendimento", "vendedor_atribuido": vendedor_id, "data_atribuicao": data_atribuicao}},
+                projection=PROJECAO_SEM_HISTORICO, return_document=ReturnDocument.AFTER
+            )
+            if cliente is not None:
+                self._mover_contador_base(cliente.get('nome_base'), "Pendente", "Em_Atendimento")
+            return cliente
+        return await self._executar("clientes.atribuir", _atribuir)
+
+    async def liberar_cliente(self, cliente_id, vendedor_id) -> bool:
+        """Volta para Pendente um cliente em atendimento com o vendedor. Retorna False se ele já não estava."""
+        def _liberar():
+            anterior = self.clientes.find_one_and_update(
+                {"_id": cliente_id, "status": "Em_Atendimento", "vendedor_atribuido": vendedor_id},
+                {"$set": {"status": "Pendente"}, "$unset": {"vendedor_atribuido": "", "data_atribuicao": ""}},
+                projection={"nome_base": 1}
+            )
+            if anterior is None:
+                return False
+            self._mover_contador_base(anterior.get('nome_base'), "Em_Atendimento", "Pendente")
+            return True
+        return await self._executar("clientes.liberar", _liberar)
+
+    async def reabrir_cliente(self, cliente_id, vendedor_id):
+        def _reabrir():
+            anterior = self.clientes.find_one_and_update(
+                {"_id": cliente_id},
+                {"$set": {"status": "Em_Atendimento", "vendedor_atribuido": vendedor_id, "data_atribuicao": datetime.now(UTC)},
+                 "$unset": {"status_final": "", "data_finalizacao": ""}},
+                projection=_PROJECAO_ROLLUP, return_document=ReturnDocument.BEFORE
+            )
+            if anterior is not None:
+                self._mover_contador_base(anterior.get('nome_base'), anterior.get('status'), "Em_Atendimento")
+            self._descontar_finalizacao(anterior)
+            return anterior
+        return await self._executar("clientes.reabrir", _reabrir)
+
+    async def finalizar_cliente(self, cliente_id, campos: dict, observacao: dict = None, vendedor_id=None):
+        """
+        Marca o cliente como Concluido e atualiza o rollup diário (desfazendo a finalização anterior, se houver).
+        `observacao`, se informada, vai para o histórico do cliente como registro de consulta.
+        Com `vendedor_id`, só finaliza (senão retorna None) um cliente desse vendedor em atendimento ou já
+        concluído por ele (refinalizar troca o status sem contar duas vezes). Um atendimento que expirou e voltou
+        para Pendente, ou que foi para outro vendedor, é recusado: o crédito nunca muda de vendedor aqui.
+        """
+        filtro = {"_id": cliente_id}
+        if vendedor_id is not None:
+            filtro.update(status={"$in": ["Em_Atendimento", "Concluido"]}, vendedor_atribuido=vendedor_id)
+        update_doc = {"$set": {"status": "Concluido", **campos}}
+
+        def _finalizar():
+            anterior = self.clientes.find_one_and_update(
+                filtro, update_doc,
+                projection=_PROJECAO_ROLLUP, return_document=ReturnDocument.BEFORE
+            )
+            if anterior is None:
+                return None
+            self._mover_contador_base(anterior.get('nome_base'), anterior.get('status'), "Concluido")
+            self._descontar_finalizacao(anterior)
+            self._ajustar_rollup(
+                chave_rollup(campos['data_finalizacao'], anterior.get('vendedor_atribuido'),
+                             campos.get('status_final'), anterior.get('nome_base')),
+                1
+            )
+            if observacao is not None:
+                self._registrar_historico(cliente_id, {"tipo": "consulta", **observacao})
+            return anterior
+        return await self._executar("clientes.finalizar", _finalizar)
+
+    def _descontar_finalizacao(self, cliente_anterior) -> None:
+        if cliente_anterior and cliente_anterior.get('status') == 'Concluido' and cliente_anterior.get('data_finalizacao'):
+            self._ajustar_rollup(
+                chave_rollup(cliente_anterior['data_finalizacao'], cliente_anterior.get('vendedor_atribuido'),
+                             cliente_anterior.get('status_final'), cliente_anterior.get('nome_base')),
+                -1
+            )
+
+    def _ajustar_rollup(self, chave: dict, delta: int) -> None:
+        self.rollups.update_one(chave, {"$inc": {"total": delta}}, upsert=True)
+        self.contadores.update_one(
+            chave_dia(chave['dia'], chave['status_final']),
+            update_finalizacao_dia(chave['dia'], chave['status_final'], delta), upsert=True
+        )
+
+    async def rollups_pendentes(self) -> bool:
+        """True se `rollups_diarios` está vazia mas já existem clientes finalizados (rollups nunca reconstruídos)."""
+        def _verificar():
+            if self.rollups.find_one({}, {"_id": 1}) is not None:
+                return False
+            return self.clientes.find_one({"status": "Concluido", "data_finalizacao": {"$type": "date"}},
+                                          {"_id": 1}) is not None
+        return await self._executar("rollups.verificar", _verificar)
+
+    def _mover_contador_base(self, nome_base, status_anterior, status_novo, quantidade: int = 1) -> None:
+        if status_anterior == status_novo or not quantidade:
+            return
+        self.contadores.update_one(
+            chave_base(nome_base), update_mover_base(nome_base, status_anterior, status_novo, quantidade), upsert=True
+        )
+
+    # -------------------------------
+    # Histórico (observações e consultas), em buckets por cliente
+    # -------------------------------
+    def _registrar_historico(self, cliente_id, entrada: dict) -> None:
+        filtro, update = operacao_registrar(cliente_id, entrada)
+        self.historico.update_one(filtro, update, upsert=True)
+
+    async def adicionar_observacao(self, cliente_id, observacao: dict):
+        return await self._executar(
+            "historico.adicionar", self._registrar_historico, cliente_id, {"tipo": "nota", **observacao}
+        )
+
+    async def pagina_historico(self, cliente_id, limite: int, antes_de=None, depois_de=None):
+        """
+        Uma página do histórico, da entrada mais nova para a mais antiga.
+        `antes_de`/`depois_de` são o cursor da entrada mais antiga/mais nova da página atual (None = página mais
+        recente). Retorna (entradas, ha_mais_antigas, ha_mais_novas); cada entrada traz seu cursor em `cursor`
+        (ver `_chave_historico`).
+
+        Lê os buckets pelo índice (cliente_id, ultima) só até ter limite+1 entradas no intervalo: como os buckets
+        vêm ordenados por `ultima`, um bucket cuja `ultima` já está fora das limite+1 melhores encerra a busca.
+        """
+        mais_novas_primeiro = depois_de is None
+
+        def _no_intervalo(chave) -> bool:
+            if antes_de is not None and not chave < antes_de:
+                return False
+            if depois_de is not None and not chave > depois_de:
+                return False
+            return True
+
+        def _acrescentar(candidatas: list, origem_id, entradas: list) -> None:
+            for indice, entrada in enumerate(entradas):
+                chave = _chave_historico(entrada['data'], origem_id, indice)
+                if _no_intervalo(chave):
+                    candidatas.append((chave, entrada))
+            candidatas.sort(key=lambda candidata: candidata[0], reverse=mais_novas_primeiro)
+
+        def _paginar():
+            # $lte/$gte: um bucket que começa/termina na data do cursor ainda pode ter entradas empatadas com ele.
+            if mais_novas_primeiro:
+                filtro = {"cliente_id": cliente_id}
+                if antes_de is not None:
+                    filtro["inicio"] = {"$lte": antes_de[0]}
+                cursor = self.historico.find(filtro, {"entradas": 1, "ultima": 1}).sort("ultima", -1)
+            else:
+                filtro = {"cliente_id": cliente_id, "ultima": {"$gte": depois_de[0]}}
+                cursor = self.historico.find(filtro, {"entradas": 1, "inicio": 1}).sort("ultima", 1)
+            cursor = cursor.batch_size(2)
+
+            candidatas = []
+            for bucket in cursor:
+                if len(candidatas) > limite:
+                    limite_bucket = bucket['ultima'] if mais_novas_primeiro else bucket['inicio']
+                    pior = candidatas[limite][0][0]
+                    if (limite_bucket < pior) if mais_novas_primeiro else (limite_bucket > pior):
+                        break
+                _acrescentar(candidatas, bucket['_id'], bucket['entradas'])
+            cursor.close()
+
+            # Cliente ainda não migrado (Gerencial/migrar_observacoes.py): o array antigo ainda está no documento.
+            legado = self.clientes.find_one({"_id": cliente_id, "observacoes.0": {"$exists": True}}, {"observacoes": 1})
+            if legado:
+                _acrescentar(candidatas, legado['_id'], legado['observacoes'])
+
+            ha_mais = len(candidatas) > limite
+            entradas = [dict(entrada, cursor=chave) for chave, entrada in candidatas[:limite]]
+            if mais_novas_primeiro:
+                return entradas, ha_mais, antes_de is not None
+            entradas.reverse()
+            return entradas, True, ha_mais
+        return await self._executar("historico.pagina", _paginar)
+
+    def _pagina(self, filtro: dict, campos: list, limite: int, apos: tuple = None, antes: tuple = None):
+        """
+        Uma página por keyset, em ordem decrescente de `campos`.
+        `apos`/`antes` são a chave do último/primeiro item da página atual (None = primeira página).
+        Retorna (itens, ha_anterior, ha_proxima), lendo limite+1 documentos para saber se há mais.
+        """
+        direcao = -1
+        if apos is not None:
+            filtro = {"$and": [filtro, _filtro_keyset(campos, apos, "$lt")]}
+        elif antes is not None:
+            filtro = {"$and": [filtro, _filtro_keyset(campos, antes, "$gt")]}
+            direcao = 1
+
+        cursor = self.clientes.find(filtro, PROJECAO_LISTAGEM).sort([(c, direcao) for c in campos]).limit(limite + 1)
+        itens = list(cursor)
+        ha_mais = len(itens) > limite
+        itens = itens[:limite]
+        if antes is not None:
+            itens.reverse()
+            return itens, ha_mais, True
+        return itens, apos is not None, ha_mais
+
+    async def listar_finalizados_vendedor(self, vendedor_id, inicio_utc, fim_utc, limite: int = 10,
+                                          apos: tuple = None, antes: tuple = None):
+        """Finalizados do vendedor no período, mais recentes primeiro; cursor = (data_finalizacao, _id)."""
+        query = {"vendedor_atribuido": vendedor_id, "data_finalizacao": {"$gte": inicio_utc, "$lte": fim_utc}}
+        return await self._executar(
+            "clientes.finalizados_vendedor", self._pagina, query, ["data_finalizacao", "_id"], limite, apos, antes
+        )
+
+    async def listar_clientes_vendedor(self, vendedor_id, filtro: dict, limite: int = 10,
+                                       apos: tuple = None, antes: tuple = None):
+        """Clientes do vendedor que atendem `filtro`, mais recentes primeiro; cursor = (_id,)."""
+        return await self._executar(
+            "clientes.listar_vendedor", self._pagina, {"vendedor_atribuido": vendedor_id, **filtro}, ["_id"],
+            limite, apos, antes
+        )
+
+    async def liberar_atendimentos_expirados(self, atribuidos_antes_de, tamanho_lote: int = 500) -> dict:
+        """
+        Devolve a Pendente os clientes em atendimento atribuídos antes de `atribuidos_antes_de`
+        (ou sem data de atribuição, de antes desse controle existir), em lotes de update_many.
+        Retorna {"liberados": n, "por_base": {nome_base: [ids]}}.
+        """
+        filtro = {"status": "Em_Atendimento",
+                  "$or": [{"data_atribuicao": {"$lt": atribuidos_antes_de}}, {"data_atribuicao": None}]}
+
+        def _liberar():
+            liberados = 0
+            por_base = defaultdict(list)
+            while True:
+                lote = list(self.clientes.find(filtro, {"nome_base": 1}).limit(tamanho_lote))
+                if not lote:
+                    break
+                ids_lote = defaultdict(list)
+                for doc in lote:
+                    ids_lote[doc.get('nome_base')].append(doc['_id'])
+                for nome_base, ids in ids_lote.items():
+                    resultado = self.clientes.update_many(
+                        {"_id": {"$in": ids}, **filtro},
+                        {"$set": {"status": "Pendente"}, "$unset": {"vendedor_atribuido": "", "data_atribuicao": ""}}
+                    )
+                    self._mover_contador_base(nome_base, "Em_Atendimento", "Pendente", resultado.modified_count)
+                    liberados += resultado.modified_count
+                    por_base[nome_base].extend(ids)
+                if len(lote) < tamanho_lote:
+                    break
+            return {"liberados": liberados, "por_base": dict(por_base)}
+        return await self._executar("clientes.liberar_expirados", _liberar)
+
+    async def contar_pendentes(self, nomes_bases: list) -> int:
+        return await self._executar(
+            "clientes.contar_pendentes", self.clientes.count_documents,
+            {"status": "Pendente", "nome_base": {"$in": nomes_bases}}
+        )
+
+    # -------------------------------
+    # Contadores do painel do admin
+    # -------------------------------
+    async def painel_contadores(self, dia: str) -> dict:
+        """
+        Pendentes nas bases ativas e finalizações do `dia` (AAAA-MM-DD) por status_final,
+        lidos dos documentos de `contadores` numa única consulta.
+        Retorna {"pendentes": n, "por_status": [{"_id": status_final, "count": n}, ...]}.
+        """
+        def _ler():
+            pendentes, por_status = 0, []
+            for doc in self.contadores.find({"$or": [{"tipo": "base", "ativa": True}, {"tipo": "dia", "dia": dia}]}):
+                if doc['tipo'] == "base":
+                    pendentes += doc.get('pendentes', 0)
+                elif doc.get('total', 0) > 0:
+                    por_status.append({"_id": doc['status_final'], "count": doc['total']})
+            por_status.sort(key=lambda item: item['count'], reverse=True)
+            return {"pendentes": pendentes, "por_status": por_status}
+        return await self._executar("contadores.painel", _ler)
+
+    async def reconciliar_contadores(self, inicio_dia_utc, fim_dia_utc) -> int:
+        """
+        Recalcula os contadores das bases ativas e os do dia informado a partir de `clientes` e corrige os que
+        divergirem. Retorna quantos documentos foram corrigidos.
+
+        Os contadores são lidos antes das contagens e cada correção só é gravada se o contador ainda estiver
+        com o valor lido: um $inc dos handlers que chegue no meio da reconciliação nunca é sobrescrito (o
+        documento fica para a próxima execução). Bases inativas não entram no painel e não são recontadas.
+        """
+        dia = dia_local(inicio_dia_utc)
+
+        def _reconciliar():
+            ativas = [base['nome_base'] for base in self.bases.find({"ativa": True}, {"nome_base": 1})]
+            # Só a flag; não disputa com os $inc dos handlers.
+            self.contadores.update_many({"tipo": "base", "ativa": True, "nome_base": {"$nin": ativas}},
+                                        {"$set": {"ativa": False}})
+            lidos = {atual['_id']: atual for atual in self.contadores.find(
+                {"$or": [{"tipo": "base", "nome_base": {"$in": ativas}}, {"tipo": "dia", "dia": dia}]}
+            )}
+
+            esperado = {chave_base(nome_base)['_id']: contador_base_zerado(nome_base, True) for nome_base in ativas}
+            for item in self.clientes.aggregate(pipeline_contagem_bases(ativas)):
+                esperado[chave_base(item['_id']['nome_base'])['_id']][CAMPOS_STATUS[item['_id']['status']]] = item['total']
+            for item in self.clientes.aggregate(pipeline_contagem_dia(inicio_dia_utc, fim_dia_utc)):
+                esperado[chave_dia(dia, item['_id'])['_id']] = {"tipo": "dia", "dia": dia, "status_final": item['_id'],
+                                                                "total": item['total']}
+            for _id, atual in lidos.items():
+                # Contador do dia sem nenhuma finalização correspondente: zera.
+                esperado.setdefault(_id, {"total": 0})
+
+            operacoes = []
+            for _id, doc in esperado.items():
+                atual = lidos.get(_id)
+                if atual is None:
+                    # Sem contador ainda: cria, a menos que um $inc o crie antes.
+                    operacoes.append(UpdateOne({"_id": _id}, {"$setOnInsert": doc}, upsert=True))
+                elif any(atual.get(campo) != valor for campo, valor in doc.items()):
+                    guarda = {campo: atual.get(campo) for campo in doc if campo in CAMPOS_STATUS.values() or campo == "total"}
+                    operacoes.append(UpdateOne({"_id": _id, **guarda}, {"$set": doc}))
+            if not operacoes:
+                return 0
+            resultado = self.contadores.bulk_write(operacoes, ordered=False)
+            corrigidos = resultado.modified_count + resultado.upserted_count
+            if corrigidos < len(operacoes):
+                logging.debug(f"{len(operacoes) - corrigidos} contador(es) mudaram durante a reconciliação; ficam para a próxima.")
+            return corrigidos
+        return await self._executar("contadores.reconciliar", _reconciliar)
+
+    # -------------------------------
+    # Agregações de relatório
+    # -------------------------------
+    async def totais_por_status(self, inicio_utc, fim_utc) -> list:
+        def _agregar():
+            return list(self.rollups.aggregate(pipeline_totais_por_status(inicio_utc, fim_utc), hint="chave_rollup"))
+        return await self._executar("relatorios.totais_por_status", _agregar)
+
+    async def desempenho_por_vendedor(self, ids_vendedores: list, inicio_utc, fim_utc, origem: str = ORIGEM_ROLLUPS) -> list:
+        """
+        Finalizações por vendedor no período, agrupadas no servidor (ver database/relatorios.py).
+        Cada item: {"_id": vendedor, "total_finalizados": n, "status_counts": {status_final: n}}, do maior total para o menor.
+        """
+        colecao, pipeline, indice = consulta_desempenho(ids_vendedores, inicio_utc, fim_utc, origem)
+
+        def _agregar():
+            return [mapa_desempenho(doc) for doc in self.db[colecao].aggregate(pipeline, hint=indice)]
+        return await self._executar("relatorios.desempenho_por_vendedor", _agregar)
+
+    async def exportar_finalizados(self, ids_vendedores, inicio_utc, fim_utc, projecao: dict, escrever,
+                                   tamanho_lote: int = 2000):
+        """
+        Percorre os clientes finalizados no período (de `ids_vendedores`, ou de todos se None), do mais recente
+        para o mais antigo, e entrega o cursor a `escrever(cursor)`, tudo no pool de exportação.
+        O cursor traz `tamanho_lote` documentos por vez, então a memória não cresce com o período.
+        Retorna o que `escrever` retornar.
+        """
+        filtro = {"data_finalizacao": {"$gte": inicio_utc, "$lte": fim_utc}}
+        if ids_vendedores is not None:
+            filtro["vendedor_atribuido"] = {"$in": ids_vendedores}
+
+        def _exportar():
+            cursor = self.clientes.find(filtro, projecao).sort("data_finalizacao", -1).batch_size(tamanho_lote)
+            try:
+                return escrever(cursor)
+            finally:
+                cursor.close()
+        return await self._executar_em(self._executor_exportacao, "clientes.exportar_finalizados", _exportar)
+
+    async def desempenho_em_janelas(self, ids_vendedores: list, janelas: dict) -> dict:
+        """
+        Desempenho por vendedor em várias janelas numa única agregação sobre os rollups.
+        `janelas`: {nome: (inicio_utc, fim_utc)}; retorna {nome: [itens como em desempenho_por_vendedor]}.
+        """
+        pipeline, indice = consulta_desempenho_janelas(ids_vendedores, janelas)
+
+        def _agregar():
+            facetas = next(self.rollups.aggregate(pipeline, hint=indice), {})
+            return {nome: [mapa_desempenho(doc) for doc in facetas.get(nome, [])] for nome in janelas}
+        return await self._executar("relatorios.desempenho_em_janelas", _agregar)
@@ -0,0 +1,49 @@
+# database/rollups.py
+from datetime import UTC
+import pytz
+
+TZ_SAO_PAULO = pytz.timezone('America/Sao_Paulo')
+COLECAO_ROLLUPS = 'rollups_diarios'
+
+
+def dia_local(data) -> str:
+    """Dia (AAAA-MM-DD) em America/Sao_Paulo de um datetime; datetimes sem fuso são tratados como UTC."""
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=UTC)
+    return data.astimezone(TZ_SAO_PAULO).strftime('%Y-%m-%d')
+
+
+def chave_rollup(data_finalizacao, vendedor_id, status_final, nome_base) -> dict:
+    return {
+        "dia": dia_local(data_finalizacao),
+        "vendedor": vendedor_id,
+        "status_final": status_final,
+        "nome_base": nome_base,
+    }
+
+
+def pipeline_reconstrucao(filtro_extra: dict = None) -> list:
+    """Agrega `clientes` finalizados no mesmo formato de `rollups_diarios`."""
+    filtro = {"status": "Concluido", "data_finalizacao": {"$type": "date"}}
+    filtro.update(filtro_extra or {})
+    return [
+        {"$match": filtro},
+        {"$group": {
+            "_id": {
+                "dia": {"$dateToString": {"format": "%Y-%m-%d", "date": "$data_finalizacao",
+                                          "timezone": "America/Sao_Paulo"}},
+                "vendedor": "$vendedor_atribuido",
+                "status_final": "$status_final",
+                "nome_base": "$nome_base",
+            },
+            "total": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": 0,
+            "dia": "$_id.dia",
+            "vendedor": {"$ifNull": ["$_id.vendedor", None]},
+            "status_final": {"$ifNull": ["$_id.status_final", None]},
+            "nome_base": {"$ifNull": ["$_id.nome_base", None]},
+            "total": 1
+        }},
+    ]
@@ -1,20 +1,19 @@
 # handlers/admin_handlers.py
+import html
 import logging
 from datetime import datetime, time, UTC
 import pytz
-from collections import Counter
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
-from bson.objectid import ObjectId
-from werkzeug.security import generate_password_hash
 from telegram.helpers import escape_markdown
 
+from . import callbacks, teclados
 from .common import (
     is_admin, GET_NEW_USER_NAME, GET_NEW_USER_LOGIN, GET_NEW_USER_PASS,
     GET_NEW_USER_ROLE, GET_NEW_USER_SUPERVISOR, GET_MSG_NAME, GET_MSG_TEXT,
     SELECT_USER_TO_EDIT, CHOOSE_EDIT_ACTION, EDIT_USER_ROLE, EDIT_USER_SUPERVISOR
 )
-from handlers.relatorios_handlers import gerar_relatorio_equipe
+from handlers.relatorios_handlers import gerar_relatorio_equipe, formatar_desempenho
 
 
 async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -27,13 +26,7 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     if update.callback_query:
         await update.callback_query.answer()
 
-    admin_keyboard = [
-        [InlineKeyboardButton("📊 Estatísticas do Dia", callback_data="admin_stats_menu")],
-        [InlineKeyboardButton("👤 Gerenciar Usuários", callback_data="admin_manage_users")],
-        [InlineKeyboardButton("✉️ Gerenciar Mensagens", callback_data="admin_manage_messages")],
-        [InlineKeyboardButton("🗂️ Gerenciar Bases de Leads", callback_data="admin_manage_bases")]
-    ]
-    reply_markup = InlineKeyboardMarkup(admin_keyboard)
+    reply_markup = teclados.PAINEL_ADMIN
 
     message_text = "👑 <b>Painel de Administração</b>\n\nSelecione uma opção:"
     if update.callback_query:
@@ -48,8 +41,7 @@ async def admin_manage_bases(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await query.edit_message_text("Você não tem permissão.")
         return
 
-    bases_collection = context.bot_data['bases']
-    todas_as_bases = list(bases_collection.find().sort("data_importacao", -1))
+    todas_as_bases = await context.bot_data['repositorio'].listar_bases()
     texto = "<b>🗂️ Gerenciamento de Bases de Leads</b>\n\n"
     keyboard = []
 
@@ -62,10 +54,10 @@ async def admin_manage_bases(update: Update, context: ContextTypes.DEFAULT_TYPE)
             nome_base = base['nome_base']
             texto_botao = f"{status_emoji} - {nome_base}"
             novo_status = not base.get('ativa', False)
-            callback = f"admin_toggle_base_{base['_id']}_{novo_status}"
+            callback = callbacks.ADMIN_ATIVAR_BASE.codificar(base['_id'], novo_status)
             keyboard.append([InlineKeyboardButton(texto_botao, callback_data=callback)])
 
-    keyboard.append([InlineKeyboardButton("⬅️ Voltar ao Menu Admin", callback_data="admin_back_to_main")])
+    keyboard.append([InlineKeyboardButton("⬅️ Voltar ao Menu Admin", callback_data=callbacks.ADMIN_PAINEL.codificar())])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     await query.edit_message_text(texto, reply_markup=reply_markup, parse_mode='HTML')
@@ -78,19 +70,9 @@ async def admin_toggle_base_status(update: Update, context: ContextTypes.DEFAULT
         await query.edit_message_text("Você não tem permissão.")
         return
 
-    try:
-        parts = query.data.split('_')
-        novo_status_str = parts[-1]
-        base_id_str = parts[-2]
-        base_id = ObjectId(base_id_str)
-        novo_status = True if novo_status_str == 'True' else False
-    except (ValueError, IndexError):
-        await query.message.reply_text("Erro ao processar a ação. Tente novamente.")
-        await admin_manage_bases(update, context)
-        return
-
-    bases_collection = context.bot_data['bases']
-    bases_collection.update_one({"_id": base_id}, {"$set": {"ativa": novo_status}})
+    base_id, novo_status = context.args
+    await context.bot_data['repositorio'].definir_base_ativa(base_id, novo_status)
+    context.bot_data['fila_leads'].invalidar_bases()
     await admin_manage_bases(update, context)
 
 
@@ -104,12 +86,7 @@ async def admin_manage_messages(update: Update, context: ContextTypes.DEFAULT_TY
         await source.reply_text("Você não tem permissão.")
         return
 
-    keyboard = [
-        [InlineKeyboardButton("📜 Listar Mensagens", callback_data="admin_list_msg")],
-        [InlineKeyboardButton("➕ Adicionar Mensagem", callback_data="admin_add_msg")],
-        [InlineKeyboardButton("⬅️ Voltar ao Menu Admin", callback_data="admin_back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = teclados.MENU_MENSAGENS
 
     message_text = "<b>✉️ Gerenciamento de Mensagens</b>\n\nSelecione uma opção:"
     if query:
@@ -125,8 +102,7 @@ async def admin_list_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
         await query.edit_message_text("Você não tem permissão.")
         return
 
-    mensagens_collection = context.bot_data['mensagens_collection']
-    mensagens = list(mensagens_collection.find())
+    mensagens = await context.bot_data['repositorio'].listar_mensagens()
 
     if not mensagens:
         texto_resposta = "Nenhuma mensagem cadastrada."
@@ -139,11 +115,30 @@ async def admin_list_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
                 f"<b>Texto:</b> {msg['texto']}<br><br>"
             )
 
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="admin_manage_messages")]]
+    keyboard = []
+    for msg in mensagens:
+        status_emoji = "🟢" if msg.get('ativo', False) else "🔴"
+        novo_status = not msg.get('ativo', False)
+        callback = callbacks.ADMIN_ATIVAR_MENSAGEM.codificar(msg['_id'], novo_status)
+        keyboard.append([InlineKeyboardButton(f"{status_emoji} {msg['nome_template']}", callback_data=callback)])
+    keyboard.append([InlineKeyboardButton("⬅️ Voltar", callback_data=callbacks.ADMIN_MENSAGENS.codificar())])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     await query.edit_message_text(texto_resposta, reply_markup=reply_markup, parse_mode='HTML')
 
+
+async def admin_toggle_message_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    if not is_admin(context):
+        await query.answer()
+        await query.edit_message_text("Você não tem permissão.")
+        return
+
+    mensagem_id, novo_status = context.args
+    await context.bot_data['repositorio'].definir_mensagem_ativa(mensagem_id, novo_status)
+    context.bot_data['templates_mensagem'].invalidar()
+    await admin_list_messages(update, context)
+
 async def admin_add_message_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -169,7 +164,8 @@ async def get_msg_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     info['texto'] = update.message.text
     msg_doc = {"nome_template": info['nome'], "texto": info['texto'], "ativo": True}
 
-    context.bot_data['mensagens_collection'].insert_one(msg_doc)
+    await context.bot_data['repositorio'].inserir_mensagem(msg_doc)
+    context.bot_data['templates_mensagem'].invalidar()
 
     await update.message.reply_text(f"✅ Mensagem '{info['nome']}' salva com sucesso!")
     context.user_data.pop('new_message_info', None)
@@ -184,16 +180,9 @@ async def admin_manage_users(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await query.edit_message_text("Você não tem permissão.")
         return
 
-    keyboard = [
-        [InlineKeyboardButton("➕ Adicionar Usuário", callback_data="admin_add_user")],
-        [InlineKeyboardButton("✏️ Modificar Usuário", callback_data="admin_edit_user")],
-        [InlineKeyboardButton("⬅️ Voltar ao Menu Admin", callback_data="admin_back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     await query.edit_message_text(
         "👤 <b>Gerenciamento de Usuários</b>\n\nSelecione uma opção:",
-        reply_markup=reply_markup,
+        reply_markup=teclados.MENU_USUARIOS,
         parse_mode='HTML'
     )
 
@@ -219,7 +208,7 @@ async def get_new_user_name(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def get_new_user_login(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     login = update.message.text.lower()
-    if context.bot_data['vendedores_collection'].find_one({"usuario_login": login}):
+    if await context.bot_data['repositorio'].buscar_vendedor_por_login(login):
         await update.message.reply_text("❌ Este login já existe. Por favor, escolha outro.")
         return GET_NEW_USER_LOGIN
 
@@ -232,18 +221,12 @@ async def get_new_user_login(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 
 async def get_new_user_password(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    context.user_data['new_user_info']['senha'] = update.message.text
-
-    keyboard = [
-        [InlineKeyboardButton("Vendedor", callback_data="role_vendedor")],
-        [InlineKeyboardButton("Supervisor", callback_data="role_supervisor")],
-        [InlineKeyboardButton("Administrador", callback_data="role_administrador")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    # Guarda só o hash: user_data é persistido no banco.
+    context.user_data['new_user_info']['senha_hash'] = await context.bot_data['autenticador'].gerar_hash(update.message.text)
 
     await update.message.reply_text(
         "Senha definida. Qual será a <b>função (role)</b> deste usuário?",
-        reply_markup=reply_markup,
+        reply_markup=teclados.FUNCOES,
         parse_mode='HTML'
     )
     return GET_NEW_USER_ROLE
@@ -252,19 +235,19 @@ async def get_new_user_password(update: Update, context: ContextTypes.DEFAULT_TY
 async def get_new_user_role(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    role = query.data.split('_', 1)[1]
+    role = context.args[0]
     context.user_data['new_user_info']['role'] = role
 
     if role == 'vendedor':
-        supervisores = list(context.bot_data['vendedores_collection'].find({"role": "supervisor"}))
+        supervisores = await context.bot_data['repositorio'].listar_supervisores()
         if not supervisores:
             return await finalize_user_creation(update, context, None)
 
         keyboard = [
-            [InlineKeyboardButton(sup['nome_vendedor'], callback_data=f"supervisor_{sup['_id']}")]
+            [InlineKeyboardButton(sup['nome_vendedor'], callback_data=callbacks.SUPERVISOR.codificar(sup['_id']))]
             for sup in supervisores
         ]
-        keyboard.append([InlineKeyboardButton("Nenhum/Independente", callback_data="supervisor_None")])
+        keyboard.append([InlineKeyboardButton("Nenhum/Independente", callback_data=callbacks.SUPERVISOR.codificar(None))])
         reply_markup = InlineKeyboardMarkup(keyboard)
 
         await query.edit_message_text(
@@ -280,8 +263,7 @@ async def get_new_user_role(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def get_new_user_supervisor(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    supervisor_id_str = query.data.split('_', 1)[1]
-    supervisor_id = None if supervisor_id_str == 'None' else ObjectId(supervisor_id_str)
+    supervisor_id = context.args[0]
     return await finalize_user_creation(update, context, supervisor_id)
 
 
@@ -290,7 +272,7 @@ async def finalize_user_creation(update: Update, context: ContextTypes.DEFAULT_T
     vendedor_doc = {
         "nome_vendedor": info['nome'],
         "usuario_login": info['login'],
-        "senha_hash": generate_password_hash(info['senha']),
+        "senha_hash": info['senha_hash'],
         "role": info['role'],
         "supervisor_id": supervisor_id,
         "usuario_telegram": None,
@@ -298,7 +280,7 @@ async def finalize_user_creation(update: Update, context: ContextTypes.DEFAULT_T
         "observacoes": []
     }
 
-    context.bot_data['vendedores_collection'].insert_one(vendedor_doc)
+    await context.bot_data['repositorio'].inserir_vendedor(vendedor_doc)
 
     confirmation_message = (
         f"✅ <b>Usuário Criado com Sucesso!</b>\n\n"
@@ -323,19 +305,19 @@ async def admin_edit_user_start(update: Update, context: ContextTypes.DEFAULT_TY
         await query.edit_message_text("Você não tem permissão.")
         return ConversationHandler.END
 
-    vendedores = list(context.bot_data['vendedores_collection'].find())
+    vendedores = await context.bot_data['repositorio'].listar_vendedores()
     if not vendedores:
         await query.edit_message_text(
             "Nenhum usuário cadastrado.",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Voltar", callback_data="admin_manage_users")]])
+            reply_markup=teclados.VOLTAR_USUARIOS
         )
         return ConversationHandler.END
 
     keyboard = [
-        [InlineKeyboardButton(f"{v['nome_vendedor']} ({v.get('role', 'N/D')})", callback_data=f"edit_user_{v['_id']}")]
+        [InlineKeyboardButton(f"{v['nome_vendedor']} ({v.get('role', 'N/D')})", callback_data=callbacks.EDITAR_USUARIO.codificar(v['_id']))]
         for v in vendedores
     ]
-    keyboard.append([InlineKeyboardButton("⬅️ Voltar", callback_data="admin_manage_users")])
+    keyboard.append([InlineKeyboardButton("⬅️ Voltar", callback_data=callbacks.ADMIN_USUARIOS.codificar())])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     await query.edit_message_text("Selecione o usuário que deseja modificar:", reply_markup=reply_markup)
@@ -345,7 +327,7 @@ async def admin_edit_user_start(update: Update, context: ContextTypes.DEFAULT_TY
 async def select_user_to_edit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    user_id = ObjectId(query.data.split('_', 2)[2])
+    user_id = context.args[0]
     context.user_data['edit_user_id'] = user_id
     await _show_user_edit_menu(update, context, "O que você deseja alterar?")
     return CHOOSE_EDIT_ACTION
@@ -356,13 +338,13 @@ async def _show_user_edit_menu(update: Update, context: ContextTypes.DEFAULT_TYP
     if not user_id:
         return
 
-    vendedores_collection = context.bot_data['vendedores_collection']
-    user_data = vendedores_collection.find_one({"_id": user_id})
+    repositorio = context.bot_data['repositorio']
+    user_data = await repositorio.buscar_vendedor(user_id)
 
     supervisor_id = user_data.get('supervisor_id')
     supervisor_name = "Nenhum/Autônomo"
     if supervisor_id:
-        supervisor = vendedores_collection.find_one({"_id": supervisor_id})
+        supervisor = await repositorio.buscar_vendedor(supervisor_id)
         if supervisor:
             supervisor_name = supervisor['nome_vendedor']
 
@@ -375,28 +357,15 @@ async def _show_user_edit_menu(update: Update, context: ContextTypes.DEFAULT_TYP
         f"{intro_text}"
     )
 
-    keyboard = [
-        [InlineKeyboardButton("Alterar Função", callback_data="edit_choice_role")],
-        [InlineKeyboardButton("Alterar Supervisor", callback_data="edit_choice_supervisor")],
-        [InlineKeyboardButton("⬅️ Voltar à Lista", callback_data="admin_edit_user_start")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    await update.callback_query.edit_message_text(text=user_details, reply_markup=reply_markup, parse_mode='HTML')
+    await update.callback_query.edit_message_text(text=user_details, reply_markup=teclados.MENU_EDICAO_USUARIO,
+                                                  parse_mode='HTML')
 
 
 async def prompt_change_role(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
 
-    keyboard = [
-        [InlineKeyboardButton("Vendedor", callback_data="role_vendedor")],
-        [InlineKeyboardButton("Supervisor", callback_data="role_supervisor")],
-        [InlineKeyboardButton("Administrador", callback_data="role_administrador")],
-        [InlineKeyboardButton("⬅️ Cancelar", callback_data=f"edit_user_{context.user_data['edit_user_id']}")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
+    reply_markup = teclados.funcoes_edicao(context.user_data['edit_user_id'])
     await query.edit_message_text("Selecione a nova função:", reply_markup=reply_markup)
     return EDIT_USER_ROLE
 
@@ -404,10 +373,10 @@ async def prompt_change_role(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def update_user_role(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    new_role = query.data.split('_', 1)[1]
+    new_role = context.args[0]
     user_id = context.user_data.get('edit_user_id')
 
-    context.bot_data['vendedores_collection'].update_one({"_id": user_id}, {"$set": {"role": new_role}})
+    await context.bot_data['repositorio'].atualizar_vendedor(user_id, {"role": new_role})
 
     await _show_user_edit_menu(update, context, f"✅ Função alterada para {new_role.capitalize()}!")
     return CHOOSE_EDIT_ACTION
@@ -416,14 +385,14 @@ async def update_user_role(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 async def prompt_change_supervisor(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    supervisores = list(context.bot_data['vendedores_collection'].find({"role": "supervisor"}))
+    supervisores = await context.bot_data['repositorio'].listar_supervisores()
 
     keyboard = [
-        [InlineKeyboardButton(sup['nome_vendedor'], callback_data=f"new_supervisor_{sup['_id']}")]
+        [InlineKeyboardButton(sup['nome_vendedor'], callback_data=callbacks.NOVO_SUPERVISOR.codificar(sup['_id']))]
         for sup in supervisores
     ]
-    keyboard.append([InlineKeyboardButton("Nenhum/Autônomo", callback_data="new_supervisor_None")])
-    keyboard.append([InlineKeyboardButton("⬅️ Cancelar", callback_data=f"edit_user_{context.user_data['edit_user_id']}")])
+    keyboard.append([InlineKeyboardButton("Nenhum/Autônomo", callback_data=callbacks.NOVO_SUPERVISOR.codificar(None))])
+    keyboard.append([InlineKeyboardButton("⬅️ Cancelar", callback_data=callbacks.EDITAR_USUARIO.codificar(context.user_data['edit_user_id']))])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     await query.edit_message_text("Selecione o novo supervisor:", reply_markup=reply_markup)
@@ -434,19 +403,9 @@ async def update_user_supervisor(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     await query.answer()
 
-    try:
-        new_sup_id_str = query.data.split('_', 2)[2]
-        new_sup_id = None if new_sup_id_str == 'None' else ObjectId(new_sup_id_str)
-    except Exception:
-        # ID malformatado ou split inesperado
-        await query.edit_message_text("ID de supervisor inválido. Tente novamente.")
-        return await prompt_change_supervisor(update, context)
-
+    new_sup_id = context.args[0]
     user_id = context.user_data.get('edit_user_id')
-    context.bot_data['vendedores_collection'].update_one(
-        {"_id": user_id},
-        {"$set": {"supervisor_id": new_sup_id}}
-    )
+    await context.bot_data['repositorio'].atualizar_vendedor(user_id, {"supervisor_id": new_sup_id})
 
     await _show_user_edit_menu(update, context, "✅ Supervisor alterado com sucesso!")
     return CHOOSE_EDIT_ACTION
@@ -463,13 +422,7 @@ async def admin_stats_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         await query.edit_message_text("Você não tem permissão.")
         return
 
-    keyboard = [
-        [InlineKeyboardButton("🌎 Visão Geral", callback_data="admin_stats_geral")],
-        [InlineKeyboardButton("👥 Ver por Supervisor", callback_data="admin_select_supervisor")],
-        [InlineKeyboardButton("👤 Ver Vendedores Autônomos", callback_data="admin_stats_autonomos")],
-        [InlineKeyboardButton("⬅️ Voltar ao Menu Admin", callback_data="admin_back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = teclados.MENU_ESTATISTICAS
 
     await query.edit_message_text(
         "📊 <b>Estatísticas do Dia</b>\n\nEscolha o tipo de visualização:",
@@ -485,25 +438,15 @@ async def admin_stats_geral(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await query.edit_message_text("Você não tem permissão para ver isso.")
         return
 
-    bases_collection = context.bot_data['bases']
-    clientes_collection = context.bot_data['clientes_collection']
-
-    bases_ativas_docs = list(bases_collection.find({"ativa": True}))
-    nomes_bases_ativas = [base['nome_base'] for base in bases_ativas_docs]
-
-    filtro_clientes_pendentes = {"status": "Pendente", "nome_base": {"$in": nomes_bases_ativas}}
-    pendentes = clientes_collection.count_documents(filtro_clientes_pendentes)
+    repositorio = context.bot_data['repositorio']
 
     tz = pytz.timezone('America/Sao_Paulo')
     hoje = datetime.now(tz).date()
-    inicio_dia_utc = tz.localize(datetime.combine(hoje, time.min)).astimezone(UTC)
-    fim_dia_utc = tz.localize(datetime.combine(hoje, time.max)).astimezone(UTC)
 
-    pipeline = [
-        {"$match": {"data_finalizacao": {"$gte": inicio_dia_utc, "$lte": fim_dia_utc}}},
-        {"$group": {"_id": "$status_final", "count": {"$sum": 1}}}
-    ]
-    resultados = list(clientes_collection.aggregate(pipeline))
+    # Contadores mantidos com $inc (ver database/contadores.py): poucos documentos, sem varrer `clientes`.
+    painel = await repositorio.painel_contadores(hoje.strftime('%Y-%m-%d'))
+    pendentes = painel['pendentes']
+    resultados = painel['por_status']
     total_finalizados = sum(item['count'] for item in resultados)
 
     relatorio = f"📊 <b>Resumo Geral - {hoje.strftime('%d/%m/%Y')}</b>\n\n"
@@ -513,10 +456,11 @@ async def admin_stats_geral(update: Update, context: ContextTypes.DEFAULT_TYPE)
         for item in sorted(resultados, key=lambda x: x['_id'] or ''):
             relatorio += f"  - {item['_id'] or 'Sem Status'}: {item['count']}\n"
 
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="admin_stats_menu")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    recolhedor = context.bot_data.get('recolhedor_leases')
+    if recolhedor is not None:
+        relatorio += f"\n♻️ <b>Leads recolhidos por expiração</b> (desde a inicialização): {recolhedor.recolhidos_total}\n"
 
-    await query.edit_message_text(relatorio, reply_markup=reply_markup, parse_mode='HTML')
+    await query.edit_message_text(relatorio, reply_markup=teclados.VOLTAR_ESTATISTICAS, parse_mode='HTML')
 
 
 async def admin_select_supervisor(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -526,21 +470,20 @@ async def admin_select_supervisor(update: Update, context: ContextTypes.DEFAULT_
         await query.edit_message_text("Você não tem permissão.")
         return
 
-    vendedores_collection = context.bot_data['vendedores_collection']
-    supervisores = list(vendedores_collection.find({"role": "supervisor"}))
+    supervisores = await context.bot_data['repositorio'].listar_supervisores()
 
     if not supervisores:
         await query.edit_message_text(
             "Nenhum supervisor encontrado.",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Voltar", callback_data="admin_stats_menu")]])
+            reply_markup=teclados.VOLTAR_ESTATISTICAS
         )
         return
 
     keyboard = [
-        [InlineKeyboardButton(sup['nome_vendedor'], callback_data=f"admin_sup_stats_{sup['_id']}")]
+        [InlineKeyboardButton(sup['nome_vendedor'], callback_data=callbacks.ADMIN_ESTATISTICAS_SUPERVISOR.codificar(sup['_id']))]
         for sup in supervisores
     ]
-    keyboard.append([InlineKeyboardButton("⬅️ Voltar", callback_data="admin_stats_menu")])
+    keyboard.append([InlineKeyboardButton("⬅️ Voltar", callback_data=callbacks.ADMIN_ESTATISTICAS.codificar())])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     await query.edit_message_text("Selecione um supervisor para ver o desempenho da equipe:", reply_markup=reply_markup)
@@ -553,13 +496,10 @@ async def admin_show_supervisor_stats(update: Update, context: ContextTypes.DEFA
         await query.edit_message_text("Você não tem permissão.")
         return
 
-    supervisor_id = ObjectId(query.data.split('_', 3)[3])
+    supervisor_id = context.args[0]
     relatorio = await gerar_relatorio_equipe(supervisor_id, context, "hoje")
 
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar para Seleção", callback_data="admin_select_supervisor")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    await query.edit_message_text(relatorio, reply_markup=reply_markup, parse_mode='HTML')
+    await query.edit_message_text(relatorio, reply_markup=teclados.VOLTAR_SELECAO_SUPERVISOR, parse_mode='HTML')
 
 
 async def admin_show_autonomos_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -569,14 +509,13 @@ async def admin_show_autonomos_stats(update: Update, context: ContextTypes.DEFAU
         await query.edit_message_text("Você não tem permissão.")
         return
 
-    vendedores_collection = context.bot_data['vendedores_collection']
-    clientes_collection = context.bot_data['clientes_collection']
+    repositorio = context.bot_data['repositorio']
 
-    autonomos = list(vendedores_collection.find({"role": "vendedor", "supervisor_id": None}))
+    autonomos = await repositorio.listar_autonomos()
     if not autonomos:
         await query.edit_message_text(
             "Nenhum vendedor autônomo encontrado.",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Voltar", callback_data="admin_stats_menu")]])
+            reply_markup=teclados.VOLTAR_ESTATISTICAS
         )
         return
 
@@ -588,29 +527,61 @@ async def admin_show_autonomos_stats(update: Update, context: ContextTypes.DEFAU
     inicio_dia_utc = tz.localize(datetime.combine(hoje, time.min)).astimezone(UTC)
     fim_dia_utc = tz.localize(datetime.combine(hoje, time.max)).astimezone(UTC)
 
-    pipeline = [
-        {"$match": {"vendedor_atribuido": {"$in": ids_autonomos}, "data_finalizacao": {"$gte": inicio_dia_utc, "$lte": fim_dia_utc}}},
-        {"$group": {"_id": "$vendedor_atribuido", "total_finalizados": {"$sum": 1}, "status_counts": {"$push": "$status_final"}}}
-    ]
-    resultados = list(clientes_collection.aggregate(pipeline))
+    resultados = await repositorio.desempenho_por_vendedor(ids_autonomos, inicio_dia_utc, fim_dia_utc)
 
     relatorio = f"👤 <b>Desempenho de Vendedores Autônomos - {hoje.strftime('%d/%m/%Y')}</b>\n\n"
     if not resultados:
         relatorio += "Nenhum cliente finalizado por vendedores autônomos hoje."
     else:
-        for res in resultados:
-            nome = nomes_autonomos.get(str(res['_id']), "Desconhecido")
-            total = res['total_finalizados']
-            counts = Counter(res['status_counts'])
-            detalhes = ", ".join([f"{status}: {count}" for status, count in sorted(counts.items())])
-            relatorio += f"▪️ <b>{nome}</b>: {total} finalizados\n   - {detalhes}\n"
-
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="admin_stats_menu")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+        relatorio += formatar_desempenho(resultados, nomes_autonomos, marcador="▪️")
 
-    await query.edit_message_text(relatorio, reply_markup=reply_markup, parse_mode='HTML')
+    await query.edit_message_text(relatorio, reply_markup=teclados.VOLTAR_ESTATISTICAS, parse_mode='HTML')
 
 
 async def admin_back_to_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await admin_panel(update, context)
 
+
+async def admin_diagnostico(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/diag: handlers e comandos do MongoDB mais lentos da última hora, mais o estado dos serviços."""
+    if not is_admin(context):
+        await update.message.reply_text("Comando não reconhecido.")
+        return
+
+    metricas = context.bot_data['metricas']
+    texto = "🩺 <b>Diagnóstico - última hora</b>\n\n<b>Handlers mais lentos</b> (p95 / média / máx, chamadas):\n"
+    handlers = metricas.handlers_mais_lentos()
+    if not handlers:
+        texto += "  Nenhum handler executado.\n"
+    for item in handlers:
+        rotulos = item['rotulos']
+        texto += (f"  • <code>{html.escape(rotulos['handler'])}</code> [{html.escape(rotulos['gatilho'])}]: "
+                  f"{item['p95_s'] * 1000:.0f} / {item['media_s'] * 1000:.0f} / {item['max_s'] * 1000:.0f} ms, "
+                  f"{item['chamadas']}x\n")
+
+    comandos = metricas.comandos_mais_lentos()
+    if comandos:
+        texto += "\n<b>Comandos do MongoDB mais lentos</b> (p95 / máx, chamadas):\n"
+        for item in comandos:
+            rotulos = item['rotulos']
+            texto += (f"  • {html.escape(rotulos['comando'])} {html.escape(rotulos['colecao'] or '-')}: "
+                      f"{item['p95_s'] * 1000:.0f} / {item['max_s'] * 1000:.0f} ms, {item['chamadas']}x\n")
+
+    cache = context.bot_data.get('cache_relatorios')
+    if cache is not None:
+        estatisticas = cache.estatisticas()
+        texto += (f"\n🗄️ Cache de relatórios: {estatisticas['itens']}/{estatisticas['capacidade']} itens, "
+                  f"acerto {estatisticas['taxa_acerto']:.0%}\n")
+    recolhedor = context.bot_data.get('recolhedor_leases')
+    if recolhedor is not None:
+        texto += f"♻️ Recolhedor: {recolhedor.execucoes} varreduras, {recolhedor.recolhidos_total} leads recolhidos\n"
+    fila_leads = context.bot_data.get('fila_leads')
+    if fila_leads is not None and fila_leads.validade_pre_reserva_s:
+        texto += (f"⏩ Pré-reservas: {fila_leads.pre_reservas_usadas} usadas, "
+                  f"{fila_leads.pre_reservas_expiradas} expiradas, {fila_leads.pre_reservas_perdidas} perdidas\n")
+    reconciliador = context.bot_data.get('reconciliador_contadores')
+    if reconciliador is not None:
+        texto += (f"🧮 Reconciliação: {reconciliador.execucoes} execuções, "
+                  f"{reconciliador.corrigidos_total} contadores corrigidos\n")
+
+    await update.message.reply_text(texto, parse_mode='HTML')
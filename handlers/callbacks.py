@@ -0,0 +1,253 @@
+# handlers/callbacks.py
+"""
+Botões inline: formato do callback_data e roteamento.
+
+callback_data = "<id da ação>|<arg>|<arg>...", com argumentos tipados e compactos
+(ObjectId em 16 caracteres base64url, inteiros e datas em base 36). O Telegram aceita no máximo
+64 bytes; `Acao.codificar` recusa o que passar disso. O id da ação é achado numa árvore de
+prefixos (um passo por caractere) e os handlers recebem os argumentos já decodificados em
+`context.args`, como no CommandHandler.
+"""
+import base64
+import binascii
+import functools
+from datetime import datetime, timedelta, UTC
+from bson.objectid import ObjectId
+from telegram import Update
+from telegram.ext import CallbackQueryHandler, ContextTypes
+
+SEPARADOR = "|"
+LIMITE_CALLBACK_DATA = 64
+_DIGITOS_36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+_EPOCA = datetime(1970, 1, 1)
+
+MSG_BOTAO_EXPIRADO = "Este botão não é mais válido. Abra o menu novamente."
+
+
+def _int_para_texto(numero: int) -> str:
+    if numero < 0:
+        return "-" + _int_para_texto(-numero)
+    texto = ""
+    while True:
+        numero, resto = divmod(numero, 36)
+        texto = _DIGITOS_36[resto] + texto
+        if not numero:
+            return texto
+
+
+def _oid_para_texto(valor) -> str:
+    return "" if valor is None else base64.urlsafe_b64encode(ObjectId(valor).binary).decode()
+
+
+def _texto_para_oid(texto: str):
+    if not texto:
+        return None
+    try:
+        return ObjectId(base64.urlsafe_b64decode(texto.encode()))
+    except (binascii.Error, TypeError) as e:
+        raise ValueError(texto) from e
+
+
+def _data_para_texto(data: datetime) -> str:
+    if data.tzinfo is not None:
+        data = data.astimezone(UTC).replace(tzinfo=None)
+    return _int_para_texto((data - _EPOCA) // timedelta(milliseconds=1))
+
+
+def _texto_para_data(texto: str) -> datetime:
+    """Data em UTC sem fuso, como as que vêm do MongoDB."""
+    return _EPOCA + timedelta(milliseconds=int(texto, 36))
+
+
+def _texto_para_bool(texto: str) -> bool:
+    if texto not in ("0", "1"):
+        raise ValueError(texto)
+    return texto == "1"
+
+
+# tipo do argumento -> (codificar, decodificar); decodificar levanta ValueError se o texto for inválido.
+# ObjectId aceita None (texto vazio), para escolhas como "nenhum supervisor".
+CODECS = {
+    str: (str, str),
+    int: (_int_para_texto, lambda texto: int(texto, 36)),
+    bool: (lambda valor: "1" if valor else "0", _texto_para_bool),
+    ObjectId: (_oid_para_texto, _texto_para_oid),
+    datetime: (_data_para_texto, _texto_para_data),
+}
+
+
+class TabelaPrefixos:
+    """Árvore de prefixos por caractere: acha a ação de um callback_data em O(tamanho do id)."""
+
+    def __init__(self):
+        self._raiz = {}
+
+    def inserir(self, chave: str, valor) -> None:
+        no = self._raiz
+        for caractere in chave:
+            no = no.setdefault(caractere, {})
+        if None in no:
+            raise ValueError(f"Ação de callback duplicada: {chave!r}")
+        no[None] = valor
+
+    def buscar(self, dados: str):
+        """(valor, texto dos argumentos) do id no início de `dados`, ou (None, None)."""
+        no = self._raiz
+        for posicao, caractere in enumerate(dados):
+            if caractere == SEPARADOR:
+                return (no[None], dados[posicao + 1:]) if None in no else (None, None)
+            no = no.get(caractere)
+            if no is None:
+                return None, None
+        return (no[None], None) if None in no else (None, None)
+
+
+_TABELA = TabelaPrefixos()
+
+
+class Acao:
+    """
+    Uma ação de botão: id curto, nome legível (usado nas métricas) e tipos dos argumentos.
+    Também serve de `pattern` para CallbackQueryHandler (casa com callback_data válidos desta ação).
+    """
+
+    def __init__(self, id_acao: str, nome: str, *tipos):
+        if SEPARADOR in id_acao:
+            raise ValueError(f"Id de ação com separador: {id_acao!r}")
+        self.id = id_acao
+        self.nome = nome
+        self.tipos = tipos
+        _TABELA.inserir(id_acao, self)
+
+    def codificar(self, *args) -> str:
+        if len(args) != len(self.tipos):
+            raise TypeError(f"{self.nome} espera {len(self.tipos)} argumento(s), recebeu {len(args)}")
+        partes = [self.id]
+        for tipo, valor in zip(self.tipos, args):
+            texto = CODECS[tipo][0](valor)
+            if SEPARADOR in texto:
+                raise ValueError(f"Argumento de {self.nome} contém '{SEPARADOR}': {texto!r}")
+            partes.append(texto)
+        dados = SEPARADOR.join(partes)
+        if len(dados.encode()) > LIMITE_CALLBACK_DATA:
+            raise ValueError(f"callback_data de {self.nome} passa de {LIMITE_CALLBACK_DATA} bytes: {dados!r}")
+        return dados
+
+    def decodificar_argumentos(self, texto) -> list:
+        if not self.tipos:
+            if texto is not None:
+                raise ValueError(texto)
+            return []
+        partes = (texto or "").split(SEPARADOR)
+        if texto is None or len(partes) != len(self.tipos):
+            raise ValueError(texto)
+        return [CODECS[tipo][1](parte) for tipo, parte in zip(self.tipos, partes)]
+
+    def __call__(self, dados) -> bool:
+        return isinstance(dados, str) and decodificar(dados)[0] is self
+
+    def __str__(self) -> str:
+        return self.nome
+
+    def __repr__(self) -> str:
+        return f"Acao({self.id!r}, {self.nome!r})"
+
+
+def decodificar(dados: str):
+    """(ação, argumentos) de um callback_data, ou (None, None) se não for de uma ação conhecida e bem formada."""
+    acao, texto = _TABELA.buscar(dados)
+    if acao is None:
+        return None, None
+    try:
+        return acao, acao.decodificar_argumentos(texto)
+    except ValueError:
+        return None, None
+
+
+class RoteadorCallbacks(CallbackQueryHandler):
+    """
+    Um único CallbackQueryHandler para os botões fora das conversações: acha a ação pela árvore de
+    prefixos e chama o handler registrado com os argumentos em `context.args`. Botões de ações
+    desconhecidas (mensagens antigas, conversa já encerrada) recebem um aviso em vez de ficar girando.
+    """
+
+    def __init__(self):
+        super().__init__(self._despachar)
+        self.rotas = {}
+
+    def registrar(self, acao: Acao, callback) -> None:
+        if acao in self.rotas:
+            raise ValueError(f"Ação {acao.nome} já registrada")
+        self.rotas[acao] = callback
+
+    async def _despachar(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        acao, args = decodificar(update.callback_query.data or "")
+        callback = self.rotas.get(acao)
+        if callback is None:
+            await update.callback_query.answer(MSG_BOTAO_EXPIRADO, show_alert=True)
+            return None
+        context.args = args
+        return await callback(update, context)
+
+
+def em_conversa(acao: Acao, callback) -> CallbackQueryHandler:
+    """CallbackQueryHandler para entry_points/states de ConversationHandler, com os argumentos em `context.args`."""
+    @functools.wraps(callback)
+    async def _com_argumentos(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        context.args = decodificar(update.callback_query.data)[1]
+        return await callback(update, context)
+    return CallbackQueryHandler(_com_argumentos, pattern=acao)
+
+
+# -------------------------------
+# Ações
+# -------------------------------
+# Vendedor
+STATUS = Acao("s", "status", str)
+CONSULTA = Acao("c", "consulta", ObjectId)
+BANCO = Acao("b", "banco", str)
+RESULTADO = Acao("r", "resultado", str)
+NOTA = Acao("n", "nota", ObjectId)
+HISTORICO = Acao("h", "historico", ObjectId)
+HISTORICO_PAGINA = Acao("hp", "historico_pagina", str, ObjectId, datetime, ObjectId, int)
+VER_CLIENTE = Acao("v", "ver_cliente", ObjectId)
+HOJE_PAGINA = Acao("hj", "hoje_pagina", str, datetime, ObjectId)
+FILTRO = Acao("f", "filtro", str)
+FILTRO_PAGINA = Acao("fp", "filtro_pagina", str, ObjectId, str)
+
+# Supervisor
+SUP_PAINEL = Acao("sp", "sup_painel")
+SUP_DESEMPENHO_HOJE = Acao("sd", "sup_desempenho_hoje")
+
+# Administração
+ADMIN_PAINEL = Acao("a", "admin_painel")
+ADMIN_ESTATISTICAS = Acao("ae", "admin_estatisticas")
+ADMIN_ESTATISTICAS_GERAL = Acao("aeg", "admin_estatisticas_geral")
+ADMIN_ESCOLHER_SUPERVISOR = Acao("aes", "admin_escolher_supervisor")
+ADMIN_ESTATISTICAS_SUPERVISOR = Acao("aev", "admin_estatisticas_supervisor", ObjectId)
+ADMIN_ESTATISTICAS_AUTONOMOS = Acao("aea", "admin_estatisticas_autonomos")
+ADMIN_USUARIOS = Acao("au", "admin_usuarios")
+ADMIN_NOVO_USUARIO = Acao("aun", "admin_novo_usuario")
+ADMIN_EDITAR_USUARIOS = Acao("aue", "admin_editar_usuarios")
+FUNCAO = Acao("fn", "funcao", str)
+SUPERVISOR = Acao("su", "supervisor", ObjectId)
+EDITAR_USUARIO = Acao("eu", "editar_usuario", ObjectId)
+EDITAR_FUNCAO = Acao("ef", "editar_funcao")
+EDITAR_SUPERVISOR = Acao("es", "editar_supervisor")
+NOVO_SUPERVISOR = Acao("ns", "novo_supervisor", ObjectId)
+ADMIN_MENSAGENS = Acao("am", "admin_mensagens")
+ADMIN_LISTAR_MENSAGENS = Acao("aml", "admin_listar_mensagens")
+ADMIN_NOVA_MENSAGEM = Acao("amn", "admin_nova_mensagem")
+ADMIN_ATIVAR_MENSAGEM = Acao("ama", "admin_ativar_mensagem", ObjectId, bool)
+ADMIN_BASES = Acao("ab", "admin_bases")
+ADMIN_ATIVAR_BASE = Acao("aba", "admin_ativar_base", ObjectId, bool)
+
+# Relatórios
+RELATORIOS = Acao("rl", "relatorios")
+RELATORIO_PERIODOS = Acao("rp", "relatorio_periodos", str)
+RELATORIO_SUPERVISORES = Acao("rs", "relatorio_supervisores")
+RELATORIO_PERIODOS_SUPERVISOR = Acao("rps", "relatorio_periodos_supervisor", ObjectId)
+RELATORIO_GERAL = Acao("rg", "relatorio_geral", str)
+RELATORIO_TOTAIS = Acao("rt", "relatorio_totais", str)
+RELATORIO_SUPERVISOR = Acao("rsv", "relatorio_supervisor", ObjectId, str)
+EXPORTAR = Acao("x", "exportar", str, ObjectId, str)
@@ -3,18 +3,37 @@ import re
 import os
 import random
 import logging
-from urllib.parse import quote
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 
+from . import callbacks
+
 (USERNAME, PASSWORD, GET_PHONE, SELECT_BANK, SELECT_RESULT, GET_NOTE) = range(6)
 (GET_NEW_USER_NAME, GET_NEW_USER_LOGIN, GET_NEW_USER_PASS, GET_NEW_USER_ROLE, GET_NEW_USER_SUPERVISOR) = range(6, 11)
 GET_MSG_NAME, GET_MSG_TEXT = range(11, 13)
 GET_BALANCE_AMOUNT = range(13, 14)
 SELECT_USER_TO_EDIT, CHOOSE_EDIT_ACTION, EDIT_USER_ROLE, EDIT_USER_SUPERVISOR = range(14, 18)
 
-STATUS_MAP = {"status_contatado": "✅ Contatado", "status_venda_fechada": "💰 Venda Fechada",
-              "status_sem_interesse": "❌ Sem Interesse", "status_sem_whatsapp": "📵 Sem WhatsApp"}
+STATUS_MAP = {"contatado": "✅ Contatado", "venda_fechada": "💰 Venda Fechada",
+              "sem_interesse": "❌ Sem Interesse", "sem_whatsapp": "📵 Sem WhatsApp"}
+
+TAMANHO_PAGINA = 10
+
+
+def _linha_paginacao(acao: callbacks.Acao, itens: list, ha_anterior: bool, ha_proxima: bool, cursor,
+                     *sufixo) -> list:
+    """
+    Botões "anteriores/próximos" de uma listagem paginada por keyset.
+    Argumentos do botão: direção ("p"/"n"), `cursor(primeiro ou último item)` (uma tupla) e `sufixo`.
+    """
+    linha = []
+    if itens and ha_anterior:
+        linha.append(InlineKeyboardButton(
+            "⬅️ Anteriores", callback_data=acao.codificar("p", *cursor(itens[0]), *sufixo)))
+    if itens and ha_proxima:
+        linha.append(InlineKeyboardButton(
+            "Próximos ➡️", callback_data=acao.codificar("n", *cursor(itens[-1]), *sufixo)))
+    return linha
 
 
 def is_admin(context: ContextTypes.DEFAULT_TYPE) -> bool:
@@ -23,35 +42,39 @@ def is_admin(context: ContextTypes.DEFAULT_TYPE) -> bool:
     return False
 
 
-async def _enviar_info_cliente(update: Update, context: ContextTypes.DEFAULT_TYPE, cliente: dict,
-                               texto_introducao: str):
+async def _montar_info_cliente(context: ContextTypes.DEFAULT_TYPE, cliente: dict, texto_introducao: str) -> tuple:
+    """Texto e teclado do cartão do cliente (com o link do WhatsApp já com a mensagem do template)."""
     telefone_bruto = cliente ['telefone'];
     numero_limpo = re.sub(r'\D', '', str(telefone_bruto));
     whatsapp_url = f"https://wa.me/55{numero_limpo}"
-    mensagens_collection = context.bot_data.get('mensagens_collection')
-    if mensagens_collection is not None:
-        mensagens_ativas = list(mensagens_collection.find({"ativo": True}))
-        if mensagens_ativas:
-            mensagem_escolhida = random.choice(mensagens_ativas) ['texto'];
+    templates_mensagem = context.bot_data.get('templates_mensagem')
+    if templates_mensagem is not None:
+        templates_ativos = await templates_mensagem.obter()
+        if templates_ativos:
+            template_escolhido = random.choice(templates_ativos);
             primeiro_nome_cliente = str(cliente.get('nome_cliente', '')).split() [0] if cliente.get(
                 'nome_cliente') else "Cliente";
             primeiro_nome_vendedor = context.user_data ['vendedor_logado'] ['nome'].split() [0]
-            mensagem_personalizada = mensagem_escolhida.replace("{{cliente}}", primeiro_nome_cliente).replace(
-                "{{vendedor}}", primeiro_nome_vendedor);
-            mensagem_codificada = quote(mensagem_personalizada);
+            mensagem_codificada = template_escolhido.renderizar(
+                cliente=primeiro_nome_cliente, vendedor=primeiro_nome_vendedor);
             whatsapp_url = f"https://wa.me/55{numero_limpo}?text={mensagem_codificada}"
 
     texto_principal = (
         f"<b>Nome:</b> {cliente.get('nome_cliente', 'N/A')}\n<b>CPF:</b> <code>{cliente.get('cpf', 'N/A')}</code>\n<b>Telefone:</b> <code>{cliente.get('telefone', 'N/A')}</code>")
     texto_final = f"{texto_introducao}\n\n{texto_principal}"
     keyboard = [[InlineKeyboardButton("🟢 Chamar no WhatsApp", url=whatsapp_url),
-                 InlineKeyboardButton("📵 Sem WhatsApp", callback_data="status_sem_whatsapp")],
-                [InlineKeyboardButton("🔍 Consultar no Banco", callback_data=f"start_consulta_{cliente ['_id']}")],
-                [InlineKeyboardButton("✅ Contatado", callback_data="status_contatado"),
-                 InlineKeyboardButton("❌ Sem Interesse", callback_data="status_sem_interesse")],
-                [InlineKeyboardButton("💰 Venda Fechada", callback_data="status_venda_fechada")],
-                [InlineKeyboardButton("📜 Ver Histórico", callback_data=f"show_history_{cliente ['_id']}")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+                 InlineKeyboardButton("📵 Sem WhatsApp", callback_data=callbacks.STATUS.codificar("sem_whatsapp"))],
+                [InlineKeyboardButton("🔍 Consultar no Banco", callback_data=callbacks.CONSULTA.codificar(cliente ['_id']))],
+                [InlineKeyboardButton("✅ Contatado", callback_data=callbacks.STATUS.codificar("contatado")),
+                 InlineKeyboardButton("❌ Sem Interesse", callback_data=callbacks.STATUS.codificar("sem_interesse"))],
+                [InlineKeyboardButton("💰 Venda Fechada", callback_data=callbacks.STATUS.codificar("venda_fechada"))],
+                [InlineKeyboardButton("📜 Ver Histórico", callback_data=callbacks.HISTORICO.codificar(cliente ['_id']))]]
+    return texto_final, InlineKeyboardMarkup(keyboard)
+
+
+async def _enviar_info_cliente(update: Update, context: ContextTypes.DEFAULT_TYPE, cliente: dict,
+                               texto_introducao: str):
+    texto_final, reply_markup = await _montar_info_cliente(context, cliente, texto_introducao)
 
     if update.callback_query:
         try:
@@ -67,7 +90,8 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     from handlers.admin_handlers import admin_panel
     query = update.callback_query
     if query:
-        if "admin_" in query.data or "edit_user" in query.data or "role_" in query.data or "supervisor_" in query.data:
+        acao = callbacks.decodificar(query.data or "")[0]
+        if str(acao).startswith(("admin_", "editar_", "funcao", "supervisor", "novo_supervisor")):
             await admin_panel(update, context)
         else:
             await query.edit_message_text(text="Operação cancelada.")
@@ -1,88 +1,128 @@
 # handlers/relatorios_handlers.py
 
+import asyncio
 import logging
 from datetime import datetime, timedelta, time
-from collections import Counter
 from bson.objectid import ObjectId
 import pytz
-from bson.objectid import ObjectId, InvalidId
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
 from telegram.ext import ContextTypes
 from telegram.helpers import escape_markdown
 from telegram.error import BadRequest
-from bson.objectid import ObjectId
 
-def get_date_ranges():
+from database.relatorios import comparar_desempenho
+from handlers import callbacks, teclados
+from services.cache_relatorios import escopo_vendedores
+from services.exportacao import ESCRITORES, FORMATOS, PROJECAO as PROJECAO_EXPORTACAO, preparar_envio
+
+PERIODOS_FIXOS = ("hoje", "ontem", "semana_atual", "semana_passada", "mes_atual", "mes_passado")
+
+# Atalhos de comparação: período -> (janela atual, janela de referência)
+PERIODOS_COMPARACAO = {
+    "comparar_semana": ("semana_atual", "semana_passada"),
+    "comparar_mes": ("mes_atual", "mes_passado"),
+    "comparar_90_dias": ("ultimos_90_dias", "90_dias_anteriores"),
+}
+
+# Maior intervalo aceito no /periodo
+MAX_DIAS_PERIODO = 366
+
+
+def _intervalo_dias(inicio, fim) -> dict:
     tz = pytz.timezone('America/Sao_Paulo')
-    today = datetime.now(tz).date()
+    return {"start": tz.localize(datetime.combine(inicio, time.min)), "end": tz.localize(datetime.combine(fim, time.max))}
 
-    # Hoje
-    start_of_today = tz.localize(datetime.combine(today, time.min))
-    end_of_today = tz.localize(datetime.combine(today, time.max))
 
-    ranges = {
-        "hoje": {"start": start_of_today, "end": end_of_today}
-    }
+def intervalo_do_periodo(periodo: str, today=None):
+    """
+    {"start", "end"} (America/Sao_Paulo) de um período nomeado, ou None se o nome não existir.
+    Além dos fixos, aceita "ultimos_<n>_dias" (incluindo hoje) e "<n>_dias_anteriores" (os n dias antes desses).
+    """
+    if today is None:
+        today = datetime.now(pytz.timezone('America/Sao_Paulo')).date()
 
-    # Ontem
-    yesterday = today - timedelta(days=1)
-    ranges["ontem"] = {
-        "start": tz.localize(datetime.combine(yesterday, time.min)),
-        "end": tz.localize(datetime.combine(yesterday, time.max))
-    }
+    if periodo == "hoje":
+        return _intervalo_dias(today, today)
+    if periodo == "ontem":
+        yesterday = today - timedelta(days=1)
+        return _intervalo_dias(yesterday, yesterday)
 
-    # Semana atual (seg a dom)
+    # Semanas de seg a dom
     start_of_week = today - timedelta(days=today.weekday())
-    end_of_week = start_of_week + timedelta(days=6)
-    ranges["semana_atual"] = {
-        "start": tz.localize(datetime.combine(start_of_week, time.min)),
-        "end": tz.localize(datetime.combine(end_of_week, time.max))
-    }
+    if periodo == "semana_atual":
+        return _intervalo_dias(start_of_week, start_of_week + timedelta(days=6))
+    if periodo == "semana_passada":
+        return _intervalo_dias(start_of_week - timedelta(days=7), start_of_week - timedelta(days=1))
 
-    # Semana passada
-    start_of_last_week = start_of_week - timedelta(days=7)
-    end_of_last_week = start_of_week - timedelta(days=1)
-    ranges["semana_passada"] = {
-        "start": tz.localize(datetime.combine(start_of_last_week, time.min)),
-        "end": tz.localize(datetime.combine(end_of_last_week, time.max))
-    }
-
-    # Mês atual
     start_of_month = today.replace(day=1)
-    next_month_start = (start_of_month + timedelta(days=32)).replace(day=1)
-    end_of_month = next_month_start - timedelta(days=1)
-    ranges["mes_atual"] = {
-        "start": tz.localize(datetime.combine(start_of_month, time.min)),
-        "end": tz.localize(datetime.combine(end_of_month, time.max))
-    }
+    if periodo == "mes_atual":
+        next_month_start = (start_of_month + timedelta(days=32)).replace(day=1)
+        return _intervalo_dias(start_of_month, next_month_start - timedelta(days=1))
+    if periodo == "mes_passado":
+        end_of_last_month = start_of_month - timedelta(days=1)
+        return _intervalo_dias(end_of_last_month.replace(day=1), end_of_last_month)
+
+    partes = periodo.split('_')
+    if len(partes) == 3 and partes[0] == "ultimos" and partes[1].isdigit() and partes[2] == "dias":
+        dias = int(partes[1])
+        if 0 < dias <= MAX_DIAS_PERIODO:
+            return _intervalo_dias(today - timedelta(days=dias - 1), today)
+    if len(partes) == 3 and partes[0].isdigit() and partes[1:] == ["dias", "anteriores"]:
+        dias = int(partes[0])
+        if 0 < dias <= MAX_DIAS_PERIODO:
+            return _intervalo_dias(today - timedelta(days=2 * dias - 1), today - timedelta(days=dias))
+    return None
 
-    # Mês passado
-    end_of_last_month = start_of_month - timedelta(days=1)
-    start_of_last_month = end_of_last_month.replace(day=1)
-    ranges["mes_passado"] = {
-        "start": tz.localize(datetime.combine(start_of_last_month, time.min)),
-        "end": tz.localize(datetime.combine(end_of_last_month, time.max))
-    }
 
-    return ranges
+def get_date_ranges():
+    today = datetime.now(pytz.timezone('America/Sao_Paulo')).date()
+    return {periodo: intervalo_do_periodo(periodo, today) for periodo in PERIODOS_FIXOS}
+
+
+def _rotulo_periodo(periodo: str, date_range: dict) -> str:
+    return (f"{periodo.replace('_', ' ').capitalize()} "
+            f"({date_range['start'].strftime('%d/%m')} a {date_range['end'].strftime('%d/%m')})")
+
+
+def formatar_desempenho(resultados: list, nomes_vendedores: dict, marcador: str = "👤") -> str:
+    """Uma linha por vendedor (total e contagem por status) a partir de Repositorio.desempenho_por_vendedor()."""
+    linhas = []
+    for res in resultados:
+        nome = nomes_vendedores.get(str(res['_id']), "Desconhecido")
+        contagens = sorted(res['status_counts'].items(), key=lambda item: item[0] or '')
+        detalhes = ", ".join(f"{status or 'Sem Status'}: {total}" for status, total in contagens)
+        linhas.append(f"{marcador} <b>{nome}</b>: {res['total_finalizados']} finalizados\n   - {detalhes}\n")
+    return "".join(linhas)
+
+
+def _variacao(delta: int) -> str:
+    if delta > 0:
+        return f"▲ +{delta}"
+    if delta < 0:
+        return f"▼ {delta}"
+    return "= 0"
+
+
+def formatar_comparativo(comparativo: list, nomes_vendedores: dict, marcador: str = "👤") -> str:
+    """Uma linha por vendedor com o total, a variação e a variação por status (ver comparar_desempenho)."""
+    linhas = []
+    for item in comparativo:
+        nome = nomes_vendedores.get(str(item['_id']), "Desconhecido")
+        contagens = sorted(item['status'].items(), key=lambda par: par[0] or '')
+        detalhes = ", ".join(
+            f"{status or 'Sem Status'}: {valores['atual']} ({valores['delta']:+d})" for status, valores in contagens
+        )
+        linhas.append(f"{marcador} <b>{nome}</b>: {item['total']} finalizados "
+                      f"({_variacao(item['delta'])} vs {item['total_anterior']})\n   - {detalhes}\n")
+    return "".join(linhas)
 
 
-def _extract_period_from_callback(data: str) -> str:
-    """
-    Extrai o período do callback_data dos botões de relatório.
-    Exemplos de data:
-      gerar_relatorio_geral_hoje -> 'hoje'
-      gerar_relatorio_geral_semana_atual -> 'semana_atual'
-      gerar_relatorio_totais_mes_passado -> 'mes_passado'
-    """
-    parts = data.split('_')
-    # Padrões esperados:
-    # ['gerar','relatorio','geral','hoje']
-    # ['gerar','relatorio','geral','semana','atual']
-    # ['gerar','relatorio','totais','mes','passado']
-    if len(parts) >= 5 and parts[-2] in ('semana', 'mes'):
-        return f"{parts[-2]}_{parts[-1]}"
-    return parts[-1]
+async def _em_cache(context: ContextTypes.DEFAULT_TYPE, tipo: str, escopo, inicio_utc, fim_utc, calcular):
+    """Resultado de relatório via CacheRelatorios (bot_data['cache_relatorios']), se houver."""
+    cache = context.bot_data.get('cache_relatorios')
+    if cache is None:
+        return await calcular()
+    return await cache.obter(tipo, escopo, inicio_utc, fim_utc, calcular)
 
 
 async def relatorios_panel_inicial(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -96,19 +136,9 @@ async def relatorios_panel_inicial(update: Update, context: ContextTypes.DEFAULT
             await update.message.reply_text("Comando não reconhecido.")
         return
 
-    keyboard = []
-
-    if user_role == 'administrador':
-        keyboard.append([InlineKeyboardButton("📊 Relatório Geral (por Vendedor)", callback_data="relatorio_geral")])
-        keyboard.append([InlineKeyboardButton("📈 Relatório de Totais (por Status)", callback_data="relatorio_totais")])
-        keyboard.append([InlineKeyboardButton("👥 Relatório por Supervisor", callback_data="relatorio_por_supervisor")])
-    else:
-        # Supervisor: mostra o "Geral" filtrado pela própria equipe + Totais
-        keyboard.append([InlineKeyboardButton("📊 Relatório da Minha Equipe (por Vendedor)", callback_data="relatorio_geral")])
-        keyboard.append([InlineKeyboardButton("📈 Relatório de Totais (por Status)", callback_data="relatorio_totais")])
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    message_text = "Selecione o tipo de relatório que deseja gerar:"
+    reply_markup = teclados.painel_relatorios(user_role)
+    message_text = ("Selecione o tipo de relatório que deseja gerar:\n\n"
+                    "Para um intervalo livre, use /periodo DD/MM/AAAA DD/MM/AAAA.")
 
     if update.callback_query:
         await update.callback_query.answer()
@@ -120,41 +150,104 @@ async def relatorios_panel_inicial(update: Update, context: ContextTypes.DEFAULT
 async def selecionar_periodo_para_relatorio(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
-    report_type = query.data  # "relatorio_geral" OU "relatorio_totais"
-
-    keyboard = [
-        [InlineKeyboardButton("Hoje", callback_data=f"gerar_{report_type}_hoje"),
-         InlineKeyboardButton("Ontem", callback_data=f"gerar_{report_type}_ontem")],
-        [InlineKeyboardButton("Esta Semana", callback_data=f"gerar_{report_type}_semana_atual"),
-         InlineKeyboardButton("Semana Passada", callback_data=f"gerar_{report_type}_semana_passada")],
-        [InlineKeyboardButton("Este Mês", callback_data=f"gerar_{report_type}_mes_atual"),
-         InlineKeyboardButton("Mês Passado", callback_data=f"gerar_{report_type}_mes_passado")],
-        [InlineKeyboardButton("⬅️ Voltar", callback_data="relatorio_voltar_inicial")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    report_type = context.args[0]  # "geral" OU "totais"
+    reply_markup = teclados.periodos_relatorio(report_type)
     await query.edit_message_text("Selecione o período do relatório:", reply_markup=reply_markup)
 
 
-from telegram.error import BadRequest  # garanta que este import exista no topo do arquivo
+def _intervalo_exportado(periodo: str):
+    partes = periodo.split('-')
+    if len(partes) == 2 and all(len(p) == 8 and p.isdigit() for p in partes):
+        try:
+            inicio, fim = (datetime.strptime(p, '%Y%m%d').date() for p in partes)
+        except ValueError:
+            return None
+        return _intervalo_dias(inicio, fim)
+    return intervalo_do_periodo(periodo)
 
 
-async def gerar_relatorio_geral(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def exportar_relatorio(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Envia como documento (XLSX ou CSV) os clientes finalizados do relatório, uma linha por cliente."""
     query = update.callback_query
-    await query.answer()
-
-    periodo = _extract_period_from_callback(query.data)
+    user_ctx = context.user_data.get('vendedor_logado', {}) or {}
+    user_role = user_ctx.get('role')
+    if user_role not in ['supervisor', 'administrador']:
+        await query.answer("Você não tem permissão para exportar relatórios.", show_alert=True)
+        return
 
-    ranges = get_date_ranges()
-    date_range = ranges.get(periodo)
-    if not date_range:
-        await query.edit_message_text("Período inválido.")
+    codigo_formato, supervisor_id, periodo = context.args
+    try:
+        formato = FORMATOS[codigo_formato]
+        date_range = _intervalo_exportado(periodo)
+        if date_range is None:
+            raise ValueError(periodo)
+        if supervisor_id is None:
+            supervisor_id = user_ctx['_id'] if user_role == 'supervisor' else None
+        elif user_role != 'administrador':
+            raise ValueError(supervisor_id)
+    except (ValueError, KeyError):
+        await query.answer("Não foi possível exportar este relatório.", show_alert=True)
         return
 
+    await query.answer("Gerando o arquivo, aguarde...")
+    partes = []
+    try:
+        repositorio = context.bot_data['repositorio']
+        if supervisor_id is None:
+            vendedores = await repositorio.listar_vendedores({}, {"_id": 1, "nome_vendedor": 1})
+            ids_vendedores = None
+        else:
+            vendedores = await repositorio.listar_equipe(supervisor_id, {"_id": 1, "nome_vendedor": 1})
+            ids_vendedores = [v['_id'] for v in vendedores]
+        nomes_vendedores = {v['_id']: v.get('nome_vendedor', 'Desconhecido') for v in vendedores}
+
+        escrever = ESCRITORES[formato]
+        arquivo, linhas = await repositorio.exportar_finalizados(
+            ids_vendedores, date_range['start'].astimezone(pytz.utc), date_range['end'].astimezone(pytz.utc),
+            PROJECAO_EXPORTACAO, lambda cursor: escrever(cursor, nomes_vendedores)
+        )
+        nome_arquivo = f"finalizados_{date_range['start']:%Y%m%d}_{date_range['end']:%Y%m%d}.{formato}"
+        # Acima do limite de upload do Telegram o arquivo vai compactado (e, se preciso, em partes).
+        partes = await asyncio.to_thread(preparar_envio, arquivo, nome_arquivo)
+
+        legenda = f"{linhas} clientes finalizados de {date_range['start']:%d/%m/%Y} a {date_range['end']:%d/%m/%Y}."
+        for numero, (parte, nome_parte) in enumerate(partes, start=1):
+            if len(partes) > 1:
+                legenda_parte = f"{legenda}\nParte {numero} de {len(partes)}: junte as partes para abrir o .zip."
+            else:
+                legenda_parte = legenda
+            # O arquivo vai como está (sem ser lido para a memória); o httpx o envia em blocos.
+            documento = InputFile(parte, filename=nome_parte, read_file_handle=False)
+            await query.message.reply_document(document=documento, caption=legenda_parte)
+    except Exception as e:
+        logging.error(f"Erro ao exportar o relatório {codigo_formato}/{periodo}: {e}")
+        await query.message.reply_text("❌ Não foi possível gerar o arquivo. Tente novamente em instantes.")
+    finally:
+        for parte, _ in partes:
+            parte.close()
+
+
+async def _editar_relatorio(query, relatorio: str, reply_markup) -> None:
+    """Edita a mensagem com o relatório; se o texto for o mesmo (botão apertado de novo), força a edição."""
+    try:
+        await query.edit_message_text(relatorio, reply_markup=reply_markup, parse_mode='HTML')
+    except BadRequest as e:
+        if "Message is not modified" in str(e):
+            await query.edit_message_text(relatorio + "\u2060", reply_markup=reply_markup, parse_mode='HTML')
+        else:
+            raise
+
+
+async def _montar_relatorio_geral(context: ContextTypes.DEFAULT_TYPE, rotulo: str, date_range: dict,
+                                  rotulo_anterior: str = None, range_anterior: dict = None) -> str:
+    """
+    Texto do relatório por vendedor (toda a força de vendas, ou a equipe se quem pede é supervisor).
+    Com `range_anterior`, as duas janelas saem de uma única agregação e cada número vem com a variação.
+    """
     start_date_utc = date_range['start'].astimezone(pytz.utc)
     end_date_utc = date_range['end'].astimezone(pytz.utc)
 
-    clientes_collection = context.bot_data['clientes_collection']
-    vendedores_collection = context.bot_data['vendedores_collection']
+    repositorio = context.bot_data['repositorio']
 
     # --- Novo: se for supervisor, restringe aos vendedores da própria equipe (aceitando 'id' ou '_id')
     user_ctx = context.user_data.get('vendedor_logado', {}) or {}
@@ -169,94 +262,122 @@ async def gerar_relatorio_geral(update: Update, context: ContextTypes.DEFAULT_TY
             return x  # deixa como está; se não for ObjectId válido, o match resultará vazio
 
     if user_role == 'supervisor':
-        sup_id = user_ctx.get('id') or user_ctx.get('_id')
+        sup_id = user_ctx['_id']
         sup_id = _as_object_id(sup_id)
-        todos_vendedores = list(
-            vendedores_collection.find({"supervisor_id": sup_id}, {"_id": 1, "nome_vendedor": 1})
-        )
+        todos_vendedores = await repositorio.listar_equipe(sup_id, {"_id": 1, "nome_vendedor": 1})
     else:
-        todos_vendedores = list(
-            vendedores_collection.find({}, {"_id": 1, "nome_vendedor": 1})
-        )
+        todos_vendedores = await repositorio.listar_vendedores({}, {"_id": 1, "nome_vendedor": 1})
 
     ids_para_buscar = [v['_id'] for v in todos_vendedores]
     vendedores_map = {str(v['_id']): v.get('nome_vendedor', 'Desconhecido') for v in todos_vendedores}
 
+    titulo = "Relatório da Minha Equipe (por Vendedor)" if user_role == 'supervisor' else "Relatório Geral por Vendedor"
+    relatorio = f"📊 <b>{titulo}</b>\n<b>Período:</b> {rotulo}\n"
+    if range_anterior is not None:
+        relatorio += f"<b>Comparado com:</b> {rotulo_anterior}\n"
+    relatorio += "\n"
+
     # Se a equipe do supervisor estiver vazia, já responde algo amigável
     if user_role == 'supervisor' and not ids_para_buscar:
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="relatorio_geral")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        relatorio = (
-            f"📊 <b>Relatório da Minha Equipe (por Vendedor)</b>\n"
-            f"<b>Período:</b> {periodo.replace('_', ' ').capitalize()} "
-            f"({date_range['start'].strftime('%d/%m')} a {date_range['end'].strftime('%d/%m')})\n\n"
-            "Nenhum vendedor está associado a você no momento."
+        return relatorio + "Nenhum vendedor está associado a você no momento."
+
+    escopo = escopo_vendedores(f"equipe:{sup_id}" if user_role == 'supervisor' else "todos", ids_para_buscar)
+
+    if range_anterior is None:
+        resultados = await _em_cache(
+            context, "desempenho", escopo, start_date_utc, end_date_utc,
+            lambda: repositorio.desempenho_por_vendedor(ids_para_buscar, start_date_utc, end_date_utc)
         )
-        try:
-            await query.edit_message_text(relatorio, reply_markup=reply_markup, parse_mode='HTML')
-        except BadRequest as e:
-            if "Message is not modified" in str(e):
-                await query.edit_message_text(relatorio + "\u2060", reply_markup=reply_markup, parse_mode='HTML')
-            else:
-                raise
-        return
+        if not resultados:
+            return relatorio + "Nenhuma atividade registrada neste período."
+        total_geral = sum(res['total_finalizados'] for res in resultados)
+        relatorio += formatar_desempenho(resultados, vendedores_map)
+        return relatorio + f"\n<b>Total Geral:</b> {total_geral} clientes finalizados"
+
+    janelas = {
+        "atual": (start_date_utc, end_date_utc),
+        "anterior": (range_anterior['start'].astimezone(pytz.utc), range_anterior['end'].astimezone(pytz.utc)),
+    }
 
-    pipeline = [
-        {"$match": {
-            "vendedor_atribuido": {"$in": ids_para_buscar},
-            "data_finalizacao": {"$gte": start_date_utc, "$lte": end_date_utc}
-        }},
-        {"$group": {
-            "_id": "$vendedor_atribuido",
-            "total_finalizados": {"$sum": 1},
-            "status_counts": {"$push": "$status_final"}
-        }},
-        {"$sort": {"total_finalizados": -1}}
-    ]
-    resultados = list(clientes_collection.aggregate(pipeline))
+    async def _comparar():
+        por_janela = await repositorio.desempenho_em_janelas(ids_para_buscar, janelas)
+        return comparar_desempenho(por_janela['atual'], por_janela['anterior'])
 
-    periodo_str = periodo.replace('_', ' ').capitalize()
-    titulo = "Relatório da Minha Equipe (por Vendedor)" if user_role == 'supervisor' else "Relatório Geral por Vendedor"
-    relatorio = (
-        f"📊 <b>{titulo}</b>\n"
-        f"<b>Período:</b> {periodo_str} ({date_range['start'].strftime('%d/%m')} a {date_range['end'].strftime('%d/%m')})\n\n"
+    comparativo = await _em_cache(
+        context, f"comparativo:{janelas['anterior'][0].timestamp()}", escopo, start_date_utc, end_date_utc, _comparar
     )
+    if not comparativo:
+        return relatorio + "Nenhuma atividade registrada nos dois períodos."
+    total_geral = sum(item['total'] for item in comparativo)
+    total_anterior = sum(item['total_anterior'] for item in comparativo)
+    relatorio += formatar_comparativo(comparativo, vendedores_map)
+    return relatorio + (f"\n<b>Total Geral:</b> {total_geral} clientes finalizados "
+                        f"({_variacao(total_geral - total_anterior)} vs {total_anterior})")
 
-    if not resultados:
-        relatorio += "Nenhuma atividade registrada neste período."
+
+async def gerar_relatorio_geral(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    await query.answer()
+
+    periodo = context.args[0]
+    periodo_exportado = PERIODOS_COMPARACAO.get(periodo, (periodo,))[0]
+    reply_markup = teclados.relatorio_gerado("geral", periodo_exportado)
+
+    if periodo in PERIODOS_COMPARACAO:
+        periodo_atual, periodo_anterior = PERIODOS_COMPARACAO[periodo]
+        date_range, range_anterior = intervalo_do_periodo(periodo_atual), intervalo_do_periodo(periodo_anterior)
+        relatorio = await _montar_relatorio_geral(
+            context, _rotulo_periodo(periodo_atual, date_range), date_range,
+            _rotulo_periodo(periodo_anterior, range_anterior), range_anterior
+        )
     else:
-        from collections import Counter
-        total_geral = 0
-        for res in resultados:
-            vendedor_id_str = str(res['_id'])
-            nome_v = vendedores_map.get(vendedor_id_str, "Desconhecido")
-            total_finalizados = res['total_finalizados']
-            total_geral += total_finalizados
-            counts = Counter(res['status_counts'])
-            detalhes = ", ".join([f"{(s or 'Sem Status')}: {c}" for s, c in sorted(counts.items())])
-            relatorio += f"👤 <b>{nome_v}</b>: {total_finalizados} finalizados\n   - {detalhes}\n"
-        relatorio += f"\n<b>Total Geral:</b> {total_geral} clientes finalizados"
-
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="relatorio_geral")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+        date_range = intervalo_do_periodo(periodo)
+        if not date_range:
+            await query.edit_message_text("Período inválido.")
+            return
+        relatorio = await _montar_relatorio_geral(context, _rotulo_periodo(periodo, date_range), date_range)
+
+    await _editar_relatorio(query, relatorio, reply_markup)
+
 
+async def relatorio_periodo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/periodo DD/MM/AAAA DD/MM/AAAA: relatório por vendedor num intervalo livre, comparado com o intervalo anterior de mesmo tamanho."""
+    user_role = context.user_data.get('vendedor_logado', {}).get('role')
+    if user_role not in ['supervisor', 'administrador']:
+        await update.message.reply_text("Comando não reconhecido.")
+        return
+
+    uso = "Uso: <code>/periodo DD/MM/AAAA DD/MM/AAAA</code> (ex.: <code>/periodo 01/07/2025 30/09/2025</code>)"
     try:
-        await query.edit_message_text(relatorio, reply_markup=reply_markup, parse_mode='HTML')
-    except BadRequest as e:
-        if "Message is not modified" in str(e):
-            await query.edit_message_text(relatorio + "\u2060", reply_markup=reply_markup, parse_mode='HTML')
-        else:
-            raise
+        inicio, fim = (datetime.strptime(arg, '%d/%m/%Y').date() for arg in context.args)
+    except ValueError:
+        await update.message.reply_html(uso)
+        return
+    if inicio > fim:
+        inicio, fim = fim, inicio
+    dias = (fim - inicio).days + 1
+    if dias > MAX_DIAS_PERIODO:
+        await update.message.reply_html(f"O intervalo pode ter no máximo {MAX_DIAS_PERIODO} dias.")
+        return
+
+    date_range = _intervalo_dias(inicio, fim)
+    range_anterior = _intervalo_dias(inicio - timedelta(days=dias), inicio - timedelta(days=1))
+    formato = '%d/%m/%Y'
+    relatorio = await _montar_relatorio_geral(
+        context, f"{inicio.strftime(formato)} a {fim.strftime(formato)} ({dias} dias)", date_range,
+        f"{range_anterior['start'].strftime(formato)} a {range_anterior['end'].strftime(formato)}", range_anterior
+    )
+    reply_markup = teclados.exportacao(f"{inicio:%Y%m%d}-{fim:%Y%m%d}")
+    await update.message.reply_html(relatorio, reply_markup=reply_markup)
 
 
 async def gerar_relatorio_de_totais(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
 
-    periodo = _extract_period_from_callback(query.data)
+    periodo = context.args[0]
 
-    ranges = get_date_ranges()
-    date_range = ranges.get(periodo)
+    date_range = intervalo_do_periodo(periodo)
     if not date_range:
         await query.edit_message_text("Período inválido.")
         return
@@ -264,13 +385,11 @@ async def gerar_relatorio_de_totais(update: Update, context: ContextTypes.DEFAUL
     start_date_utc = date_range['start'].astimezone(pytz.utc)
     end_date_utc = date_range['end'].astimezone(pytz.utc)
 
-    clientes_collection = context.bot_data['clientes_collection']
-    pipeline = [
-        {"$match": {"data_finalizacao": {"$gte": start_date_utc, "$lte": end_date_utc}}},
-        {"$group": {"_id": "$status_final", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    resultados = list(clientes_collection.aggregate(pipeline))
+    repositorio = context.bot_data['repositorio']
+    resultados = await _em_cache(
+        context, "totais", "todos", start_date_utc, end_date_utc,
+        lambda: repositorio.totais_por_status(start_date_utc, end_date_utc)
+    )
 
     periodo_str = periodo.replace('_', ' ').capitalize()
     relatorio = (
@@ -287,37 +406,27 @@ async def gerar_relatorio_de_totais(update: Update, context: ContextTypes.DEFAUL
             status = item['_id'] or "Não especificado"
             relatorio += f"  - {status}: {item['count']}\n"
 
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="relatorio_totais")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    try:
-        await query.edit_message_text(relatorio, reply_markup=reply_markup, parse_mode='HTML')
-    except BadRequest as e:
-        if "Message is not modified" in str(e):
-            await query.edit_message_text(relatorio + "\u2060", reply_markup=reply_markup, parse_mode='HTML')
-        else:
-            raise
-
+    reply_markup = teclados.relatorio_gerado("totais", periodo)
+    await _editar_relatorio(query, relatorio, reply_markup)
 
 
 async def selecionar_supervisor_para_relatorio(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
 
-    vendedores_collection = context.bot_data['vendedores_collection']
-    supervisores = list(vendedores_collection.find({"role": "supervisor"}))
+    supervisores = await context.bot_data['repositorio'].listar_supervisores()
 
     if not supervisores:
         await query.edit_message_text(
             "Nenhum supervisor encontrado.",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Voltar", callback_data="relatorio_voltar_inicial")]])
+            reply_markup=teclados.VOLTAR_RELATORIOS
         )
         return
 
     keyboard = []
     for sup in supervisores:
-        keyboard.append([InlineKeyboardButton(sup['nome_vendedor'], callback_data=f"selecionar_periodo_sup_{sup['_id']}")])
-    keyboard.append([InlineKeyboardButton("⬅️ Voltar", callback_data="relatorio_voltar_inicial")])
+        keyboard.append([InlineKeyboardButton(sup['nome_vendedor'], callback_data=callbacks.RELATORIO_PERIODOS_SUPERVISOR.codificar(sup['_id']))])
+    keyboard.append([InlineKeyboardButton("⬅️ Voltar", callback_data=callbacks.RELATORIOS.codificar())])
 
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text("Selecione um supervisor para ver o relatório da equipe:", reply_markup=reply_markup)
@@ -327,44 +436,20 @@ async def selecionar_periodo_para_supervisor(update: Update, context: ContextTyp
     query = update.callback_query
     await query.answer()
 
-    supervisor_id = query.data.split('_', 3)[3]
-    keyboard = [
-        [InlineKeyboardButton("Hoje", callback_data=f"gerar_relatorio_sup_{supervisor_id}_hoje"),
-         InlineKeyboardButton("Ontem", callback_data=f"gerar_relatorio_sup_{supervisor_id}_ontem")],
-        [InlineKeyboardButton("Esta Semana", callback_data=f"gerar_relatorio_sup_{supervisor_id}_semana_atual"),
-         InlineKeyboardButton("Semana Passada", callback_data=f"gerar_relatorio_sup_{supervisor_id}_semana_passada")],
-        [InlineKeyboardButton("Este Mês", callback_data=f"gerar_relatorio_sup_{supervisor_id}_mes_atual"),
-         InlineKeyboardButton("Mês Passado", callback_data=f"gerar_relatorio_sup_{supervisor_id}_mes_passado")],
-        [InlineKeyboardButton("⬅️ Voltar para Supervisores", callback_data="relatorio_por_supervisor")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    supervisor_id = context.args[0]
+    reply_markup = teclados.periodos_supervisor(supervisor_id)
     await query.edit_message_text("Selecione o período do relatório para esta equipe:", reply_markup=reply_markup)
 
 
 async def gerar_relatorio_de_supervisor(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
-    try:
-        parts = query.data.split('_')  # gerar_relatorio_sup_<id>_<periodo...>
-        supervisor_id = ObjectId(parts[3])
-        periodo = "_".join(parts[4:])
-    except (IndexError, InvalidId):
-        await query.edit_message_text("Erro ao processar o relatório. Tente novamente.")
-        return
+    supervisor_id, periodo = context.args
 
     relatorio_texto = await gerar_relatorio_equipe(supervisor_id, context, periodo)
 
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar para Períodos", callback_data=f"selecionar_periodo_sup_{supervisor_id}")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    # Agora usamos HTML para evitar problemas com MarkdownV2
-    try:
-        await query.edit_message_text(relatorio_texto, reply_markup=reply_markup, parse_mode='HTML')
-    except BadRequest as e:
-        if "Message is not modified" in str(e):
-            await query.edit_message_text(relatorio_texto + "\u2060", reply_markup=reply_markup, parse_mode='HTML')
-        else:
-            raise
+    reply_markup = teclados.relatorio_supervisor_gerado(supervisor_id, periodo)
+    await _editar_relatorio(query, relatorio_texto, reply_markup)
 
 
 async def gerar_relatorio_equipe(supervisor_id, context: ContextTypes.DEFAULT_TYPE, periodo: str) -> str:
@@ -373,38 +458,27 @@ async def gerar_relatorio_equipe(supervisor_id, context: ContextTypes.DEFAULT_TY
     Retorna string formatada em HTML (robusto à presença de '.', '-', etc.).
     """
     try:
-        ranges = get_date_ranges()
-        date_range = ranges.get(periodo)
+        date_range = intervalo_do_periodo(periodo)
         if not date_range:
             return "❌ Período inválido."
 
         start_date_utc = date_range['start'].astimezone(pytz.utc)
         end_date_utc = date_range['end'].astimezone(pytz.utc)
 
-        vendedores_collection = context.bot_data['vendedores_collection']
-        clientes_collection = context.bot_data['clientes_collection']
+        repositorio = context.bot_data['repositorio']
 
-        equipe = list(vendedores_collection.find({"supervisor_id": supervisor_id}))
+        equipe = await repositorio.listar_equipe(supervisor_id)
         if not equipe:
             return "Nenhum vendedor encontrado para este supervisor."
 
         ids_vendedores = [v['_id'] for v in equipe]
         nomes_vendedores = {str(v['_id']): v['nome_vendedor'] for v in equipe}
 
-        pipeline = [
-            {"$match": {
-                "vendedor_atribuido": {"$in": ids_vendedores},
-                "data_finalizacao": {"$gte": start_date_utc, "$lte": end_date_utc}
-            }},
-            {"$group": {
-                "_id": "$vendedor_atribuido",
-                "total_finalizados": {"$sum": 1},
-                "status_counts": {"$push": "$status_final"}
-            }},
-            {"$sort": {"total_finalizados": -1}}
-        ]
-
-        resultados = list(clientes_collection.aggregate(pipeline))
+        resultados = await _em_cache(
+            context, "desempenho", escopo_vendedores(f"equipe:{supervisor_id}", ids_vendedores),
+            start_date_utc, end_date_utc,
+            lambda: repositorio.desempenho_por_vendedor(ids_vendedores, start_date_utc, end_date_utc)
+        )
         periodo_str = periodo.replace("_", " ").capitalize()
 
         rel = f"📊 <b>Desempenho da Equipe</b>\n<b>Período:</b> {periodo_str}\n\n"
@@ -412,13 +486,7 @@ async def gerar_relatorio_equipe(supervisor_id, context: ContextTypes.DEFAULT_TY
         if not resultados:
             rel += "Nenhuma atividade registrada neste período."
         else:
-            for res in resultados:
-                vendedor_id = str(res['_id'])
-                nome = nomes_vendedores.get(vendedor_id, "Desconhecido")
-                total = res['total_finalizados']
-                counts = Counter(res['status_counts'])
-                detalhes = ", ".join([f"{(s or 'Sem Status')}: {c}" for s, c in sorted(counts.items())])
-                rel += f"👤 <b>{nome}</b>: {total} finalizados\n   - {detalhes}\n"
+            rel += formatar_desempenho(resultados, nomes_vendedores)
 
         return rel
 
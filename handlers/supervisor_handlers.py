@@ -1,9 +1,10 @@
 # handlers/supervisor_handlers.py
 import logging
 from telegram.error import BadRequest
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
 from telegram.ext import ContextTypes
 from handlers.relatorios_handlers import gerar_relatorio_equipe
+from handlers import teclados
 
 
 async def supervisor_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -12,8 +13,7 @@ async def supervisor_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         await update.message.reply_text("Comando não reconhecido.")
         return
 
-    keyboard = [[InlineKeyboardButton("📊 Desempenho da Equipe (Hoje)", callback_data="sup_desempenho_hoje")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = teclados.PAINEL_SUPERVISOR
     message_text = "🔰 <b>Painel de Supervisor</b>\n\nSelecione uma opção:"
 
     if update.callback_query:
@@ -26,11 +26,10 @@ async def desempenho_equipe_hoje(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     await query.answer()
 
-    supervisor_id = context.user_data['vendedor_logado']['id']  # ObjectId do supervisor
+    supervisor_id = context.user_data['vendedor_logado']['_id']  # ObjectId do supervisor
     relatorio = await gerar_relatorio_equipe(supervisor_id, context, "hoje")
 
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar ao Painel Supervisor", callback_data="sup_back_to_main")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = teclados.VOLTAR_PAINEL_SUPERVISOR
 
     try:
         await query.edit_message_text(relatorio, reply_markup=reply_markup, parse_mode='HTML')
@@ -0,0 +1,233 @@
+# handlers/teclados.py
+"""
+Teclados do bot que não dependem do banco, montados uma vez e reaproveitados.
+
+Os markups do python-telegram-bot ficam imutáveis depois de criados, então um mesmo objeto pode ir
+em qualquer número de respostas. Os teclados fixos são montados na importação. Os que dependem de
+parâmetros (função do usuário, tipo de relatório, supervisor, período...) ficam num cache LRU
+limitado, chaveado pelos parâmetros. Teclados montados com dados do banco (listas de usuários,
+bases, mensagens) e o cartão do cliente (link do WhatsApp por cliente) continuam sendo montados
+nos handlers.
+"""
+import functools
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
+
+from . import callbacks
+
+# Entradas por teclado parametrizado; os de supervisor e período são os únicos com muitas combinações.
+TAMANHO_CACHE = 256
+
+_parametrizados = []
+
+
+def _em_cache(funcao):
+    """Teclado parametrizado: um objeto por combinação de argumentos, até TAMANHO_CACHE combinações."""
+    em_cache = functools.lru_cache(maxsize=TAMANHO_CACHE)(funcao)
+    _parametrizados.append(em_cache)
+    return em_cache
+
+
+def info_cache() -> dict:
+    """nome do teclado -> CacheInfo (acertos, faltas, tamanho), para diagnóstico e benchmarks."""
+    return {funcao.__name__: funcao.cache_info() for funcao in _parametrizados}
+
+
+def _voltar(acao: callbacks.Acao, *args, texto: str = "⬅️ Voltar") -> list:
+    return [InlineKeyboardButton(texto, callback_data=acao.codificar(*args))]
+
+
+def _botoes_exportacao(supervisor_id, periodo: str) -> list:
+    """
+    Linha de botões de exportação: EXPORTAR(x|c, supervisor, período), com supervisor None (tudo o que o
+    usuário pode ver) ou o id de um supervisor, e período nomeado ou AAAAMMDD-AAAAMMDD.
+    """
+    return [InlineKeyboardButton("⬇️ Excel", callback_data=callbacks.EXPORTAR.codificar("x", supervisor_id, periodo)),
+            InlineKeyboardButton("⬇️ CSV", callback_data=callbacks.EXPORTAR.codificar("c", supervisor_id, periodo))]
+
+
+def _linhas_periodos(acao: callbacks.Acao, *prefixo) -> list:
+    return [
+        [InlineKeyboardButton("Hoje", callback_data=acao.codificar(*prefixo, "hoje")),
+         InlineKeyboardButton("Ontem", callback_data=acao.codificar(*prefixo, "ontem"))],
+        [InlineKeyboardButton("Esta Semana", callback_data=acao.codificar(*prefixo, "semana_atual")),
+         InlineKeyboardButton("Semana Passada", callback_data=acao.codificar(*prefixo, "semana_passada"))],
+        [InlineKeyboardButton("Este Mês", callback_data=acao.codificar(*prefixo, "mes_atual")),
+         InlineKeyboardButton("Mês Passado", callback_data=acao.codificar(*prefixo, "mes_passado"))],
+        [InlineKeyboardButton("Últimos 90 Dias", callback_data=acao.codificar(*prefixo, "ultimos_90_dias"))],
+    ]
+
+
+# -------------------------------
+# Vendedor
+# -------------------------------
+REMOVER_TECLADO = ReplyKeyboardRemove()
+
+BANCOS = InlineKeyboardMarkup([
+    [InlineKeyboardButton("DREX Pix", callback_data=callbacks.BANCO.codificar("DREX Pix")),
+     InlineKeyboardButton("Simplix", callback_data=callbacks.BANCO.codificar("Simplix"))],
+    [InlineKeyboardButton("GRANAPIX", callback_data=callbacks.BANCO.codificar("GRANAPIX")),
+     InlineKeyboardButton("LOTUS", callback_data=callbacks.BANCO.codificar("LOTUS"))],
+    [InlineKeyboardButton("Grandino", callback_data=callbacks.BANCO.codificar("Grandino")),
+     InlineKeyboardButton("V8", callback_data=callbacks.BANCO.codificar("V8"))],
+    [InlineKeyboardButton("PH Tech", callback_data=callbacks.BANCO.codificar("PH Tech"))]
+])
+
+RESULTADOS_CONSULTA = InlineKeyboardMarkup([
+    [InlineKeyboardButton("Possui Saldo", callback_data=callbacks.RESULTADO.codificar("Possui Saldo"))],
+    [InlineKeyboardButton("Não Autorizado", callback_data=callbacks.RESULTADO.codificar("Nao Autorizado"))],
+    [InlineKeyboardButton("Sem Saldo", callback_data=callbacks.RESULTADO.codificar("Sem Saldo"))],
+    [InlineKeyboardButton("Não Elegível", callback_data=callbacks.RESULTADO.codificar("Nao Elegivel"))]
+])
+
+FILTROS = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Com Saldo", callback_data=callbacks.FILTRO.codificar("com_saldo"))],
+    [InlineKeyboardButton("Não Autorizado", callback_data=callbacks.FILTRO.codificar("Nao Autorizado"))],
+    [InlineKeyboardButton("Sem Saldo", callback_data=callbacks.FILTRO.codificar("Sem Saldo"))],
+    [InlineKeyboardButton("Não Elegível", callback_data=callbacks.FILTRO.codificar("Nao Elegivel"))]
+])
+
+
+@_em_cache
+def menu_principal(role: str) -> ReplyKeyboardMarkup:
+    """Teclado de comandos mostrado após o login."""
+    teclado = [
+        [KeyboardButton("/proximo"), KeyboardButton("/meucliente")],
+        [KeyboardButton("/hoje"), KeyboardButton("/buscar"), KeyboardButton("/filtrar")]
+    ]
+    if role in ['supervisor', 'administrador']:
+        teclado.append([KeyboardButton("/relatorios"), KeyboardButton("/supervisor"), KeyboardButton("/admin")])
+    teclado.append([KeyboardButton("/logout")])
+    return ReplyKeyboardMarkup(teclado, resize_keyboard=True)
+
+
+# -------------------------------
+# Supervisor
+# -------------------------------
+PAINEL_SUPERVISOR = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📊 Desempenho da Equipe (Hoje)", callback_data=callbacks.SUP_DESEMPENHO_HOJE.codificar())]
+])
+
+VOLTAR_PAINEL_SUPERVISOR = InlineKeyboardMarkup([
+    _voltar(callbacks.SUP_PAINEL, texto="⬅️ Voltar ao Painel Supervisor")
+])
+
+
+# -------------------------------
+# Administração
+# -------------------------------
+PAINEL_ADMIN = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📊 Estatísticas do Dia", callback_data=callbacks.ADMIN_ESTATISTICAS.codificar())],
+    [InlineKeyboardButton("👤 Gerenciar Usuários", callback_data=callbacks.ADMIN_USUARIOS.codificar())],
+    [InlineKeyboardButton("✉️ Gerenciar Mensagens", callback_data=callbacks.ADMIN_MENSAGENS.codificar())],
+    [InlineKeyboardButton("🗂️ Gerenciar Bases de Leads", callback_data=callbacks.ADMIN_BASES.codificar())]
+])
+
+MENU_ESTATISTICAS = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🌎 Visão Geral", callback_data=callbacks.ADMIN_ESTATISTICAS_GERAL.codificar())],
+    [InlineKeyboardButton("👥 Ver por Supervisor", callback_data=callbacks.ADMIN_ESCOLHER_SUPERVISOR.codificar())],
+    [InlineKeyboardButton("👤 Ver Vendedores Autônomos", callback_data=callbacks.ADMIN_ESTATISTICAS_AUTONOMOS.codificar())],
+    _voltar(callbacks.ADMIN_PAINEL, texto="⬅️ Voltar ao Menu Admin")
+])
+
+MENU_MENSAGENS = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📜 Listar Mensagens", callback_data=callbacks.ADMIN_LISTAR_MENSAGENS.codificar())],
+    [InlineKeyboardButton("➕ Adicionar Mensagem", callback_data=callbacks.ADMIN_NOVA_MENSAGEM.codificar())],
+    _voltar(callbacks.ADMIN_PAINEL, texto="⬅️ Voltar ao Menu Admin")
+])
+
+MENU_USUARIOS = InlineKeyboardMarkup([
+    [InlineKeyboardButton("➕ Adicionar Usuário", callback_data=callbacks.ADMIN_NOVO_USUARIO.codificar())],
+    [InlineKeyboardButton("✏️ Modificar Usuário", callback_data=callbacks.ADMIN_EDITAR_USUARIOS.codificar())],
+    _voltar(callbacks.ADMIN_PAINEL, texto="⬅️ Voltar ao Menu Admin")
+])
+
+MENU_EDICAO_USUARIO = InlineKeyboardMarkup([
+    [InlineKeyboardButton("Alterar Função", callback_data=callbacks.EDITAR_FUNCAO.codificar())],
+    [InlineKeyboardButton("Alterar Supervisor", callback_data=callbacks.EDITAR_SUPERVISOR.codificar())],
+    _voltar(callbacks.ADMIN_EDITAR_USUARIOS, texto="⬅️ Voltar à Lista")
+])
+
+_LINHAS_FUNCOES = [
+    [InlineKeyboardButton("Vendedor", callback_data=callbacks.FUNCAO.codificar("vendedor"))],
+    [InlineKeyboardButton("Supervisor", callback_data=callbacks.FUNCAO.codificar("supervisor"))],
+    [InlineKeyboardButton("Administrador", callback_data=callbacks.FUNCAO.codificar("administrador"))]
+]
+
+FUNCOES = InlineKeyboardMarkup(_LINHAS_FUNCOES)
+
+VOLTAR_USUARIOS = InlineKeyboardMarkup([_voltar(callbacks.ADMIN_USUARIOS)])
+VOLTAR_ESTATISTICAS = InlineKeyboardMarkup([_voltar(callbacks.ADMIN_ESTATISTICAS)])
+VOLTAR_SELECAO_SUPERVISOR = InlineKeyboardMarkup([
+    _voltar(callbacks.ADMIN_ESCOLHER_SUPERVISOR, texto="⬅️ Voltar para Seleção")
+])
+
+
+@_em_cache
+def funcoes_edicao(usuario_id) -> InlineKeyboardMarkup:
+    """Escolha da nova função de um usuário em edição, com "Cancelar" de volta ao menu dele."""
+    return InlineKeyboardMarkup(_LINHAS_FUNCOES + [
+        _voltar(callbacks.EDITAR_USUARIO, usuario_id, texto="⬅️ Cancelar")
+    ])
+
+
+# -------------------------------
+# Relatórios
+# -------------------------------
+VOLTAR_RELATORIOS = InlineKeyboardMarkup([_voltar(callbacks.RELATORIOS)])
+
+
+@_em_cache
+def painel_relatorios(role: str) -> InlineKeyboardMarkup:
+    if role == 'administrador':
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton("📊 Relatório Geral (por Vendedor)", callback_data=callbacks.RELATORIO_PERIODOS.codificar("geral"))],
+            [InlineKeyboardButton("📈 Relatório de Totais (por Status)", callback_data=callbacks.RELATORIO_PERIODOS.codificar("totais"))],
+            [InlineKeyboardButton("👥 Relatório por Supervisor", callback_data=callbacks.RELATORIO_SUPERVISORES.codificar())]
+        ])
+    # Supervisor: mostra o "Geral" filtrado pela própria equipe + Totais
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("📊 Relatório da Minha Equipe (por Vendedor)", callback_data=callbacks.RELATORIO_PERIODOS.codificar("geral"))],
+        [InlineKeyboardButton("📈 Relatório de Totais (por Status)", callback_data=callbacks.RELATORIO_PERIODOS.codificar("totais"))]
+    ])
+
+
+@_em_cache
+def periodos_relatorio(tipo: str) -> InlineKeyboardMarkup:
+    """Escolha do período do relatório "geral" (com os comparativos) ou "totais"."""
+    acao = callbacks.RELATORIO_GERAL if tipo == "geral" else callbacks.RELATORIO_TOTAIS
+    teclado = _linhas_periodos(acao)
+    if tipo == "geral":
+        teclado += [
+            [InlineKeyboardButton("🔀 Semana × Anterior", callback_data=acao.codificar("comparar_semana")),
+             InlineKeyboardButton("🔀 Mês × Anterior", callback_data=acao.codificar("comparar_mes"))],
+            [InlineKeyboardButton("🔀 90 Dias × 90 Anteriores", callback_data=acao.codificar("comparar_90_dias"))],
+        ]
+    teclado.append(_voltar(callbacks.RELATORIOS))
+    return InlineKeyboardMarkup(teclado)
+
+
+@_em_cache
+def periodos_supervisor(supervisor_id) -> InlineKeyboardMarkup:
+    teclado = _linhas_periodos(callbacks.RELATORIO_SUPERVISOR, supervisor_id)
+    teclado.append(_voltar(callbacks.RELATORIO_SUPERVISORES, texto="⬅️ Voltar para Supervisores"))
+    return InlineKeyboardMarkup(teclado)
+
+
+@_em_cache
+def relatorio_gerado(tipo: str, periodo: str) -> InlineKeyboardMarkup:
+    """Exportação + volta à escolha de período de um relatório "geral" ou "totais" (sem filtro de supervisor)."""
+    return InlineKeyboardMarkup([_botoes_exportacao(None, periodo), _voltar(callbacks.RELATORIO_PERIODOS, tipo)])
+
+
+@_em_cache
+def relatorio_supervisor_gerado(supervisor_id, periodo: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([
+        _botoes_exportacao(supervisor_id, periodo),
+        _voltar(callbacks.RELATORIO_PERIODOS_SUPERVISOR, supervisor_id, texto="⬅️ Voltar para Períodos")
+    ])
+
+
+@_em_cache
+def exportacao(periodo: str) -> InlineKeyboardMarkup:
+    """Só os botões de exportação (ex.: /periodo com intervalo livre)."""
+    return InlineKeyboardMarkup([_botoes_exportacao(None, periodo)])
@@ -1,23 +1,31 @@
 # handlers/vendedor_handlers.py
 import re
+import html
+import asyncio
 import logging
 from datetime import datetime, time, UTC
 import pytz
-from telegram import (
-    Update, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove,
-    InlineKeyboardButton, InlineKeyboardMarkup
-)
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
-from pymongo.collection import ReturnDocument
 from bson.objectid import ObjectId
-from bson.errors import InvalidId
-from werkzeug.security import check_password_hash
 
+from database.rollups import TZ_SAO_PAULO
+
+from . import callbacks, teclados
 from .common import (
-    _enviar_info_cliente, STATUS_MAP, USERNAME, PASSWORD, GET_PHONE,
-    SELECT_BANK, SELECT_RESULT, GET_NOTE, GET_BALANCE_AMOUNT
+    _enviar_info_cliente, _montar_info_cliente, STATUS_MAP, USERNAME, PASSWORD, GET_PHONE,
+    SELECT_BANK, SELECT_RESULT, GET_NOTE, GET_BALANCE_AMOUNT, TAMANHO_PAGINA, _linha_paginacao
 )
 
+# Mensagens do Telegram têm no máximo 4096 caracteres: 8 entradas × ~450 + cabeçalho cabem com folga.
+TAMANHO_PAGINA_HISTORICO = 8
+LIMITE_NOTA_HISTORICO = 350
+
+# Resposta quando o atendimento expirou e o lead foi para outro vendedor (ver services/expiracao_leads.py).
+MSG_ATENDIMENTO_EXPIRADO = ("O tempo de atendimento deste cliente expirou e ele já foi repassado a outro vendedor. "
+                            "Use /proximo para pegar um novo cliente.")
+TEXTO_NOVO_CLIENTE = "<b>Novo Cliente Atribuído!</b>"
+
 
 async def login_unexpected_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     await update.message.reply_text("Processo de login em andamento. Por favor, envie seu nome de usuário ou use /cancel.")
@@ -29,6 +37,16 @@ async def password_unexpected_command(update: Update, context: ContextTypes.DEFA
     return PASSWORD
 
 
+async def restaurar_sessao(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Roda antes dos demais handlers: recoloca em user_data o login salvo na sessão do usuário."""
+    user = update.effective_user
+    if user is None or context.user_data is None or 'vendedor_logado' in context.user_data:
+        return
+    vendedor_logado = await context.bot_data['autenticador'].restaurar_sessao(user.id)
+    if vendedor_logado:
+        context.user_data['vendedor_logado'] = vendedor_logado
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
     await update.message.reply_html(
@@ -55,30 +73,30 @@ async def get_password(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
         await update.message.reply_text("Ocorreu um erro. Por favor, inicie o login novamente com /login.")
         return ConversationHandler.END
 
-    vendedores_collection = context.bot_data['vendedores_collection']
-    vendedor = vendedores_collection.find_one({"usuario_login": login_username})
+    autenticador = context.bot_data['autenticador']
+    segundos_bloqueado = autenticador.segundos_bloqueado(login_username)
+    if segundos_bloqueado:
+        minutos = -(-segundos_bloqueado // 60)
+        await update.message.reply_text(
+            f"Muitas tentativas de login sem sucesso. Tente novamente em {minutos} minuto(s)."
+        )
+        return ConversationHandler.END
 
-    if vendedor and check_password_hash(vendedor['senha_hash'], password):
+    vendedor = await autenticador.verificar(login_username, password)
+
+    if vendedor:
         context.user_data['vendedor_logado'] = {
             "_id": vendedor['_id'],
             "nome": vendedor['nome_vendedor'],
             "role": vendedor.get('role', 'vendedor')
         }
+        context.user_data.pop('login_username', None)
 
-        vendedores_collection.update_one(
-            {"_id": vendedor['_id']}, {"$set": {"usuario_telegram": user.id}}
-        )
+        await context.bot_data['repositorio'].atualizar_vendedor(vendedor['_id'], {"usuario_telegram": user.id})
+        await autenticador.abrir_sessao(user.id, context.user_data['vendedor_logado'])
 
         role = context.user_data['vendedor_logado']['role']
-        main_keyboard = [
-            [KeyboardButton("/proximo"), KeyboardButton("/meucliente")],
-            [KeyboardButton("/hoje"), KeyboardButton("/buscar"), KeyboardButton("/filtrar")]
-        ]
-        if role in ['supervisor', 'administrador']:
-            main_keyboard.append([KeyboardButton("/relatorios"), KeyboardButton("/supervisor"), KeyboardButton("/admin")])
-        main_keyboard.append([KeyboardButton("/logout")])
-
-        reply_markup = ReplyKeyboardMarkup(main_keyboard, resize_keyboard=True)
+        reply_markup = teclados.menu_principal(role)
         await update.message.reply_text(
             f"Login bem-sucedido! Bem-vindo, {vendedor['nome_vendedor']}.\n\nFunção: {role.capitalize()}",
             reply_markup=reply_markup
@@ -106,81 +124,51 @@ async def buscar_telefone(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text("Número de telefone inválido. Tente novamente com /buscar.")
         return ConversationHandler.END
 
-    clientes_collection = context.bot_data['clientes_collection']
-    cliente_encontrado = None
-
-    try:
-        numero_como_int = int(numero_limpo)
-        cliente_encontrado = clientes_collection.find_one({"telefone": {"$in": [numero_limpo, numero_como_int]}})
-    except ValueError:
-        cliente_encontrado = clientes_collection.find_one({"telefone": numero_limpo})
-
-    if not cliente_encontrado:
-        regex_inteligente = ".*".join(list(numero_limpo))
-        cliente_encontrado = clientes_collection.find_one({"telefone": {"$regex": regex_inteligente}})
+    repositorio = context.bot_data['repositorio']
+    cliente_encontrado = await repositorio.buscar_cliente_por_telefone(numero_limpo)
 
     if cliente_encontrado:
         texto_intro = "Cliente encontrado:"
         if cliente_encontrado.get('status') == 'Concluido':
             vendedor_id = context.user_data['vendedor_logado']['_id']
-            clientes_collection.update_one(
-                {"_id": cliente_encontrado['_id']},
-                {"$set": {"status": "Em_Atendimento", "vendedor_atribuido": vendedor_id},
-                 "$unset": {"status_final": "", "data_finalizacao": ""}}
-            )
+            await repositorio.reabrir_cliente(cliente_encontrado['_id'], vendedor_id)
             texto_intro = "Cliente finalizado foi REABERTO para você:"
 
         context.user_data['cliente_atual_id'] = cliente_encontrado['_id']
         await _enviar_info_cliente(update, context, cliente_encontrado, texto_intro)
     else:
-        await update.message.reply_text(f"Nenhum cliente encontrado com o telefone que contém os números: {numero_limpo}")
+        await update.message.reply_text(f"Nenhum cliente encontrado com o telefone (ou final de telefone): {numero_limpo}")
 
     return ConversationHandler.END
 
 async def start_consulta(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    client_id = query.data.split('_', 2)[2]
+    client_id = str(context.args[0])
     context.user_data['consulta_cliente_id'] = client_id
     texto_original = query.message.text_html
 
-    bancos_keyboard = [
-        [InlineKeyboardButton("DREX Pix", callback_data="banco_DREX Pix"), InlineKeyboardButton("Simplix", callback_data="banco_Simplix")],
-        [InlineKeyboardButton("GRANAPIX", callback_data="banco_GRANAPIX"), InlineKeyboardButton("LOTUS", callback_data="banco_LOTUS")],
-        [InlineKeyboardButton("Grandino", callback_data="banco_Grandino"), InlineKeyboardButton("V8", callback_data="banco_V8")],
-        [InlineKeyboardButton("PH Tech", callback_data="banco_PH Tech")]
-    ]
-    reply_markup = InlineKeyboardMarkup(bancos_keyboard)
-
     novo_texto = f"{texto_original}\n\n--------------------\n<b>Consulta iniciada. Selecione o banco:</b>"
-    await query.edit_message_text(text=novo_texto, reply_markup=reply_markup, parse_mode='HTML')
+    await query.edit_message_text(text=novo_texto, reply_markup=teclados.BANCOS, parse_mode='HTML')
     return SELECT_BANK
 
 
 async def select_bank(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    banco_selecionado = query.data.split('_', 1)[1]
+    banco_selecionado = context.args[0]
     context.user_data['consulta_banco'] = banco_selecionado
     texto_cliente_original = query.message.text_html.split("\n\n--------------------\n")[0]
 
-    resultados_keyboard = [
-        [InlineKeyboardButton("Possui Saldo", callback_data="resultado_Possui Saldo")],
-        [InlineKeyboardButton("Não Autorizado", callback_data="resultado_Nao Autorizado")],
-        [InlineKeyboardButton("Sem Saldo", callback_data="resultado_Sem Saldo")],
-        [InlineKeyboardButton("Não Elegível", callback_data="resultado_Nao Elegivel")]
-    ]
-    reply_markup = InlineKeyboardMarkup(resultados_keyboard)
-
     novo_texto = f"{texto_cliente_original}\n\n--------------------\n<b>Banco:</b> {banco_selecionado}\n<b>Qual o resultado da consulta?</b>"
-    await query.edit_message_text(text=novo_texto, reply_markup=reply_markup, parse_mode='HTML')
+    await query.edit_message_text(text=novo_texto, reply_markup=teclados.RESULTADOS_CONSULTA, parse_mode='HTML')
     return SELECT_RESULT
 
 
 async def select_result(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    resultado_final = query.data.split('_', 1)[1]
+    resultado_final = context.args[0]
     context.user_data['consulta_resultado'] = resultado_final
 
     if resultado_final == "Possui Saldo":
@@ -221,35 +209,39 @@ async def finalize_consulta(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await source.message.reply_text("Ocorreu um erro de sessão. Por favor, inicie o processo novamente.")
         return ConversationHandler.END
 
-    clientes_collection = context.bot_data['clientes_collection']
+    repositorio = context.bot_data['repositorio']
     status_final_texto = f"Consulta: {resultado}"
 
-    update_doc = {
-        "$set": {
-            "status": "Concluido",
-            "status_final": status_final_texto,
-            "banco_consulta": banco,
-            "resultado_consulta": resultado,
-            "data_finalizacao": datetime.now(UTC)
-        },
-        "$push": {
-            "observacoes": {
-                "nota": f"Consulta no banco {banco} com resultado: {resultado}",
-                "vendedor_nome": context.user_data.get('vendedor_logado', {}).get('nome', 'Desconhecido'),
-                "data": datetime.now(UTC)
-            }
-        }
+    campos = {
+        "status_final": status_final_texto,
+        "banco_consulta": banco,
+        "resultado_consulta": resultado,
+        "data_finalizacao": datetime.now(UTC)
+    }
+    observacao = {
+        "nota": f"Consulta no banco {banco} com resultado: {resultado}",
+        "vendedor_nome": context.user_data.get('vendedor_logado', {}).get('nome', 'Desconhecido'),
+        "data": datetime.now(UTC)
     }
 
     if saldo is not None:
-        update_doc["$set"]["saldo_consulta"] = saldo
-        update_doc["$push"]["observacoes"]["nota"] += f" | Saldo: {saldo:.2f}"
+        campos["saldo_consulta"] = saldo
+        observacao["nota"] += f" | Saldo: {saldo:.2f}"
 
-    clientes_collection.update_one({"_id": ObjectId(cliente_id)}, update_doc)
+    vendedor_id = context.user_data.get('vendedor_logado', {}).get('_id')
+    finalizado = await repositorio.finalizar_cliente(ObjectId(cliente_id), campos, observacao, vendedor_id=vendedor_id)
 
     for key in ['consulta_cliente_id', 'consulta_banco', 'consulta_resultado', 'consulta_saldo']:
         context.user_data.pop(key, None)
 
+    if finalizado is None:
+        if isinstance(source, Update):
+            await source.message.reply_text(MSG_ATENDIMENTO_EXPIRADO)
+        else:
+            await source.edit_message_text(text=MSG_ATENDIMENTO_EXPIRADO)
+        return ConversationHandler.END
+    _agendar_pre_reserva(context, vendedor_id)
+
     texto_confirmacao = (
         f"Consulta registrada com sucesso!\n<b>Banco:</b> {banco}\n<b>Resultado:</b> {resultado}"
     )
@@ -267,7 +259,7 @@ async def finalize_consulta(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def add_note_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    client_id = query.data.split('_', 2)[2]
+    client_id = str(context.args[0])
     context.user_data['note_client_id'] = client_id
     texto_cliente_original = query.message.text_html
 
@@ -286,12 +278,12 @@ async def get_note_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         return ConversationHandler.END
 
     nova_nota = {"nota": nota_texto, "vendedor_nome": vendedor_nome, "data": datetime.now(UTC)}
-    clientes_collection = context.bot_data['clientes_collection']
-    clientes_collection.update_one({"_id": ObjectId(cliente_id)}, {"$push": {"observacoes": nova_nota}})
+    repositorio = context.bot_data['repositorio']
+    await repositorio.adicionar_observacao(ObjectId(cliente_id), nova_nota)
 
     await update.message.reply_text("✅ Nota adicionada com sucesso!")
 
-    cliente_atualizado = clientes_collection.find_one({"_id": ObjectId(cliente_id)})
+    cliente_atualizado = await repositorio.buscar_cliente(ObjectId(cliente_id))
     if cliente_atualizado:
         await _enviar_info_cliente(update, context, cliente_atualizado, "Cliente atualizado com a nova nota:")
 
@@ -299,85 +291,149 @@ async def get_note_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     return ConversationHandler.END
 
 
+def _data_local(data: datetime) -> str:
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=UTC)
+    return data.astimezone(TZ_SAO_PAULO).strftime('%d/%m/%Y %H:%M')
+
+
+def _resumir(texto: str, limite: int) -> str:
+    """Escapa para HTML e corta para caber em `limite` caracteres (já escapados)."""
+    escapado = html.escape(str(texto))
+    if len(escapado) <= limite:
+        return escapado
+    bruto = str(texto)[:limite]
+    while len(html.escape(bruto)) > limite - 1:
+        bruto = bruto[:len(bruto) * 4 // 5]
+    return html.escape(bruto) + "…"
+
+
 async def show_history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Histórico do cliente, do mais novo para o mais antigo, em páginas de TAMANHO_PAGINA_HISTORICO entradas.
+    Botões: HISTORICO(_id) (página mais recente) e HISTORICO_PAGINA(o|n, _id, *cursor) (mais antigas/novas),
+    com o cursor (data, bucket, posição) da entrada da borda da página.
+    """
     query = update.callback_query
     await query.answer()
-    client_id_str = query.data.split('_', 2)[2]
-    cliente_id = ObjectId(client_id_str)
 
-    clientes_collection = context.bot_data['clientes_collection']
-    cliente = clientes_collection.find_one({"_id": cliente_id})
+    antes_de = depois_de = None
+    if len(context.args) > 1:
+        direcao, cliente_id, *cursor = context.args
+        if direcao == 'o':
+            antes_de = tuple(cursor)
+        else:
+            depois_de = tuple(cursor)
+    else:
+        cliente_id = context.args[0]
+
+    repositorio = context.bot_data['repositorio']
+    cliente = await repositorio.buscar_cliente(cliente_id)
 
     if not cliente:
         await query.message.reply_text("Cliente não encontrado.")
         return
 
-    tz = pytz.timezone('America/Sao_Paulo')
-    historico_texto = f"📜 <b>Histórico de {cliente['nome_cliente']}</b>\n\n"
+    entradas, ha_mais_antigas, ha_mais_novas = await repositorio.pagina_historico(
+        cliente_id, TAMANHO_PAGINA_HISTORICO, antes_de=antes_de, depois_de=depois_de
+    )
+    pagina_mais_recente = not ha_mais_novas
 
-    if 'observacoes' in cliente and cliente['observacoes']:
-        historico_texto += "<b>--- Observações e Consultas ---</b>\n"
-        for nota in sorted(cliente['observacoes'], key=lambda x: x['data']):
-            data_local = nota['data'].astimezone(tz).strftime('%d/%m/%Y %H:%M')
-            historico_texto += f"<b>{data_local}</b> por <i>{nota['vendedor_nome']}</i>:\n - {nota['nota']}\n"
-        historico_texto += "\n"
+    historico_texto = f"📜 <b>Histórico de {html.escape(str(cliente['nome_cliente']))}</b>\n\n"
 
-    if cliente.get('status_final') and cliente.get('status') == 'Concluido':
-        historico_texto += f"<b>Status Final:</b> {cliente['status_final']}\n"
-        historico_texto += f"<b>Finalizado em:</b> {cliente['data_finalizacao'].astimezone(tz).strftime('%d/%m/%Y %H:%M')}\n"
+    if pagina_mais_recente and cliente.get('status_final') and cliente.get('status') == 'Concluido':
+        historico_texto += f"<b>Status Final:</b> {html.escape(cliente['status_final'])}\n"
+        historico_texto += f"<b>Finalizado em:</b> {_data_local(cliente['data_finalizacao'])}\n\n"
 
-    if len(historico_texto.strip()) <= 50:
-        historico_texto = f"Nenhum histórico de observações ou consultas para {cliente['nome_cliente']}."
+    if entradas:
+        historico_texto += "<b>--- Observações e Consultas (mais recentes primeiro) ---</b>\n"
+        for nota in entradas:
+            historico_texto += (
+                f"<b>{_data_local(nota['data'])}</b> por <i>{_resumir(nota.get('vendedor_nome', ''), 40)}</i>:\n"
+                f" - {_resumir(nota.get('nota', ''), LIMITE_NOTA_HISTORICO)}\n"
+            )
+    elif pagina_mais_recente and not cliente.get('status_final'):
+        historico_texto = f"Nenhum histórico de observações ou consultas para {html.escape(str(cliente['nome_cliente']))}."
 
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar ao Cliente", callback_data=f"view_client_{cliente_id}")]]
+    keyboard = []
+    navegacao = []
+    if entradas and ha_mais_novas:
+        navegacao.append(InlineKeyboardButton(
+            "⬅️ Mais recentes",
+            callback_data=callbacks.HISTORICO_PAGINA.codificar("n", cliente_id, *entradas[0]['cursor'])))
+    if entradas and ha_mais_antigas:
+        navegacao.append(InlineKeyboardButton(
+            "Mais antigas ➡️",
+            callback_data=callbacks.HISTORICO_PAGINA.codificar("o", cliente_id, *entradas[-1]['cursor'])))
+    if navegacao:
+        keyboard.append(navegacao)
+    keyboard.append([InlineKeyboardButton("⬅️ Voltar ao Cliente", callback_data=callbacks.VER_CLIENTE.codificar(cliente_id))])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     await query.edit_message_text(text=historico_texto, reply_markup=reply_markup, parse_mode='HTML')
 
 
+def _cursor_hoje(cliente: dict) -> tuple:
+    return cliente['data_finalizacao'], cliente['_id']
+
+
 async def clientes_hoje(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/hoje e a navegação entre páginas (botão HOJE_PAGINA(p|n, data de finalização, _id))."""
+    query = update.callback_query
+    responder = query.edit_message_text if query else update.message.reply_text
+    if query:
+        await query.answer()
+
     if 'vendedor_logado' not in context.user_data:
-        await update.message.reply_html("Você não está logado. Envie <code>/login</code> para começar.")
+        await responder("Você não está logado. Envie <code>/login</code> para começar.", parse_mode='HTML')
         return
 
+    apos = antes = None
+    if query:
+        direcao, data_cursor, cliente_id = context.args
+        chave = (data_cursor.replace(tzinfo=UTC), cliente_id)
+        if direcao == 'n':
+            apos = chave
+        else:
+            antes = chave
+
     vendedor_id = context.user_data['vendedor_logado']['_id']
-    clientes_collection = context.bot_data['clientes_collection']
-    tz = pytz.timezone('America/Sao_Paulo')
+    repositorio = context.bot_data['repositorio']
+    tz = TZ_SAO_PAULO
     hoje = datetime.now(tz).date()
 
     inicio_dia_utc = tz.localize(datetime.combine(hoje, time.min)).astimezone(pytz.utc)
     fim_dia_utc = tz.localize(datetime.combine(hoje, time.max)).astimezone(pytz.utc)
 
-    query = {"vendedor_atribuido": vendedor_id, "data_finalizacao": {"$gte": inicio_dia_utc, "$lte": fim_dia_utc}}
-    clientes_do_dia = list(clientes_collection.find(query).sort("data_finalizacao", -1))
+    clientes_do_dia, ha_anterior, ha_proxima = await repositorio.listar_finalizados_vendedor(
+        vendedor_id, inicio_dia_utc, fim_dia_utc, limite=TAMANHO_PAGINA, apos=apos, antes=antes
+    )
 
     if not clientes_do_dia:
-        await update.message.reply_text("Você ainda não finalizou nenhum cliente hoje.")
+        await responder("Você ainda não finalizou nenhum cliente hoje.")
         return
 
     keyboard = []
     for c in clientes_do_dia:
-        keyboard.append([InlineKeyboardButton(f"{c['nome_cliente']} ({c['status_final']})", callback_data=f"view_client_{c['_id']}")])
+        keyboard.append([InlineKeyboardButton(f"{c['nome_cliente']} ({c['status_final']})", callback_data=callbacks.VER_CLIENTE.codificar(c['_id']))])
+    navegacao = _linha_paginacao(callbacks.HOJE_PAGINA, clientes_do_dia, ha_anterior, ha_proxima, _cursor_hoje)
+    if navegacao:
+        keyboard.append(navegacao)
 
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(
+    await responder(
         f"<b>Clientes finalizados hoje ({hoje.strftime('%d/%m/%Y')}):</b>\nSelecione um cliente para ver os detalhes:",
         reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
+
 async def view_client_details(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
-    try:
-        client_id_str = query.data.split('_', 2)[2]
-        cliente_id = ObjectId(client_id_str)
-    except (IndexError, TypeError, InvalidId):
-        await query.message.reply_text("Erro: ID do cliente inválido.")
-        return
-
-    clientes_collection = context.bot_data['clientes_collection']
-    cliente = clientes_collection.find_one({"_id": cliente_id})
+    cliente_id = context.args[0]
+    repositorio = context.bot_data['repositorio']
+    cliente = await repositorio.buscar_cliente(cliente_id)
 
     if cliente:
         context.user_data['cliente_atual_id'] = cliente['_id']
@@ -390,8 +446,45 @@ async def logout(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if 'vendedor_logado' not in context.user_data:
         await update.message.reply_text("Você já não está logado.")
         return
+    context.bot_data['fila_leads'].cancelar_pre_reserva(context.user_data['vendedor_logado']['_id'])
     context.user_data.clear()
-    await update.message.reply_text("Você foi desconectado. Use /login para entrar.", reply_markup=ReplyKeyboardRemove())
+    await context.bot_data['autenticador'].encerrar_sessao(update.effective_user.id)
+    await update.message.reply_text("Você foi desconectado. Use /login para entrar.", reply_markup=teclados.REMOVER_TECLADO)
+
+
+def _agendar_pre_reserva(context: ContextTypes.DEFAULT_TYPE, vendedor_id) -> None:
+    """Depois de uma finalização, já separa o próximo lead do vendedor e monta o cartão (se a pré-reserva estiver ligada)."""
+    async def _preparar(cliente: dict) -> tuple:
+        return await _montar_info_cliente(context, cliente, TEXTO_NOVO_CLIENTE)
+    if vendedor_id is not None:
+        context.bot_data['fila_leads'].agendar_pre_reserva(vendedor_id, _preparar)
+
+
+async def _proximo_pre_reservado(update: Update, context: ContextTypes.DEFAULT_TYPE, vendedor_id) -> bool:
+    """/proximo respondido com a pré-reserva do vendedor. Retorna False se não houver uma utilizável."""
+    fila_leads = context.bot_data['fila_leads']
+    pre_reserva = await fila_leads.retirar_pre_reserva(vendedor_id)
+    if pre_reserva is None:
+        return False
+
+    # A conferência do atendimento em curso vai junto com a confirmação: uma só ida ao banco.
+    cliente_ativo, cliente_novo = await asyncio.gather(
+        context.bot_data['repositorio'].buscar_cliente_em_atendimento(vendedor_id, exceto=pre_reserva.lead_id),
+        fila_leads.confirmar_pre_reserva(pre_reserva, vendedor_id),
+    )
+    if cliente_ativo:
+        if cliente_novo:
+            await fila_leads.desfazer_pre_reserva(pre_reserva, vendedor_id)
+        context.user_data['cliente_atual_id'] = cliente_ativo['_id']
+        await _enviar_info_cliente(update, context, cliente_ativo, "Você já tem um cliente em atendimento.")
+        return True
+    if not cliente_novo:
+        return False
+
+    context.user_data['cliente_atual_id'] = cliente_novo['_id']
+    texto, reply_markup = pre_reserva.cartao or await _montar_info_cliente(context, cliente_novo, TEXTO_NOVO_CLIENTE)
+    await update.message.reply_text(texto, reply_markup=reply_markup, parse_mode='HTML')
+    return True
 
 
 async def proximo_cliente(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -400,45 +493,30 @@ async def proximo_cliente(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
 
     vendedor_id = context.user_data['vendedor_logado']['_id']
-    clientes_collection = context.bot_data['clientes_collection']
-    bases_collection = context.bot_data['bases']
+    repositorio = context.bot_data['repositorio']
+
+    if await _proximo_pre_reservado(update, context, vendedor_id):
+        return
 
-    cliente_ativo = clientes_collection.find_one({"vendedor_atribuido": vendedor_id, "status": "Em_Atendimento"})
+    cliente_ativo = await repositorio.buscar_cliente_em_atendimento(vendedor_id)
     if cliente_ativo:
         context.user_data['cliente_atual_id'] = cliente_ativo['_id']
         texto_intro = "Você já tem um cliente em atendimento."
         await _enviar_info_cliente(update, context, cliente_ativo, texto_intro)
         return
 
-    bases_ativas_docs = list(bases_collection.find({"ativa": True}))
-    if not bases_ativas_docs:
+    fila_leads = context.bot_data['fila_leads']
+    if not await fila_leads.bases_ativas():
         await update.message.reply_text("Nenhuma base de leads está ativa no momento. Fale com o administrador.")
         return
 
-    nomes_bases_ativas = [base['nome_base'] for base in bases_ativas_docs]
-    filtro_clientes = {"status": "Pendente", "nome_base": {"$in": nomes_bases_ativas}}
-
-    for _ in range(3):
-        pipeline = [{"$match": filtro_clientes}, {"$sample": {"size": 1}}]
-        random_clients = list(clientes_collection.aggregate(pipeline))
-
-        if not random_clients:
-            await update.message.reply_text("Parabéns! Não há mais clientes pendentes nas bases ativas.")
-            return
-
-        cliente_candidato = random_clients[0]
-        cliente_novo = clientes_collection.find_one_and_update(
-            {"_id": cliente_candidato['_id'], "status": "Pendente"},
-            {"$set": {"status": "Em_Atendimento", "vendedor_atribuido": vendedor_id, "data_atribuicao": datetime.now(UTC)}},
-            return_document=ReturnDocument.AFTER
-        )
-        if cliente_novo:
-            context.user_data['cliente_atual_id'] = cliente_novo['_id']
-            texto_intro = "<b>Novo Cliente Atribuído!</b>"
-            await _enviar_info_cliente(update, context, cliente_novo, texto_intro)
-            return
+    cliente_novo = await fila_leads.reservar(vendedor_id)
+    if not cliente_novo:
+        await update.message.reply_text("Parabéns! Não há mais clientes pendentes nas bases ativas.")
+        return
 
-    await update.message.reply_text("A fila está muito concorrida! Tente novamente em alguns segundos.")
+    context.user_data['cliente_atual_id'] = cliente_novo['_id']
+    await _enviar_info_cliente(update, context, cliente_novo, TEXTO_NOVO_CLIENTE)
 
 
 async def meu_cliente(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -447,9 +525,9 @@ async def meu_cliente(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         return
 
     vendedor_id = context.user_data['vendedor_logado']['_id']
-    clientes_collection = context.bot_data['clientes_collection']
+    repositorio = context.bot_data['repositorio']
 
-    cliente_ativo = clientes_collection.find_one({"vendedor_atribuido": vendedor_id, "status": "Em_Atendimento"})
+    cliente_ativo = await repositorio.buscar_cliente_em_atendimento(vendedor_id)
     if cliente_ativo:
         context.user_data['cliente_atual_id'] = cliente_ativo['_id']
         texto_intro = "Este é o seu cliente atual:"
@@ -467,16 +545,19 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
 
     cliente_id = context.user_data['cliente_atual_id']
-    callback_status = query.data
-    status_final_texto = STATUS_MAP.get(callback_status, "Status Desconhecido")
-    clientes_collection = context.bot_data['clientes_collection']
+    status_final_texto = STATUS_MAP.get(context.args[0], "Status Desconhecido")
+    repositorio = context.bot_data['repositorio']
 
     try:
-        clientes_collection.update_one(
-            {"_id": ObjectId(cliente_id)},
-            {"$set": {"status": "Concluido", "status_final": status_final_texto, "data_finalizacao": datetime.now(UTC)}}
+        finalizado = await repositorio.finalizar_cliente(
+            ObjectId(cliente_id), {"status_final": status_final_texto, "data_finalizacao": datetime.now(UTC)},
+            vendedor_id=context.user_data['vendedor_logado']['_id']
         )
         del context.user_data['cliente_atual_id']
+        if finalizado is None:
+            await query.edit_message_text(text=MSG_ATENDIMENTO_EXPIRADO)
+            return
+        _agendar_pre_reserva(context, context.user_data['vendedor_logado']['_id'])
         texto_confirmacao = (
             f"Cliente finalizado com sucesso!\n<b>Status Final:</b> {status_final_texto}\n\nÓtimo trabalho! Use /proximo para pegar um novo cliente."
         )
@@ -491,17 +572,11 @@ async def filtrar_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         await update.message.reply_html("Você não está logado. Envie <code>/login</code> para começar.")
         return
 
-    filtro_keyboard = [
-        [InlineKeyboardButton("✅ Com Saldo", callback_data="filtro_com_saldo")],
-        [InlineKeyboardButton("Não Autorizado", callback_data="filtro_Nao Autorizado")],
-        [InlineKeyboardButton("Sem Saldo", callback_data="filtro_Sem Saldo")],
-        [InlineKeyboardButton("Não Elegível", callback_data="filtro_Nao Elegivel")]
-    ]
-    reply_markup = InlineKeyboardMarkup(filtro_keyboard)
-    await update.message.reply_text("Selecione um filtro para listar os clientes:", reply_markup=reply_markup)
+    await update.message.reply_text("Selecione um filtro para listar os clientes:", reply_markup=teclados.FILTROS)
 
 
 async def listar_clientes_filtrados(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Botões FILTRO(filtro) (primeira página) e FILTRO_PAGINA(p|n, _id, filtro) (navegação)."""
     query = update.callback_query
     await query.answer()
 
@@ -509,11 +584,21 @@ async def listar_clientes_filtrados(update: Update, context: ContextTypes.DEFAUL
         await query.edit_message_text("Sessão expirada. Por favor, faça login novamente com /login.")
         return
 
+    apos = antes = None
+    if len(context.args) == 3:
+        direcao, cliente_id, filtro_selecionado = context.args
+        chave = (cliente_id,)
+        if direcao == 'n':
+            apos = chave
+        else:
+            antes = chave
+    else:
+        filtro_selecionado = context.args[0]
+
     vendedor_id = context.user_data['vendedor_logado']['_id']
-    filtro_selecionado = query.data.split('_', 1)[1]
-    clientes_collection = context.bot_data['clientes_collection']
+    repositorio = context.bot_data['repositorio']
 
-    db_query = {"vendedor_atribuido": vendedor_id}
+    db_query = {}
     titulo = ""
 
     if filtro_selecionado == "com_saldo":
@@ -523,7 +608,9 @@ async def listar_clientes_filtrados(update: Update, context: ContextTypes.DEFAUL
         db_query["resultado_consulta"] = filtro_selecionado
         titulo = f"Clientes com status '{filtro_selecionado}'"
 
-    clientes_encontrados = list(clientes_collection.find(db_query))
+    clientes_encontrados, ha_anterior, ha_proxima = await repositorio.listar_clientes_vendedor(
+        vendedor_id, db_query, limite=TAMANHO_PAGINA, apos=apos, antes=antes
+    )
 
     if not clientes_encontrados:
         await query.edit_message_text(f"Nenhum cliente encontrado para o filtro selecionado.")
@@ -534,7 +621,11 @@ async def listar_clientes_filtrados(update: Update, context: ContextTypes.DEFAUL
         texto_botao = f"{cliente['nome_cliente']}"
         if 'saldo_consulta' in cliente:
             texto_botao += f" (R$ {cliente.get('saldo_consulta', 0):.2f})"
-        keyboard.append([InlineKeyboardButton(texto_botao, callback_data=f"view_client_{cliente['_id']}")])
+        keyboard.append([InlineKeyboardButton(texto_botao, callback_data=callbacks.VER_CLIENTE.codificar(cliente['_id']))])
+    navegacao = _linha_paginacao(callbacks.FILTRO_PAGINA, clientes_encontrados, ha_anterior, ha_proxima,
+                                 lambda c: (c['_id'],), filtro_selecionado)
+    if navegacao:
+        keyboard.append(navegacao)
 
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(f"<b>{titulo}:</b>\nSelecione um para ver os detalhes.", reply_markup=reply_markup, parse_mode='HTML')
@@ -0,0 +1,131 @@
+# services/autenticacao.py
+import time
+import asyncio
+import logging
+from collections import deque, OrderedDict
+from datetime import datetime, timedelta, UTC
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class Autenticador:
+    """
+    Verificação de senha fora do event loop, com limite de tentativas por login
+    e sessões persistidas no MongoDB.
+
+    O hash (PBKDF2/scrypt do werkzeug) roda num pool de threads próprio; o hashlib libera
+    o GIL durante o cálculo, então `max_workers` é de fato o número de hashes simultâneos.
+    """
+
+    def __init__(self, repositorio, max_workers: int = 4, max_falhas: int = 5, janela_s: float = 900.0,
+                 bloqueio_s: float = 900.0, validade_sessao: timedelta = timedelta(hours=16),
+                 max_sem_sessao: int = 10000, validade_sem_sessao_s: float = 600.0):
+        self.repositorio = repositorio
+        self.max_falhas = max_falhas
+        self.janela_s = janela_s
+        self.bloqueio_s = bloqueio_s
+        self.validade_sessao = validade_sessao
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="senha")
+        self._falhas = {}
+        # Usuários sabidamente sem sessão (LRU com validade): evita uma consulta ao banco por mensagem.
+        self.max_sem_sessao = max_sem_sessao
+        self.validade_sem_sessao_s = validade_sem_sessao_s
+        self._sem_sessao = OrderedDict()
+
+    def fechar(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    # -------------------------------
+    # Limite de tentativas
+    # -------------------------------
+    def segundos_bloqueado(self, login: str) -> int:
+        falhas = self._falhas.get(login)
+        if not falhas or len(falhas) < self.max_falhas:
+            return 0
+        restante = falhas[-1] + self.bloqueio_s - time.monotonic()
+        if restante <= 0:
+            del self._falhas[login]
+            return 0
+        return int(restante) + 1
+
+    def _registrar_falha(self, login: str) -> None:
+        agora = time.monotonic()
+        falhas = self._falhas.setdefault(login, deque(maxlen=self.max_falhas))
+        falhas.append(agora)
+        while falhas and agora - falhas[0] > self.janela_s:
+            falhas.popleft()
+        if len(falhas) >= self.max_falhas:
+            logging.warning(f"Login '{login}' bloqueado por {self.bloqueio_s:.0f}s após {len(falhas)} falhas.")
+
+    # -------------------------------
+    # Verificação de senha
+    # -------------------------------
+    async def verificar(self, login: str, senha: str):
+        """Retorna o documento do vendedor se a senha confere; caso contrário None (e conta a falha)."""
+        vendedor = await self.repositorio.buscar_vendedor_por_login(login)
+        senha_ok = False
+        if vendedor and vendedor.get('senha_hash'):
+            loop = asyncio.get_running_loop()
+            senha_ok = await loop.run_in_executor(self._executor, check_password_hash, vendedor['senha_hash'], senha)
+
+        if not senha_ok:
+            self._registrar_falha(login)
+            return None
+        self._falhas.pop(login, None)
+        return vendedor
+
+    async def gerar_hash(self, senha: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, generate_password_hash, senha)
+
+    # -------------------------------
+    # Sessões
+    # -------------------------------
+    async def abrir_sessao(self, usuario_telegram: int, vendedor_logado: dict) -> None:
+        agora = datetime.now(UTC)
+        await self.repositorio.salvar_sessao(usuario_telegram, {
+            "vendedor_logado": vendedor_logado,
+            "criada_em": agora,
+            "expira_em": agora + self.validade_sessao,
+        })
+        self._sem_sessao.pop(usuario_telegram, None)
+
+    async def encerrar_sessao(self, usuario_telegram: int) -> None:
+        await self.repositorio.remover_sessao(usuario_telegram)
+        self._marcar_sem_sessao(usuario_telegram)
+
+    def _marcar_sem_sessao(self, usuario_telegram: int) -> None:
+        self._sem_sessao[usuario_telegram] = time.monotonic()
+        self._sem_sessao.move_to_end(usuario_telegram)
+        while len(self._sem_sessao) > self.max_sem_sessao:
+            self._sem_sessao.popitem(last=False)
+
+    def _sabidamente_sem_sessao(self, usuario_telegram: int) -> bool:
+        marcado_em = self._sem_sessao.get(usuario_telegram)
+        if marcado_em is None:
+            return False
+        if time.monotonic() - marcado_em > self.validade_sem_sessao_s:
+            del self._sem_sessao[usuario_telegram]
+            return False
+        self._sem_sessao.move_to_end(usuario_telegram)
+        return True
+
+    async def restaurar_sessao(self, usuario_telegram: int):
+        """
+        Retorna o `vendedor_logado` de uma sessão válida. Um usuário sem sessão fica marcado por
+        `validade_sem_sessao_s` (até `max_sem_sessao` usuários, descartando os menos recentes), e nesse
+        intervalo o banco não é consultado de novo.
+        """
+        if self._sabidamente_sem_sessao(usuario_telegram):
+            return None
+        sessao = await self.repositorio.buscar_sessao(usuario_telegram)
+        if not sessao:
+            self._marcar_sem_sessao(usuario_telegram)
+            return None
+        expira_em = sessao['expira_em']
+        if expira_em.tzinfo is None:
+            expira_em = expira_em.replace(tzinfo=UTC)
+        if expira_em <= datetime.now(UTC):
+            self._marcar_sem_sessao(usuario_telegram)
+            return None
+        return sessao['vendedor_logado']
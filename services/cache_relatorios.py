@@ -0,0 +1,97 @@
+# services/cache_relatorios.py
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, UTC
+
+from database.rollups import TZ_SAO_PAULO
+
+
+def escopo_vendedores(prefixo: str, ids_vendedores) -> str:
+    """
+    Escopo de cache de um relatório sobre um conjunto de vendedores: o mesmo conjunto (em qualquer ordem) dá
+    o mesmo escopo, e qualquer entrada ou saída de vendedor dá outro, sem esperar o resultado antigo expirar.
+    """
+    ids = sorted(str(vendedor_id) for vendedor_id in ids_vendedores)
+    return f"{prefixo}:{hashlib.sha1(','.join(ids).encode()).hexdigest()[:16]}"
+
+
+class CacheRelatorios:
+    """
+    Cache LRU dos resultados de relatório, por (tipo, escopo, início, fim).
+
+    Período já encerrado (fim antes de agora: ontem, semana passada, mês passado) não muda mais,
+    então fica em cache até a meia-noite local, quando os períodos "andam". Período aberto
+    (hoje, esta semana, este mês) expira em `ttl_aberto_s`. Pedidos iguais que chegam juntos
+    (o mesmo botão apertado várias vezes) esperam o mesmo cálculo em vez de repeti-lo.
+    """
+
+    def __init__(self, capacidade: int = 256, ttl_aberto_s: float = 60.0):
+        self.capacidade = capacidade
+        self.ttl_aberto_s = ttl_aberto_s
+        self._itens = OrderedDict()
+        self._em_andamento = {}
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+
+    @staticmethod
+    def chave(tipo: str, escopo, inicio_utc, fim_utc) -> tuple:
+        return (tipo, str(escopo), inicio_utc.timestamp(), fim_utc.timestamp())
+
+    def _validade(self, fim_utc) -> float:
+        """Instante (time.time()) em que o resultado deixa de valer."""
+        agora = datetime.now(UTC)
+        if fim_utc < agora:
+            amanha = datetime.now(TZ_SAO_PAULO).date() + timedelta(days=1)
+            return TZ_SAO_PAULO.localize(datetime.combine(amanha, datetime.min.time())).timestamp()
+        return time.time() + self.ttl_aberto_s
+
+    async def obter(self, tipo: str, escopo, inicio_utc, fim_utc, calcular):
+        """Resultado em cache ou `await calcular()` (guardado em seguida)."""
+        chave = self.chave(tipo, escopo, inicio_utc, fim_utc)
+        item = self._itens.get(chave)
+        if item is not None:
+            valido_ate, valor = item
+            if valido_ate > time.time():
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return valor
+            del self._itens[chave]
+
+        tarefa = self._em_andamento.get(chave)
+        if tarefa is None:
+            self.falhas += 1
+            tarefa = asyncio.ensure_future(calcular())
+            self._em_andamento[chave] = tarefa
+            try:
+                valor = await tarefa
+            finally:
+                self._em_andamento.pop(chave, None)
+            self._guardar(chave, self._validade(fim_utc), valor)
+            return valor
+        # Mesmo relatório já sendo calculado: conta como acerto, pois não gera outra consulta.
+        self.acertos += 1
+        return await asyncio.shield(tarefa)
+
+    def _guardar(self, chave, valido_ate: float, valor) -> None:
+        self._itens[chave] = (valido_ate, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.capacidade:
+            self._itens.popitem(last=False)
+            self.descartes += 1
+
+    def limpar(self) -> None:
+        self._itens.clear()
+
+    def estatisticas(self) -> dict:
+        consultas = self.acertos + self.falhas
+        return {
+            "itens": len(self._itens),
+            "capacidade": self.capacidade,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "descartes": self.descartes,
+            "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+        }
@@ -0,0 +1,44 @@
+# services/expiracao_leads.py
+import time
+import logging
+from datetime import datetime, timedelta, UTC
+
+
+class RecolhedorLeases:
+    """
+    Devolve à fila os leads abandonados em Em_Atendimento.
+
+    Um lead atribuído pelo /proximo (ou reaberto) fica com o vendedor por `validade`, contada a
+    partir de `data_atribuicao`. Passado esse prazo sem finalização, o job volta o lead para
+    Pendente e o recoloca na FilaLeads da base. Se o vendedor ainda clicar nos botões do lead
+    depois disso, a finalização é recusada, esteja o lead de volta na fila ou já com outro vendedor
+    (ver Repositorio.finalizar_cliente).
+    """
+
+    def __init__(self, repositorio, fila_leads, validade: timedelta = timedelta(hours=4), tamanho_lote: int = 500):
+        self.repositorio = repositorio
+        self.fila_leads = fila_leads
+        self.validade = validade
+        self.tamanho_lote = tamanho_lote
+        self.recolhidos_total = 0
+        self.execucoes = 0
+        self.ultima_execucao = None
+        self.ultimo_recolhido = 0
+
+    async def executar(self, context=None) -> int:
+        """Uma varredura; pode ser usada direto como callback do JobQueue."""
+        inicio = time.perf_counter()
+        resultado = await self.repositorio.liberar_atendimentos_expirados(
+            datetime.now(UTC) - self.validade, self.tamanho_lote
+        )
+        for nome_base, ids in resultado["por_base"].items():
+            self.fila_leads.devolver(nome_base, ids)
+
+        self.execucoes += 1
+        self.ultima_execucao = datetime.now(UTC)
+        self.ultimo_recolhido = resultado["liberados"]
+        self.recolhidos_total += resultado["liberados"]
+        if resultado["liberados"]:
+            logging.info(f"Recolhedor: {resultado['liberados']} lead(s) com atendimento expirado voltaram para a fila "
+                         f"({time.perf_counter() - inicio:.2f}s).")
+        return resultado["liberados"]
@@ -0,0 +1,152 @@
+# services/exportacao.py
+import io
+import csv
+import shutil
+import zipfile
+import tempfile
+from datetime import UTC
+
+from openpyxl import Workbook
+
+from database.rollups import TZ_SAO_PAULO
+
+# Acima disso o arquivo em montagem sai da memória e vai para disco.
+LIMITE_MEMORIA_BYTES = 8 * 1024 * 1024
+
+# A Bot API aceita documentos de até 50 MB; a folga cobre o envelope multipart.
+LIMITE_UPLOAD_BYTES = 49 * 1024 * 1024
+_TAMANHO_BLOCO = 1024 * 1024
+
+FORMATOS = {"x": "xlsx", "c": "csv"}
+
+# (título da coluna, campo do cliente); "vendedor" é resolvido pelo mapa de nomes.
+COLUNAS = [
+    ("Data finalização", "data_finalizacao"),
+    ("Vendedor", "vendedor"),
+    ("Status final", "status_final"),
+    ("Cliente", "nome_cliente"),
+    ("CPF", "cpf"),
+    ("Telefone", "telefone"),
+    ("Base", "nome_base"),
+    ("Banco consultado", "banco_consulta"),
+    ("Resultado consulta", "resultado_consulta"),
+    ("Saldo consulta", "saldo_consulta"),
+]
+PROJECAO = {campo: 1 for _, campo in COLUNAS if campo != "vendedor"} | {"vendedor_atribuido": 1, "_id": 0}
+
+
+def _linha(cliente: dict, nomes_vendedores: dict) -> list:
+    data = cliente.get('data_finalizacao')
+    if data is not None:
+        # Datas do MongoDB chegam em UTC sem fuso; a planilha mostra o horário de Brasília.
+        data = data.replace(tzinfo=UTC).astimezone(TZ_SAO_PAULO).replace(tzinfo=None)
+    valores = {**cliente, "data_finalizacao": data,
+               "vendedor": nomes_vendedores.get(cliente.get('vendedor_atribuido'), "Desconhecido")}
+    return [valores.get(campo) for _, campo in COLUNAS]
+
+
+def escrever_csv(clientes, nomes_vendedores: dict):
+    """Grava os clientes num CSV (UTF-8 com BOM, abre direto no Excel). Retorna (arquivo posicionado no início, linhas)."""
+    arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_BYTES, mode="w+b")
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    escritor = csv.writer(texto, delimiter=";")
+    escritor.writerow([titulo for titulo, _ in COLUNAS])
+    linhas = 0
+    for cliente in clientes:
+        linha = _linha(cliente, nomes_vendedores)
+        if linha[0] is not None:
+            linha[0] = linha[0].strftime('%d/%m/%Y %H:%M')
+        escritor.writerow(linha)
+        linhas += 1
+    texto.flush()
+    texto.detach()
+    arquivo.seek(0)
+    return arquivo, linhas
+
+
+def escrever_xlsx(clientes, nomes_vendedores: dict):
+    """
+    Grava os clientes numa planilha em modo write-only do openpyxl, que despeja as linhas em disco
+    à medida que são escritas. Retorna (arquivo posicionado no início, linhas).
+    """
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet("Finalizados")
+    aba.append([titulo for titulo, _ in COLUNAS])
+    linhas = 0
+    for cliente in clientes:
+        aba.append(_linha(cliente, nomes_vendedores))
+        linhas += 1
+    arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_BYTES, mode="w+b")
+    planilha.save(arquivo)
+    arquivo.seek(0)
+    return arquivo, linhas
+
+
+ESCRITORES = {"xlsx": escrever_xlsx, "csv": escrever_csv}
+
+
+def _tamanho(arquivo) -> int:
+    arquivo.seek(0, io.SEEK_END)
+    tamanho = arquivo.tell()
+    arquivo.seek(0)
+    return tamanho
+
+
+def _novo_temporario():
+    return tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_BYTES, mode="w+b")
+
+
+def _dividir(arquivo, nome_arquivo: str, limite: int) -> list:
+    """Pedaços de até `limite` bytes: nome.001, nome.002... (junte com `cat` ou abra o primeiro no 7-Zip)."""
+    partes = []
+    try:
+        while True:
+            parte = _novo_temporario()
+            partes.append((parte, f"{nome_arquivo}.{len(partes) + 1:03d}"))
+            restante = limite
+            while restante:
+                bloco = arquivo.read(min(_TAMANHO_BLOCO, restante))
+                if not bloco:
+                    break
+                parte.write(bloco)
+                restante -= len(bloco)
+            parte.seek(0)
+            if restante:
+                if restante == limite:
+                    partes.pop()[0].close()
+                return partes
+    except BaseException:
+        for parte, _ in partes:
+            parte.close()
+        raise
+
+
+def preparar_envio(arquivo, nome_arquivo: str, limite: int = LIMITE_UPLOAD_BYTES) -> list:
+    """
+    Arquivos a enviar para o relatório caber no limite de upload do Telegram: [(arquivo, nome)], posicionados
+    no início. Até `limite`, o próprio arquivo; acima, compactado em .zip; se nem o zip couber, o zip em pedaços.
+    Assume a posse de `arquivo`: ou ele está no retorno, ou já foi fechado.
+    """
+    try:
+        if _tamanho(arquivo) <= limite:
+            return [(arquivo, nome_arquivo)]
+        compactado = _novo_temporario()
+        try:
+            with zipfile.ZipFile(compactado, "w", compression=zipfile.ZIP_DEFLATED) as zip_:
+                with zip_.open(nome_arquivo, "w", force_zip64=True) as destino:
+                    shutil.copyfileobj(arquivo, destino, _TAMANHO_BLOCO)
+        except BaseException:
+            compactado.close()
+            raise
+    except BaseException:
+        arquivo.close()
+        raise
+    arquivo.close()
+
+    nome_zip = f"{nome_arquivo}.zip"
+    if _tamanho(compactado) <= limite:
+        return [(compactado, nome_zip)]
+    try:
+        return _dividir(compactado, nome_zip, limite)
+    finally:
+        compactado.close()
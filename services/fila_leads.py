@@ -0,0 +1,258 @@
+# services/fila_leads.py
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, UTC
+
+
+class PreReserva:
+    """Lead separado para um vendedor antes do /proximo. Só existe em memória: no banco o lead continua Pendente."""
+
+    def __init__(self, nome_base: str, lead_id, cliente: dict):
+        self.nome_base = nome_base
+        self.lead_id = lead_id
+        self.cliente = cliente
+        self.cartao = None
+        self.expiracao = None
+
+
+class FilaLeads:
+    """
+    Distribuidor de leads do /proximo.
+
+    Mantém, para cada base ativa, uma fila já embaralhada com ids de clientes pendentes.
+    Reservar um lead é um `popleft()` (O(1) e atômico dentro do event loop, pois não há
+    `await` entre escolher e retirar o id), então dois vendedores nunca recebem o mesmo id
+    e não existe retentativa por colisão. O MongoDB só confirma a atribuição com o filtro
+    `status: "Pendente"`; ids que deixaram de estar pendentes por outro caminho (ex.: /buscar)
+    são descartados.
+
+    A fila vive em memória, então pressupõe um único processo do bot distribuindo leads.
+
+    Com `validade_pre_reserva_s` > 0, `agendar_pre_reserva` separa em segundo plano o próximo lead
+    de um vendedor (ex.: logo depois de ele finalizar o atual): o id sai da fila, o documento é lido
+    e o cartão pode ser montado antes do /proximo, que então só confirma a atribuição. A pré-reserva
+    não é gravada no banco; se não for usada dentro da validade, o id volta para a fila.
+    """
+
+    def __init__(self, repositorio, tamanho_lote: int = 500, nivel_minimo: int = 100, ttl_bases_s: float = 30.0,
+                 validade_pre_reserva_s: float = 0.0):
+        self.repositorio = repositorio
+        self.tamanho_lote = tamanho_lote
+        self.nivel_minimo = nivel_minimo
+        self.ttl_bases_s = ttl_bases_s
+        self._filas = {}
+        self._travas_recarga = {}
+        self._recargas_pendentes = {}
+        self._ids_enfileirados = set()
+        self._bases_ativas = []
+        self._bases_atualizadas_em = 0.0
+        self._proxima_base = 0
+        self.validade_pre_reserva_s = validade_pre_reserva_s
+        self._pre_reservas = {}
+        self._tarefas_pre_reserva = {}
+        self.pre_reservas_usadas = 0
+        self.pre_reservas_expiradas = 0
+        self.pre_reservas_perdidas = 0
+
+    def invalidar_bases(self) -> None:
+        """Força a releitura das bases ativas na próxima reserva (ex.: após ativar/inativar uma base)."""
+        self._bases_atualizadas_em = 0.0
+
+    async def bases_ativas(self) -> list:
+        if time.monotonic() - self._bases_atualizadas_em > self.ttl_bases_s:
+            self._bases_ativas = await self.repositorio.listar_nomes_bases_ativas()
+            self._bases_atualizadas_em = time.monotonic()
+            for nome_base in list(self._filas):
+                if nome_base not in self._bases_ativas:
+                    self._descartar_fila(nome_base)
+        return self._bases_ativas
+
+    def tamanho(self, nome_base: str = None) -> int:
+        if nome_base is not None:
+            return len(self._filas.get(nome_base, ()))
+        return sum(len(fila) for fila in self._filas.values())
+
+    def devolver(self, nome_base: str, ids: list) -> None:
+        """Recoloca ids (ex.: leads liberados) no fim da fila da base, se ela estiver carregada."""
+        fila = self._filas.get(nome_base)
+        if fila is None:
+            return
+        for lead_id in ids:
+            if lead_id not in self._ids_enfileirados:
+                self._ids_enfileirados.add(lead_id)
+                fila.append(lead_id)
+
+    async def reservar(self, vendedor_id):
+        """
+        Atribui ao vendedor o próximo lead pendente das bases ativas.
+        Retorna o documento do cliente já atribuído, ou None se não houver mais pendentes.
+        """
+        await self.bases_ativas()
+        while True:
+            lead = self._retirar_proximo()
+            if lead is None:
+                if not await self._recarregar_vazias():
+                    return None
+                continue
+
+            nome_base, lead_id = lead
+            try:
+                cliente = await self.repositorio.atribuir_cliente(lead_id, vendedor_id, datetime.now(UTC))
+            finally:
+                self._ids_enfileirados.discard(lead_id)
+            if cliente is not None:
+                return cliente
+            logging.debug(f"Lead {lead_id} da base '{nome_base}' não estava mais pendente; descartado.")
+
+    def agendar_pre_reserva(self, vendedor_id, preparar=None) -> None:
+        """
+        Separa em segundo plano o próximo lead do vendedor, se a pré-reserva estiver ligada e ele ainda não
+        tiver uma. `preparar(cliente)`, se informado, é aguardado e o resultado fica em `PreReserva.cartao`.
+        """
+        if not self.validade_pre_reserva_s or vendedor_id in self._pre_reservas:
+            return
+        tarefa = self._tarefas_pre_reserva.get(vendedor_id)
+        if tarefa is None or tarefa.done():
+            self._tarefas_pre_reserva[vendedor_id] = asyncio.create_task(self._pre_reservar(vendedor_id, preparar))
+
+    async def retirar_pre_reserva(self, vendedor_id):
+        """
+        Tira a pré-reserva do vendedor (esperando a que estiver em andamento), ou None se não houver.
+        O id continua fora da fila até `confirmar_pre_reserva`.
+        """
+        tarefa = self._tarefas_pre_reserva.pop(vendedor_id, None)
+        if tarefa is not None and not tarefa.done():
+            await tarefa
+        pre_reserva = self._pre_reservas.pop(vendedor_id, None)
+        if pre_reserva is None:
+            return None
+        pre_reserva.expiracao.cancel()
+        if pre_reserva.nome_base not in await self.bases_ativas():
+            self._ids_enfileirados.discard(pre_reserva.lead_id)
+            return None
+        return pre_reserva
+
+    async def confirmar_pre_reserva(self, pre_reserva: PreReserva, vendedor_id):
+        """Atribui no banco o lead pré-reservado. Retorna o cliente, ou None se ele deixou de estar pendente."""
+        try:
+            cliente = await self.repositorio.atribuir_cliente(pre_reserva.lead_id, vendedor_id, datetime.now(UTC))
+        finally:
+            self._ids_enfileirados.discard(pre_reserva.lead_id)
+        if cliente is None:
+            self.pre_reservas_perdidas += 1
+        else:
+            self.pre_reservas_usadas += 1
+        return cliente
+
+    async def desfazer_pre_reserva(self, pre_reserva: PreReserva, vendedor_id) -> None:
+        """Devolve à fila um lead pré-reservado que foi confirmado sem poder ser usado."""
+        if await self.repositorio.liberar_cliente(pre_reserva.lead_id, vendedor_id):
+            self.devolver(pre_reserva.nome_base, [pre_reserva.lead_id])
+
+    def cancelar_pre_reserva(self, vendedor_id) -> None:
+        """Devolve à fila a pré-reserva do vendedor, se houver (ex.: no /logout)."""
+        tarefa = self._tarefas_pre_reserva.pop(vendedor_id, None)
+        if tarefa is not None:
+            tarefa.cancel()
+        pre_reserva = self._pre_reservas.pop(vendedor_id, None)
+        if pre_reserva is not None:
+            pre_reserva.expiracao.cancel()
+            self._devolver_retirado(pre_reserva.nome_base, pre_reserva.lead_id)
+
+    async def _pre_reservar(self, vendedor_id, preparar) -> None:
+        await self.bases_ativas()
+        while True:
+            lead = self._retirar_proximo()
+            if lead is None:
+                if not await self._recarregar_vazias():
+                    return
+                continue
+
+            nome_base, lead_id = lead
+            try:
+                cliente = await self.repositorio.buscar_cliente(lead_id)
+                if cliente is None or cliente.get('status') != "Pendente":
+                    self._ids_enfileirados.discard(lead_id)
+                    logging.debug(f"Lead {lead_id} da base '{nome_base}' não estava mais pendente; descartado.")
+                    continue
+                pre_reserva = PreReserva(nome_base, lead_id, cliente)
+                if preparar is not None:
+                    pre_reserva.cartao = await preparar(cliente)
+            except asyncio.CancelledError:
+                self._devolver_retirado(nome_base, lead_id)
+                raise
+            except Exception as e:
+                self._devolver_retirado(nome_base, lead_id)
+                logging.error(f"Erro ao pré-reservar um lead para o vendedor {vendedor_id}: {e}")
+                return
+            pre_reserva.expiracao = asyncio.get_running_loop().call_later(
+                self.validade_pre_reserva_s, self._expirar_pre_reserva, vendedor_id, pre_reserva
+            )
+            self._pre_reservas[vendedor_id] = pre_reserva
+            return
+
+    def _expirar_pre_reserva(self, vendedor_id, pre_reserva: PreReserva) -> None:
+        if self._pre_reservas.get(vendedor_id) is not pre_reserva:
+            return
+        del self._pre_reservas[vendedor_id]
+        self._devolver_retirado(pre_reserva.nome_base, pre_reserva.lead_id)
+        self.pre_reservas_expiradas += 1
+        logging.debug(f"Pré-reserva do lead {pre_reserva.lead_id} expirou; de volta à fila.")
+
+    def _devolver_retirado(self, nome_base: str, lead_id) -> None:
+        """Recoloca na fila um id retirado por `_retirar_proximo` e ainda não atribuído."""
+        self._ids_enfileirados.discard(lead_id)
+        self.devolver(nome_base, [lead_id])
+
+    def _retirar_proximo(self):
+        nomes = [nome for nome in self._bases_ativas if self._filas.get(nome)]
+        if not nomes:
+            return None
+        nome_base = nomes[self._proxima_base % len(nomes)]
+        self._proxima_base += 1
+        fila = self._filas[nome_base]
+        lead_id = fila.popleft()
+        if len(fila) < self.nivel_minimo:
+            self._agendar_recarga(nome_base)
+        return nome_base, lead_id
+
+    def _agendar_recarga(self, nome_base: str) -> None:
+        tarefa = self._recargas_pendentes.get(nome_base)
+        if tarefa is None or tarefa.done():
+            self._recargas_pendentes[nome_base] = asyncio.create_task(self._recarregar(nome_base))
+
+    async def _recarregar_vazias(self) -> bool:
+        """Recarrega (aguardando) as filas vazias das bases ativas. Retorna True se alguma recebeu ids."""
+        nomes_bases = await self.bases_ativas()
+        if not nomes_bases:
+            return False
+        vazias = [nome for nome in nomes_bases if not self._filas.get(nome)]
+        resultados = await asyncio.gather(*(self._recarregar(nome) for nome in vazias))
+        return any(resultados) or any(self._filas.get(nome) for nome in nomes_bases)
+
+    async def _recarregar(self, nome_base: str) -> int:
+        trava = self._travas_recarga.setdefault(nome_base, asyncio.Lock())
+        async with trava:
+            fila = self._filas.setdefault(nome_base, deque())
+            if len(fila) >= self.nivel_minimo:
+                return 0
+            try:
+                ids = await self.repositorio.amostrar_ids_pendentes(nome_base, self.tamanho_lote)
+            except Exception as e:
+                logging.error(f"Erro ao recarregar a fila da base '{nome_base}': {e}")
+                return 0
+
+            novos = [lead_id for lead_id in ids if lead_id not in self._ids_enfileirados]
+            random.shuffle(novos)
+            self._ids_enfileirados.update(novos)
+            fila.extend(novos)
+            logging.debug(f"Fila da base '{nome_base}' recarregada com {len(novos)} leads.")
+            return len(novos)
+
+    def _descartar_fila(self, nome_base: str) -> None:
+        fila = self._filas.pop(nome_base, None)
+        if fila:
+            self._ids_enfileirados.difference_update(fila)
@@ -0,0 +1,296 @@
+# services/metricas.py
+import time
+import bisect
+import asyncio
+import logging
+import functools
+import threading
+from collections import defaultdict
+
+from pymongo import monitoring
+from telegram.ext import CallbackQueryHandler, CommandHandler, ConversationHandler, MessageHandler
+
+# Limites (em segundos) dos buckets dos histogramas, no padrão do Prometheus.
+BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JANELA_DIAG_MIN = 60
+
+
+class Histograma:
+    """Histograma cumulativo por combinação de rótulos, com a janela por minuto usada pelo /diag."""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._series = {}
+        # minuto -> {valores dos rótulos: [contagem, soma, máximo, contagens por bucket]}
+        self._por_minuto = {}
+
+    def observar(self, valores: tuple, segundos: float, agora: float = None) -> None:
+        indice = bisect.bisect_left(BUCKETS_S, segundos)
+        serie = self._series.get(valores)
+        if serie is None:
+            serie = self._series[valores] = {"buckets": [0] * (len(BUCKETS_S) + 1), "soma": 0.0, "contagem": 0}
+        serie["buckets"][indice] += 1
+        serie["soma"] += segundos
+        serie["contagem"] += 1
+
+        minuto = int((agora or time.time()) // 60)
+        janela = self._por_minuto.get(minuto)
+        if janela is None:
+            janela = self._por_minuto[minuto] = {}
+            for antigo in [m for m in self._por_minuto if m <= minuto - JANELA_DIAG_MIN]:
+                del self._por_minuto[antigo]
+        item = janela.get(valores)
+        if item is None:
+            item = janela[valores] = [0, 0.0, 0.0, [0] * (len(BUCKETS_S) + 1)]
+        item[0] += 1
+        item[1] += segundos
+        item[2] = max(item[2], segundos)
+        item[3][indice] += 1
+
+    def resumo_janela(self, minutos: int = JANELA_DIAG_MIN, agora: float = None) -> list:
+        """
+        [{"rotulos", "chamadas", "media_s", "p95_s", "max_s"}, ...] dos últimos `minutos`, do maior p95 para o menor.
+        O p95 é o limite superior do bucket onde ele cai (o máximo observado, se passar do último bucket).
+        """
+        desde = int((agora or time.time()) // 60) - minutos
+        juntos = defaultdict(lambda: [0, 0.0, 0.0, [0] * (len(BUCKETS_S) + 1)])
+        for minuto, janela in list(self._por_minuto.items()):
+            if minuto <= desde:
+                continue
+            for valores, (n, soma, maximo, buckets) in list(janela.items()):
+                item = juntos[valores]
+                item[0] += n
+                item[1] += soma
+                item[2] = max(item[2], maximo)
+                item[3] = [a + b for a, b in zip(item[3], buckets)]
+        resumo = []
+        for valores, (n, soma, maximo, buckets) in juntos.items():
+            alvo, acumulado, p95 = 0.95 * n, 0, maximo
+            for limite, contagem in zip(BUCKETS_S, buckets):
+                acumulado += contagem
+                if acumulado >= alvo:
+                    p95 = min(limite, maximo)
+                    break
+            resumo.append({"rotulos": dict(zip(self.rotulos, valores)), "chamadas": n,
+                           "media_s": soma / n, "p95_s": p95, "max_s": maximo})
+        resumo.sort(key=lambda item: (item["p95_s"], item["max_s"]), reverse=True)
+        return resumo
+
+    def texto_prometheus(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for valores, serie in list(self._series.items()):
+            rotulos = _rotulos_prometheus(self.rotulos, valores)
+            acumulado = 0
+            for limite, contagem in zip(BUCKETS_S + (float("inf"),), serie["buckets"]):
+                acumulado += contagem
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                linhas.append(f'{self.nome}_bucket{{{rotulos},le="{le}"}} {acumulado}')
+            linhas.append(f"{self.nome}_sum{{{rotulos}}} {serie['soma']}")
+            linhas.append(f"{self.nome}_count{{{rotulos}}} {serie['contagem']}")
+        return linhas
+
+
+class Contador:
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._valores = defaultdict(float)
+
+    def somar(self, valores: tuple, quantidade: float = 1) -> None:
+        self._valores[valores] += quantidade
+
+    def texto_prometheus(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        for valores, total in list(self._valores.items()):
+            linhas.append(f"{self.nome}{{{_rotulos_prometheus(self.rotulos, valores)}}} {total}")
+        return linhas
+
+
+def _rotulos_prometheus(nomes: tuple, valores: tuple) -> str:
+    def _escapar(valor) -> str:
+        return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores))
+
+
+class Metricas:
+    """
+    Métricas do bot: latência de cada handler (por handler e gatilho: padrão do callback, comando
+    ou mensagem) e de cada comando enviado ao MongoDB (por comando e coleção), com os documentos
+    devolvidos. Os comandos do MongoDB chegam das threads do pymongo, por isso o lock.
+    """
+
+    def __init__(self, limite_lento_ms: float = 1000.0):
+        self.limite_lento_ms = limite_lento_ms
+        self._lock = threading.Lock()
+        self.handlers = Histograma("bot_handler_segundos", "Duração dos handlers do Telegram.", ("handler", "gatilho"))
+        self.erros_handlers = Contador("bot_handler_erros_total", "Handlers que terminaram com exceção.",
+                                       ("handler", "gatilho"))
+        self.mongo = Histograma("bot_mongo_comando_segundos", "Duração dos comandos enviados ao MongoDB.",
+                                ("comando", "colecao"))
+        self.mongo_documentos = Contador("bot_mongo_documentos_retornados_total",
+                                         "Documentos devolvidos pelo MongoDB.", ("comando", "colecao"))
+        self.mongo_falhas = Contador("bot_mongo_comando_falhas_total", "Comandos do MongoDB que falharam.",
+                                     ("comando", "colecao"))
+
+    def registrar_handler(self, handler: str, gatilho: str, segundos: float, erro: bool = False) -> None:
+        with self._lock:
+            self.handlers.observar((handler, gatilho), segundos)
+            if erro:
+                self.erros_handlers.somar((handler, gatilho))
+        if segundos * 1000 > self.limite_lento_ms:
+            logging.warning(f"Handler lento: {handler} ({gatilho}) levou {segundos * 1000:.0f} ms")
+
+    def registrar_mongo(self, comando: str, colecao: str, segundos: float, documentos: int, falhou: bool) -> None:
+        with self._lock:
+            self.mongo.observar((comando, colecao), segundos)
+            if documentos:
+                self.mongo_documentos.somar((comando, colecao), documentos)
+            if falhou:
+                self.mongo_falhas.somar((comando, colecao))
+
+    def handlers_mais_lentos(self, limite: int = 10, minutos: int = JANELA_DIAG_MIN) -> list:
+        with self._lock:
+            return self.handlers.resumo_janela(minutos)[:limite]
+
+    def comandos_mais_lentos(self, limite: int = 5, minutos: int = JANELA_DIAG_MIN) -> list:
+        with self._lock:
+            return self.mongo.resumo_janela(minutos)[:limite]
+
+    def texto_prometheus(self) -> str:
+        with self._lock:
+            linhas = []
+            for metrica in (self.handlers, self.erros_handlers, self.mongo, self.mongo_documentos, self.mongo_falhas):
+                linhas.extend(metrica.texto_prometheus())
+        return "\n".join(linhas) + "\n"
+
+
+class ListenerComandosMongo(monitoring.CommandListener):
+    """CommandListener do pymongo que alimenta Metricas; passe em MongoClient(event_listeners=[...])."""
+
+    def __init__(self, metricas: Metricas):
+        self.metricas = metricas
+        self._colecoes = {}
+
+    @staticmethod
+    def _chave(event) -> tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        colecao = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            colecao = event.command.get("collection")
+        self._colecoes[self._chave(event)] = colecao if isinstance(colecao, str) else ""
+
+    def succeeded(self, event):
+        reply = event.reply
+        cursor = reply.get("cursor")
+        if isinstance(cursor, dict):
+            documentos = len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+        else:
+            documentos = 1 if reply.get("value") is not None else 0
+        self._registrar(event, documentos, False)
+
+    def failed(self, event):
+        self._registrar(event, 0, True)
+
+    def _registrar(self, event, documentos: int, falhou: bool) -> None:
+        colecao = self._colecoes.pop(self._chave(event), "")
+        self.metricas.registrar_mongo(event.command_name, colecao, event.duration_micros / 1e6, documentos, falhou)
+
+
+def _gatilho(handler) -> str:
+    """Rótulo fixo do que dispara o handler (nunca o callback_data em si, que traz ids)."""
+    if isinstance(handler, CallbackQueryHandler):
+        padrao = getattr(handler.pattern, "pattern", handler.pattern)
+        return str(padrao).strip("^$") if padrao is not None else "callback"
+    if isinstance(handler, CommandHandler):
+        return "/" + ",".join(sorted(handler.commands))
+    if isinstance(handler, MessageHandler):
+        return "mensagem"
+    return type(handler).__name__
+
+
+def _medir(metricas: Metricas, callback, gatilho: str):
+    if getattr(callback, "_instrumentado", False):
+        return callback
+    nome = callback.__name__
+
+    @functools.wraps(callback)
+    async def _medido(update, context):
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            return await callback(update, context)
+        except Exception:
+            erro = True
+            raise
+        finally:
+            metricas.registrar_handler(nome, gatilho, time.perf_counter() - inicio, erro)
+
+    _medido._instrumentado = True
+    return _medido
+
+
+def instrumentar_handlers(application, metricas: Metricas) -> None:
+    """
+    Envolve o callback de todos os handlers registrados (inclusive os de dentro das conversações).
+    No roteador de botões (handlers/callbacks.py) cada rota é medida à parte, com a ação como gatilho.
+    """
+    def _visitar(handler) -> None:
+        if isinstance(handler, ConversationHandler):
+            for interno in handler.entry_points + handler.fallbacks:
+                _visitar(interno)
+            for handlers_estado in handler.states.values():
+                for interno in handlers_estado:
+                    _visitar(interno)
+        elif isinstance(getattr(handler, "rotas", None), dict):
+            for acao, callback in handler.rotas.items():
+                handler.rotas[acao] = _medir(metricas, callback, str(acao))
+        else:
+            handler.callback = _medir(metricas, handler.callback, _gatilho(handler))
+
+    for handlers_grupo in application.handlers.values():
+        for handler in handlers_grupo:
+            _visitar(handler)
+
+
+class ServidorMetricas:
+    """Endpoint HTTP mínimo (GET /metrics) no formato texto do Prometheus."""
+
+    def __init__(self, metricas: Metricas, host: str = "127.0.0.1", porta: int = 9464):
+        self.metricas = metricas
+        self.host = host
+        self.porta = porta
+        self._servidor = None
+
+    async def iniciar(self) -> None:
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.porta)
+        logging.info(f"Métricas em http://{self.host}:{self.porta}/metrics")
+
+    async def parar(self) -> None:
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+            self._servidor = None
+
+    async def _atender(self, reader, writer) -> None:
+        try:
+            linha = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            partes = linha.decode("latin-1").split()
+            if len(partes) >= 2 and partes[0] == "GET" and partes[1].split("?")[0] == "/metrics":
+                status, tipo, corpo = "200 OK", "text/plain; version=0.0.4; charset=utf-8", self.metricas.texto_prometheus()
+            else:
+                status, tipo, corpo = "404 Not Found", "text/plain; charset=utf-8", "use /metrics\n"
+            dados = corpo.encode("utf-8")
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {tipo}\r\nContent-Length: {len(dados)}\r\n"
+                         f"Connection: close\r\n\r\n".encode("latin-1") + dados)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
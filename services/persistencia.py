@@ -0,0 +1,136 @@
+# services/persistencia.py
+import asyncio
+import logging
+from pymongo import ReplaceOne, DeleteOne
+from telegram.ext import BasePersistence, PersistenceInput
+
+
+class PersistenciaMongo(BasePersistence):
+    """
+    Persistência do python-telegram-bot no MongoDB para `user_data` e estados de ConversationHandler.
+
+    O Application chama os `update_*` a cada `update_interval` segundos (e no desligamento) só para
+    o que mudou; aqui essas chamadas são acumuladas e gravadas num único `bulk_write` por coleção.
+
+    `bot_data` não é persistido: nele ficam os serviços do bot (repositório, filas, caches),
+    que são recriados no `main()` a cada inicialização.
+    """
+
+    def __init__(self, db, update_interval: float = 10.0):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.colecao_usuarios = db['persistencia_usuarios']
+        self.colecao_conversas = db['persistencia_conversas']
+        self._usuarios_pendentes = {}
+        self._conversas_pendentes = {}
+        self._descarga = None
+        self.gravacoes = 0
+
+    # -------------------------------
+    # Leitura (uma vez, na inicialização)
+    # -------------------------------
+    async def get_user_data(self) -> dict:
+        def _ler():
+            return {doc['_id']: doc.get('dados', {}) for doc in self.colecao_usuarios.find()}
+        return await asyncio.to_thread(_ler)
+
+    async def get_conversations(self, name: str) -> dict:
+        def _ler():
+            return {tuple(doc['chave']): doc['estado'] for doc in self.colecao_conversas.find({"nome": name})}
+        return await asyncio.to_thread(_ler)
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    # -------------------------------
+    # Escrita (acumulada)
+    # -------------------------------
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._usuarios_pendentes[user_id] = data
+        self._agendar_descarga()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._usuarios_pendentes[user_id] = None
+        self._agendar_descarga()
+
+    async def update_conversation(self, name: str, key: tuple, new_state) -> None:
+        self._conversas_pendentes[(name, key)] = new_state
+        self._agendar_descarga()
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        if self._descarga is not None:
+            await self._descarga
+        await self._descarregar()
+
+    def _agendar_descarga(self) -> None:
+        if self._descarga is None or self._descarga.done():
+            self._descarga = asyncio.create_task(self._descarregar())
+
+    async def _descarregar(self) -> None:
+        # Deixa as demais chamadas update_* do mesmo ciclo entrarem no lote.
+        await asyncio.sleep(0)
+        while self._usuarios_pendentes or self._conversas_pendentes:
+            usuarios, self._usuarios_pendentes = self._usuarios_pendentes, {}
+            conversas, self._conversas_pendentes = self._conversas_pendentes, {}
+
+            ops_usuarios = [
+                DeleteOne({"_id": user_id}) if dados is None
+                else ReplaceOne({"_id": user_id}, {"dados": dados}, upsert=True)
+                for user_id, dados in usuarios.items()
+            ]
+            ops_conversas = []
+            for (nome, chave), estado in conversas.items():
+                doc_id = f"{nome}:{':'.join(map(str, chave))}"
+                if estado is None:
+                    ops_conversas.append(DeleteOne({"_id": doc_id}))
+                else:
+                    ops_conversas.append(ReplaceOne(
+                        {"_id": doc_id}, {"nome": nome, "chave": list(chave), "estado": estado}, upsert=True
+                    ))
+
+            try:
+                await asyncio.to_thread(self._gravar, ops_usuarios, ops_conversas)
+                self.gravacoes += 1
+            except Exception as e:
+                logging.error(f"Erro ao gravar a persistência do bot: {e}")
+                # Devolve ao lote o que não foi sobrescrito enquanto isso; tenta de novo no próximo ciclo.
+                for user_id, dados in usuarios.items():
+                    self._usuarios_pendentes.setdefault(user_id, dados)
+                for chave, estado in conversas.items():
+                    self._conversas_pendentes.setdefault(chave, estado)
+                return
+
+    def _gravar(self, ops_usuarios: list, ops_conversas: list) -> None:
+        if ops_usuarios:
+            self.colecao_usuarios.bulk_write(ops_usuarios, ordered=False)
+        if ops_conversas:
+            self.colecao_conversas.bulk_write(ops_conversas, ordered=False)
@@ -0,0 +1,62 @@
+# services/processamento_updates.py
+import asyncio
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class ProcessadorPorUsuario(BaseUpdateProcessor):
+    """
+    Processa updates de usuários diferentes em paralelo, mas os de um mesmo usuário em ordem.
+
+    Cada usuário tem uma trava (asyncio.Lock, que atende em ordem de chegada): o segundo clique de
+    um vendedor só começa depois que o primeiro terminou, então um fluxo como o de /consulta não
+    corre contra si mesmo. Um relatório lento de um usuário não segura os updates dos demais.
+
+    `max_simultaneos` limita quantos updates rodam ao mesmo tempo; `max_pendentes` limita quantos
+    o Application pode ter em andamento (rodando ou esperando a vez do próprio usuário).
+    A trava do usuário é obtida antes da vaga de execução, para que updates enfileirados de um
+    mesmo usuário não ocupem vagas dos outros.
+    """
+
+    def __init__(self, max_simultaneos: int = 64, max_pendentes: int = None):
+        super().__init__(max_pendentes or max_simultaneos * 16)
+        self.max_simultaneos = max_simultaneos
+        self._vagas = None
+        self._travas = {}
+
+    @staticmethod
+    def _chave(update: object):
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user:
+            return ('usuario', update.effective_user.id)
+        if update.effective_chat:
+            return ('chat', update.effective_chat.id)
+        return None
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        chave = self._chave(update)
+        if chave is None:
+            async with self._vagas:
+                await coroutine
+            return
+
+        trava, pendentes = self._travas.get(chave, (None, 0))
+        if trava is None:
+            trava = asyncio.Lock()
+        self._travas[chave] = (trava, pendentes + 1)
+        try:
+            async with trava, self._vagas:
+                await coroutine
+        finally:
+            trava, pendentes = self._travas[chave]
+            if pendentes <= 1:
+                del self._travas[chave]
+            else:
+                self._travas[chave] = (trava, pendentes - 1)
+
+    async def initialize(self) -> None:
+        self._vagas = asyncio.Semaphore(self.max_simultaneos)
+
+    async def shutdown(self) -> None:
+        self._travas.clear()
@@ -0,0 +1,42 @@
+# services/reconciliacao_contadores.py
+import time
+import logging
+from datetime import datetime, UTC
+
+from database.rollups import TZ_SAO_PAULO
+
+
+class ReconciliadorContadores:
+    """
+    Job que corrige periodicamente os contadores do painel do admin (coleção `contadores`)
+    contra a contagem real em `clientes`: bases ativas e finalizações do dia corrente.
+
+    Os contadores são mantidos com $inc a cada atribuição, finalização, reabertura e
+    expiração; a reconciliação só cobre o que escapar disso (importações, scripts
+    manuais, uma escrita que falhou no meio).
+    """
+
+    def __init__(self, repositorio):
+        self.repositorio = repositorio
+        self.execucoes = 0
+        self.corrigidos_total = 0
+        self.ultima_execucao = None
+
+    async def executar(self, context=None) -> int:
+        """Uma reconciliação; pode ser usada direto como callback do JobQueue."""
+        inicio = time.perf_counter()
+        hoje = datetime.now(TZ_SAO_PAULO).date()
+        corrigidos = await self.repositorio.reconciliar_contadores(
+            TZ_SAO_PAULO.localize(datetime.combine(hoje, datetime.min.time())).astimezone(UTC),
+            TZ_SAO_PAULO.localize(datetime.combine(hoje, datetime.max.time())).astimezone(UTC),
+        )
+
+        self.execucoes += 1
+        self.corrigidos_total += corrigidos
+        self.ultima_execucao = datetime.now(UTC)
+        if corrigidos:
+            logging.warning(f"Reconciliação: {corrigidos} contador(es) do painel estavam divergentes e foram corrigidos "
+                            f"({time.perf_counter() - inicio:.2f}s).")
+        else:
+            logging.debug(f"Reconciliação: contadores em dia ({time.perf_counter() - inicio:.2f}s).")
+        return corrigidos
@@ -0,0 +1,62 @@
+# services/templates_mensagem.py
+import re
+import asyncio
+from urllib.parse import quote
+
+_PLACEHOLDER = re.compile(r"\{\{(cliente|vendedor)\}\}")
+
+
+class TemplateCompilado:
+    """
+    Template de WhatsApp já quebrado em trechos fixos (URL-encoded uma única vez)
+    e nos slots {{cliente}}/{{vendedor}}. Renderizar é só um join.
+    """
+    __slots__ = ("nome", "trechos", "slots")
+
+    def __init__(self, nome: str, texto: str):
+        self.nome = nome
+        self.trechos = []
+        self.slots = []
+        posicao = 0
+        for encontrado in _PLACEHOLDER.finditer(texto):
+            self.trechos.append(quote(texto[posicao:encontrado.start()]))
+            self.slots.append(encontrado.group(1))
+            posicao = encontrado.end()
+        self.trechos.append(quote(texto[posicao:]))
+
+    def renderizar(self, **valores) -> str:
+        """Retorna o texto já codificado para o parâmetro `text` do wa.me."""
+        partes = [self.trechos[0]]
+        for slot, trecho in zip(self.slots, self.trechos[1:]):
+            partes.append(quote(valores.get(slot, "")))
+            partes.append(trecho)
+        return "".join(partes)
+
+
+class CacheTemplates:
+    """
+    Templates ativos compilados em memória. Quem altera a coleção de mensagens
+    chama `invalidar()`, que avança o carimbo de versão; a próxima leitura recarrega.
+    """
+
+    def __init__(self, repositorio):
+        self.repositorio = repositorio
+        self.versao = 0
+        self._versao_carregada = None
+        self._templates = ()
+        self._trava = asyncio.Lock()
+
+    def invalidar(self) -> None:
+        self.versao += 1
+
+    async def obter(self) -> tuple:
+        if self._versao_carregada != self.versao:
+            async with self._trava:
+                if self._versao_carregada != self.versao:
+                    versao = self.versao
+                    mensagens = await self.repositorio.listar_mensagens(somente_ativas=True)
+                    self._templates = tuple(
+                        TemplateCompilado(msg.get('nome_template', ''), msg['texto']) for msg in mensagens
+                    )
+                    self._versao_carregada = versao
+        return self._templates
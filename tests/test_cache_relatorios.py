@@ -0,0 +1,125 @@
+# tests/test_cache_relatorios.py
+import asyncio
+import time
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from bson.objectid import ObjectId
+
+from services.cache_relatorios import CacheRelatorios, escopo_vendedores
+
+ONTEM = (datetime.now(UTC) - timedelta(days=2), datetime.now(UTC) - timedelta(days=1))
+HOJE = (datetime.now(UTC) - timedelta(hours=1), datetime.now(UTC) + timedelta(days=1))
+
+
+class Calculo:
+    def __init__(self, atraso: float = 0):
+        self.chamadas = 0
+        self.atraso = atraso
+
+    async def __call__(self):
+        self.chamadas += 1
+        await asyncio.sleep(self.atraso)
+        return {"chamada": self.chamadas}
+
+
+def test_pedidos_simultaneos_calculam_uma_vez():
+    cache, calculo = CacheRelatorios(), Calculo(atraso=0.01)
+
+    async def cenario():
+        return await asyncio.gather(*(cache.obter("geral", None, *HOJE, calculo) for _ in range(5)))
+
+    resultados = asyncio.run(cenario())
+    assert calculo.chamadas == 1
+    assert resultados == [{"chamada": 1}] * 5
+    assert (cache.falhas, cache.acertos) == (1, 4)
+    assert not cache._em_andamento
+
+
+def test_periodo_encerrado_fica_ate_a_meia_noite():
+    cache, calculo = CacheRelatorios(ttl_aberto_s=0), Calculo()
+
+    async def cenario():
+        await cache.obter("geral", None, *ONTEM, calculo)
+        await cache.obter("geral", None, *ONTEM, calculo)
+
+    asyncio.run(cenario())
+    assert calculo.chamadas == 1
+    valido_ate, _ = next(iter(cache._itens.values()))
+    assert time.time() < valido_ate <= time.time() + 24 * 3600
+
+
+def test_periodo_aberto_expira_no_ttl():
+    cache, calculo = CacheRelatorios(ttl_aberto_s=60), Calculo()
+
+    async def cenario():
+        await cache.obter("geral", None, *HOJE, calculo)
+        await cache.obter("geral", None, *HOJE, calculo)
+        chave = cache.chave("geral", None, *HOJE)
+        cache._itens[chave] = (time.time() - 1, cache._itens[chave][1])
+        return await cache.obter("geral", None, *HOJE, calculo)
+
+    assert asyncio.run(cenario()) == {"chamada": 2}
+    assert calculo.chamadas == 2
+
+
+def test_escopos_diferentes_nao_se_misturam():
+    cache, calculo = CacheRelatorios(), Calculo()
+
+    async def cenario():
+        return [await cache.obter("equipe", escopo, *ONTEM, calculo) for escopo in ("a", "b", "a")]
+
+    assert asyncio.run(cenario()) == [{"chamada": 1}, {"chamada": 2}, {"chamada": 1}]
+
+
+def test_descarta_o_menos_usado_acima_da_capacidade():
+    cache, calculo = CacheRelatorios(capacidade=2), Calculo()
+
+    async def cenario():
+        for tipo in ("a", "b", "a", "c", "a", "b"):
+            await cache.obter(tipo, None, *ONTEM, calculo)
+
+    asyncio.run(cenario())
+    # "b" saiu quando "c" entrou ("a" tinha acabado de ser usado) e foi recalculado no fim.
+    assert calculo.chamadas == 4
+    assert cache.descartes == 2
+    assert cache.estatisticas()["itens"] == 2
+
+
+def test_erro_no_calculo_nao_fica_em_cache():
+    cache = CacheRelatorios()
+    tentativas = []
+
+    async def falha():
+        tentativas.append(1)
+        raise RuntimeError("banco fora")
+
+    async def cenario():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await cache.obter("geral", None, *ONTEM, falha)
+
+    asyncio.run(cenario())
+    assert len(tentativas) == 2
+    assert not cache._itens and not cache._em_andamento
+
+
+def test_escopo_muda_com_a_equipe():
+    supervisor, a, b, c = ObjectId(), ObjectId(), ObjectId(), ObjectId()
+    escopo = escopo_vendedores(f"equipe:{supervisor}", [a, b])
+    assert escopo.startswith(f"equipe:{supervisor}:")
+    assert escopo_vendedores(f"equipe:{supervisor}", [b, a]) == escopo
+    assert escopo_vendedores(f"equipe:{supervisor}", [a, b, c]) != escopo
+    assert escopo_vendedores(f"equipe:{supervisor}", [a]) != escopo
+    assert escopo_vendedores(f"equipe:{ObjectId()}", [a, b]) != escopo
+
+
+def test_vendedor_novo_na_equipe_nao_recebe_o_relatorio_antigo():
+    cache, calculo = CacheRelatorios(), Calculo()
+    supervisor, a, b = ObjectId(), ObjectId(), ObjectId()
+
+    async def cenario():
+        return [await cache.obter("desempenho", escopo_vendedores(f"equipe:{supervisor}", equipe), *ONTEM, calculo)
+                for equipe in ([a], [a], [a, b])]
+
+    assert asyncio.run(cenario()) == [{"chamada": 1}, {"chamada": 1}, {"chamada": 2}]
@@ -0,0 +1,101 @@
+# tests/test_callbacks.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson.objectid import ObjectId
+
+from handlers import callbacks
+from handlers.callbacks import Acao, TabelaPrefixos, LIMITE_CALLBACK_DATA
+
+# Ações só dos testes (ids que o bot não usa).
+TESTE_DATA = Acao("tdt", "teste_data", datetime)
+TESTE_INT = Acao("tint", "teste_int", int, int)
+TESTE_LIMITE = Acao("tlim", "teste_limite", str)
+
+
+def test_ida_e_volta_com_todos_os_tipos():
+    oid = ObjectId()
+    data = datetime(2025, 3, 12, 14, 30, 5, 123000)
+    dados = callbacks.HISTORICO_PAGINA.codificar("ant", oid, data, oid, 1234)
+    assert callbacks.decodificar(dados) == (callbacks.HISTORICO_PAGINA, ["ant", oid, data, oid, 1234])
+
+    dados = callbacks.ADMIN_ATIVAR_BASE.codificar(oid, False)
+    assert callbacks.decodificar(dados) == (callbacks.ADMIN_ATIVAR_BASE, [oid, False])
+
+
+def test_objectid_none_vira_texto_vazio():
+    dados = callbacks.NOVO_SUPERVISOR.codificar(None)
+    assert dados == "ns|"
+    assert callbacks.decodificar(dados) == (callbacks.NOVO_SUPERVISOR, [None])
+
+
+def test_data_volta_em_utc_sem_fuso_truncada_em_milissegundos():
+    com_fuso = datetime(2025, 3, 12, 11, 30, 5, 123456, tzinfo=timezone(timedelta(hours=-3)))
+    _, (data,) = callbacks.decodificar(TESTE_DATA.codificar(com_fuso))
+    assert data == datetime(2025, 3, 12, 14, 30, 5, 123000)
+    assert data.tzinfo is None
+
+
+def test_inteiros_negativos_e_zero():
+    assert callbacks.decodificar(TESTE_INT.codificar(0, -71))[1] == [0, -71]
+
+
+def test_maior_callback_do_historico_cabe_no_limite():
+    dados = callbacks.HISTORICO_PAGINA.codificar("ant", ObjectId(), datetime(2099, 12, 31), ObjectId(), 10 ** 6)
+    assert len(dados.encode()) <= LIMITE_CALLBACK_DATA
+
+
+def test_codificar_recusa_mais_de_64_bytes():
+    TESTE_LIMITE.codificar("x" * (LIMITE_CALLBACK_DATA - len("tlim|")))
+    with pytest.raises(ValueError):
+        TESTE_LIMITE.codificar("x" * (LIMITE_CALLBACK_DATA - len("tlim|") + 1))
+    # Limite é em bytes, não em caracteres.
+    with pytest.raises(ValueError):
+        TESTE_LIMITE.codificar("ç" * 30)
+
+
+def test_codificar_confere_argumentos():
+    with pytest.raises(TypeError):
+        callbacks.CONSULTA.codificar()
+    with pytest.raises(ValueError):
+        callbacks.STATUS.codificar("a|b")
+
+
+@pytest.mark.parametrize("dados", [
+    "zz|1",             # ação desconhecida
+    "c|nao-e-oid!",     # ObjectId inválido
+    "c",                # faltam argumentos
+    "c|AAAAAAAAAAAAAAAA|x",  # argumentos demais
+    "ama|AAAAAAAAAAAAAAAA|2",  # bool inválido
+    "a|extra",          # ação sem argumentos recebendo um
+])
+def test_callback_data_invalido(dados):
+    assert callbacks.decodificar(dados) == (None, None)
+
+
+def test_acao_serve_de_pattern():
+    assert callbacks.ADMIN_PAINEL("a")
+    assert not callbacks.ADMIN_PAINEL("ab")
+    assert callbacks.ADMIN_BASES("ab")
+    assert not callbacks.ADMIN_PAINEL(None)
+
+
+def test_tabela_prefixos_acha_o_id_exato():
+    tabela = TabelaPrefixos()
+    for chave in ("a", "ae", "aeg"):
+        tabela.inserir(chave, chave.upper())
+    assert tabela.buscar("a") == ("A", None)
+    assert tabela.buscar("ae|1|2") == ("AE", "1|2")
+    assert tabela.buscar("aeg|") == ("AEG", "")
+    assert tabela.buscar("aex|1") == (None, None)
+    assert tabela.buscar("b") == (None, None)
+    assert tabela.buscar("") == (None, None)
+
+
+def test_tabela_prefixos_recusa_duplicada():
+    tabela = TabelaPrefixos()
+    tabela.inserir("x", 1)
+    with pytest.raises(ValueError):
+        tabela.inserir("x", 2)
+    with pytest.raises(ValueError):
+        Acao("a", "duplicada")
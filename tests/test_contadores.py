@@ -0,0 +1,163 @@
+# tests/test_contadores.py
+import asyncio
+from datetime import datetime, time, UTC
+
+import pytest
+from bson.objectid import ObjectId
+
+from database.contadores import (
+    CAMPOS_STATUS, chave_base, contador_base_zerado, pipeline_contagem_bases, pipeline_contagem_dia
+)
+from database.repositorio import Repositorio
+from database.rollups import TZ_SAO_PAULO, dia_local
+
+mongomock = pytest.importorskip("mongomock")
+
+VENDEDOR = ObjectId()
+
+
+@pytest.fixture
+def repositorio():
+    db = mongomock.MongoClient()['bot_vendas']
+    db.bases.insert_one({"_id": ObjectId(), "nome_base": "B", "ativa": True})
+    db.clientes.insert_many([{"_id": ObjectId(), "nome_base": "B", "status": "Pendente"} for _ in range(5)])
+    # Ponto de partida: contadores batendo com `clientes`, como após a primeira reconciliação.
+    db.contadores.insert_one({**chave_base("B"), **contador_base_zerado("B", True), "pendentes": 5})
+    repositorio = Repositorio(db)
+    yield repositorio
+    repositorio.fechar()
+
+
+def _painel(repositorio) -> dict:
+    return asyncio.run(repositorio.painel_contadores(dia_local(datetime.now(UTC))))
+
+
+def _ids(repositorio) -> list:
+    return [cliente['_id'] for cliente in repositorio.clientes.find({}, {"_id": 1})]
+
+
+def _finalizar(repositorio, cliente_id, status_final: str):
+    campos = {"status_final": status_final, "data_finalizacao": datetime.now(UTC)}
+    return asyncio.run(repositorio.finalizar_cliente(cliente_id, campos, vendedor_id=VENDEDOR))
+
+
+def test_finalizar_incrementa_o_contador_do_dia(repositorio):
+    cliente_id = _ids(repositorio)[0]
+    asyncio.run(repositorio.atribuir_cliente(cliente_id, VENDEDOR, datetime.now(UTC)))
+    assert _finalizar(repositorio, cliente_id, "Venda") is not None
+
+    dia = dia_local(datetime.now(UTC))
+    assert repositorio.contadores.find_one({"_id": f"dia:{dia}:Venda"})['total'] == 1
+    assert _painel(repositorio) == {"pendentes": 4, "por_status": [{"_id": "Venda", "count": 1}]}
+
+
+def _base(repositorio) -> dict:
+    contador = repositorio.contadores.find_one(chave_base("B"))
+    return {campo: contador[campo] for campo in CAMPOS_STATUS.values()}
+
+
+def _contagem_real(repositorio) -> dict:
+    """O que a reconciliação calcularia: contadores da base e do dia a partir de `clientes`."""
+    base = dict.fromkeys(CAMPOS_STATUS.values(), 0)
+    for item in repositorio.clientes.aggregate(pipeline_contagem_bases(["B"])):
+        base[CAMPOS_STATUS[item['_id']['status']]] = item['total']
+    hoje = datetime.now(TZ_SAO_PAULO).date()
+    inicio, fim = (TZ_SAO_PAULO.localize(datetime.combine(hoje, limite)).astimezone(UTC)
+                   for limite in (time.min, time.max))
+    por_dia = {item['_id']: item['total']
+               for item in repositorio.clientes.aggregate(pipeline_contagem_dia(inicio, fim))}
+    return {"base": base, "dia": por_dia}
+
+
+def _contagem_incremental(repositorio) -> dict:
+    dia = dia_local(datetime.now(UTC))
+    por_dia = {doc['status_final']: doc['total'] for doc in repositorio.contadores.find({"tipo": "dia", "dia": dia})
+               if doc['total']}
+    return {"base": _base(repositorio), "dia": por_dia}
+
+
+def test_atribuir_e_liberar(repositorio):
+    cliente_id = _ids(repositorio)[0]
+    asyncio.run(repositorio.atribuir_cliente(cliente_id, VENDEDOR, datetime.now(UTC)))
+    assert _base(repositorio) == {"pendentes": 4, "em_atendimento": 1, "concluidos": 0}
+    assert _painel(repositorio)['pendentes'] == 4
+
+    assert asyncio.run(repositorio.liberar_cliente(cliente_id, VENDEDOR))
+    assert _base(repositorio) == {"pendentes": 5, "em_atendimento": 0, "concluidos": 0}
+    # Liberar de novo não mexe no contador.
+    assert not asyncio.run(repositorio.liberar_cliente(cliente_id, VENDEDOR))
+    assert _painel(repositorio) == {"pendentes": 5, "por_status": []}
+
+
+def test_atribuir_cliente_ja_atribuido_nao_conta(repositorio):
+    cliente_id = _ids(repositorio)[0]
+    asyncio.run(repositorio.atribuir_cliente(cliente_id, VENDEDOR, datetime.now(UTC)))
+    assert asyncio.run(repositorio.atribuir_cliente(cliente_id, ObjectId(), datetime.now(UTC))) is None
+    assert _base(repositorio) == {"pendentes": 4, "em_atendimento": 1, "concluidos": 0}
+
+
+def test_liberar_expirados(repositorio):
+    ids = _ids(repositorio)
+    for cliente_id in ids[:3]:
+        asyncio.run(repositorio.atribuir_cliente(cliente_id, VENDEDOR, datetime(2025, 1, 1, tzinfo=UTC)))
+    asyncio.run(repositorio.atribuir_cliente(ids[3], VENDEDOR, datetime.now(UTC)))
+
+    corte = datetime(2025, 6, 1, tzinfo=UTC)
+    resultado = asyncio.run(repositorio.liberar_atendimentos_expirados(corte, tamanho_lote=2))
+    assert resultado['liberados'] == 3
+    assert _base(repositorio) == {"pendentes": 4, "em_atendimento": 1, "concluidos": 0}
+    assert _painel(repositorio)['pendentes'] == 4
+
+
+def test_refinalizar_troca_o_status_sem_contar_duas_vezes(repositorio):
+    cliente_id = _ids(repositorio)[0]
+    asyncio.run(repositorio.atribuir_cliente(cliente_id, VENDEDOR, datetime.now(UTC)))
+    _finalizar(repositorio, cliente_id, "Venda")
+    assert _finalizar(repositorio, cliente_id, "Sem interesse") is not None
+
+    assert _base(repositorio) == {"pendentes": 4, "em_atendimento": 0, "concluidos": 1}
+    assert _painel(repositorio) == {"pendentes": 4, "por_status": [{"_id": "Sem interesse", "count": 1}]}
+
+
+def test_finalizar_de_outro_vendedor_nao_conta(repositorio):
+    cliente_id = _ids(repositorio)[0]
+    asyncio.run(repositorio.atribuir_cliente(cliente_id, ObjectId(), datetime.now(UTC)))
+    assert _finalizar(repositorio, cliente_id, "Venda") is None
+    assert _base(repositorio) == {"pendentes": 4, "em_atendimento": 1, "concluidos": 0}
+    assert _painel(repositorio)['por_status'] == []
+
+
+def test_reabrir_desconta_a_finalizacao(repositorio):
+    cliente_id = _ids(repositorio)[0]
+    asyncio.run(repositorio.atribuir_cliente(cliente_id, VENDEDOR, datetime.now(UTC)))
+    _finalizar(repositorio, cliente_id, "Venda")
+
+    asyncio.run(repositorio.reabrir_cliente(cliente_id, VENDEDOR))
+    assert _base(repositorio) == {"pendentes": 4, "em_atendimento": 1, "concluidos": 0}
+    assert _painel(repositorio) == {"pendentes": 4, "por_status": []}
+
+
+def test_desativar_base_tira_do_painel(repositorio):
+    base_id = repositorio.bases.find_one({"nome_base": "B"})['_id']
+    asyncio.run(repositorio.definir_base_ativa(base_id, False))
+    assert _painel(repositorio)['pendentes'] == 0
+
+    asyncio.run(repositorio.definir_base_ativa(base_id, True))
+    assert _painel(repositorio)['pendentes'] == 5
+
+
+def test_contadores_incrementais_batem_com_a_contagem_real(repositorio):
+    ids = _ids(repositorio)
+    for cliente_id in ids[:4]:
+        asyncio.run(repositorio.atribuir_cliente(cliente_id, VENDEDOR, datetime.now(UTC)))
+    _finalizar(repositorio, ids[0], "Venda")
+    _finalizar(repositorio, ids[1], "Venda")
+    _finalizar(repositorio, ids[2], "Sem interesse")
+    _finalizar(repositorio, ids[1], "Retornar")
+    asyncio.run(repositorio.reabrir_cliente(ids[2], VENDEDOR))
+    asyncio.run(repositorio.liberar_cliente(ids[3], VENDEDOR))
+
+    assert _contagem_incremental(repositorio) == _contagem_real(repositorio) == {
+        "base": {"pendentes": 2, "em_atendimento": 1, "concluidos": 2},
+        "dia": {"Venda": 1, "Retornar": 1},
+    }
@@ -0,0 +1,42 @@
+# tests/test_exportacao.py
+import io
+import os
+import zipfile
+
+from services.exportacao import preparar_envio
+
+LIMITE = 4096
+
+
+def _conteudo(partes: list) -> bytes:
+    return b"".join(arquivo.read() for arquivo, _ in partes)
+
+
+def test_arquivo_pequeno_vai_como_esta():
+    arquivo = io.BytesIO(b"a" * LIMITE)
+    arquivo.seek(10)
+    partes = preparar_envio(arquivo, "relatorio.csv", limite=LIMITE)
+    assert [(a, nome) for a, nome in partes] == [(arquivo, "relatorio.csv")]
+    assert arquivo.tell() == 0
+
+
+def test_arquivo_grande_compactavel_vira_zip():
+    original = b"nome;telefone\n" * 2000
+    arquivo = io.BytesIO(original)
+    partes = preparar_envio(arquivo, "relatorio.csv", limite=LIMITE)
+
+    assert arquivo.closed
+    assert [nome for _, nome in partes] == ["relatorio.csv.zip"]
+    with zipfile.ZipFile(io.BytesIO(_conteudo(partes))) as zip_:
+        assert zip_.read("relatorio.csv") == original
+
+
+def test_zip_acima_do_limite_sai_em_partes():
+    original = os.urandom(3 * LIMITE)
+    partes = preparar_envio(io.BytesIO(original), "relatorio.xlsx", limite=LIMITE)
+
+    assert [nome for _, nome in partes] == [f"relatorio.xlsx.zip.{i:03d}" for i in range(1, len(partes) + 1)]
+    blocos = [arquivo.read() for arquivo, _ in partes]
+    assert all(len(bloco) <= LIMITE for bloco in blocos)
+    with zipfile.ZipFile(io.BytesIO(b"".join(blocos))) as zip_:
+        assert zip_.read("relatorio.xlsx") == original
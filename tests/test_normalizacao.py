@@ -0,0 +1,58 @@
+# tests/test_normalizacao.py
+import pytest
+
+from database.normalizacao import (
+    somente_digitos, telefone_nacional, variantes_telefone, campos_telefone, normalizar_cpf
+)
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    (None, ""),
+    ("(11) 99999-0001", "11999990001"),
+    (11999990001.0, "11999990001"),
+    (123, "123"),
+])
+def test_somente_digitos(valor, esperado):
+    assert somente_digitos(valor) == esperado
+
+
+@pytest.mark.parametrize("telefone, esperado", [
+    ("+55 (11) 99999-0001", "11999990001"),
+    ("011 99999-0001", "11999990001"),
+    ("551133334444", "1133334444"),
+    ("99990001", "99990001"),
+    ("", ""),
+])
+def test_telefone_nacional(telefone, esperado):
+    assert telefone_nacional(telefone) == esperado
+
+
+def test_variantes_de_celular():
+    assert variantes_telefone("5511999990001") == ["5511999990001", "11999990001", "999990001", "99990001"]
+
+
+def test_variantes_de_fixo():
+    assert variantes_telefone("(11) 3333-4444") == ["551133334444", "1133334444", "33334444"]
+
+
+def test_variantes_sem_ddd_e_vazio():
+    assert variantes_telefone("3333-4444") == ["33334444"]
+    assert variantes_telefone(None) == []
+
+
+def test_campos_telefone():
+    assert campos_telefone("+55 11 99999-0001") == {
+        "telefone_normalizado": ["5511999990001", "11999990001", "999990001", "99990001"],
+        "telefone_reverso": "10009999911",
+    }
+
+
+@pytest.mark.parametrize("cpf, esperado", [
+    ("012.345.678-90", "01234567890"),
+    (1234567890, "01234567890"),
+    (1234567890.0, "01234567890"),
+    ("12.345.678/0001-90", "12345678000190"),
+    (None, ""),
+])
+def test_normalizar_cpf(cpf, esperado):
+    assert normalizar_cpf(cpf) == esperado
@@ -0,0 +1,139 @@
+# tests/test_paginacao.py
+import operator
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from bson.objectid import ObjectId
+
+from database.repositorio import Repositorio, _filtro_keyset, _chave_historico
+
+_OPERADORES = {"$lt": operator.lt, "$lte": operator.le, "$gt": operator.gt, "$gte": operator.ge}
+
+
+def _casa(documento: dict, filtro: dict) -> bool:
+    """Avalia o subconjunto de filtros do MongoDB usado pela paginação ($and, $or, comparações e igualdade)."""
+    for campo, condicao in filtro.items():
+        if campo == "$and":
+            if not all(_casa(documento, item) for item in condicao):
+                return False
+        elif campo == "$or":
+            if not any(_casa(documento, item) for item in condicao):
+                return False
+        elif isinstance(condicao, dict):
+            if not all(_OPERADORES[op](documento[campo], valor) for op, valor in condicao.items()):
+                return False
+        elif documento.get(campo) != condicao:
+            return False
+    return True
+
+
+class ColecaoMemoria:
+    """Coleção em memória com find().sort().limit(), suficiente para Repositorio._pagina."""
+
+    def __init__(self, documentos: list):
+        self.documentos = documentos
+        self.consultas = []
+
+    def find(self, filtro: dict, projecao=None):
+        self.consultas.append(filtro)
+        return _Cursor([d for d in self.documentos if _casa(d, filtro)])
+
+
+class _Cursor:
+    def __init__(self, documentos: list):
+        self.documentos = documentos
+
+    def sort(self, chaves: list):
+        for campo, direcao in reversed(chaves):
+            self.documentos.sort(key=lambda d: d[campo], reverse=direcao == -1)
+        return self
+
+    def limit(self, limite: int):
+        self.documentos = self.documentos[:limite]
+        return self
+
+    def __iter__(self):
+        return iter(self.documentos)
+
+
+@pytest.fixture
+def finalizados():
+    # 23 clientes com datas repetidas de 3 em 3: o _id desempata.
+    base = datetime(2025, 3, 12, 12, 0)
+    return [{"_id": ObjectId(), "data_finalizacao": base - timedelta(minutes=i // 3), "vendedor_atribuido": 1}
+            for i in range(23)]
+
+
+def _pagina(colecao, **kwargs):
+    return Repositorio._pagina(SimpleNamespace(clientes=colecao), {"vendedor_atribuido": 1},
+                               ["data_finalizacao", "_id"], 10, **kwargs)
+
+
+def _chave(cliente: dict) -> tuple:
+    return cliente["data_finalizacao"], cliente["_id"]
+
+
+def test_filtro_keyset_de_um_campo():
+    oid = ObjectId()
+    assert _filtro_keyset(["_id"], (oid,), "$lt") == {"_id": {"$lt": oid}}
+
+
+def test_filtro_keyset_composto_limita_o_primeiro_campo():
+    data, oid = datetime(2025, 1, 1), ObjectId()
+    assert _filtro_keyset(["data_finalizacao", "_id"], (data, oid), "$gt") == {"$and": [
+        {"data_finalizacao": {"$gte": data}},
+        {"$or": [{"data_finalizacao": {"$gt": data}}, {"data_finalizacao": data, "_id": {"$gt": oid}}]},
+    ]}
+
+
+def test_pagina_percorre_tudo_sem_repetir_nem_pular(finalizados):
+    colecao = ColecaoMemoria(finalizados)
+    esperado = sorted(finalizados, key=_chave, reverse=True)
+
+    paginas, apos = [], None
+    while True:
+        itens, ha_anterior, ha_proxima = _pagina(colecao, apos=apos)
+        paginas.append(itens)
+        assert ha_anterior == (apos is not None)
+        if not ha_proxima:
+            break
+        apos = _chave(itens[-1])
+
+    assert [len(p) for p in paginas] == [10, 10, 3]
+    assert [c["_id"] for p in paginas for c in p] == [c["_id"] for c in esperado]
+
+
+def test_pagina_anterior_refaz_a_pagina_vista(finalizados):
+    colecao = ColecaoMemoria(finalizados)
+    primeira, _, _ = _pagina(colecao)
+    segunda, _, _ = _pagina(colecao, apos=_chave(primeira[-1]))
+    terceira, _, _ = _pagina(colecao, apos=_chave(segunda[-1]))
+
+    itens, ha_anterior, ha_proxima = _pagina(colecao, antes=_chave(terceira[0]))
+    assert itens == segunda
+    assert (ha_anterior, ha_proxima) == (True, True)
+
+    itens, ha_anterior, ha_proxima = _pagina(colecao, antes=_chave(segunda[0]))
+    assert itens == primeira
+    assert (ha_anterior, ha_proxima) == (False, True)
+
+
+def test_pagina_vazia():
+    assert _pagina(ColecaoMemoria([])) == ([], False, False)
+
+
+def test_chave_historico_ignora_fuso_e_microssegundos():
+    origem = ObjectId()
+    sem_fuso = _chave_historico(datetime(2025, 3, 12, 14, 0, 0, 999999), origem, 2)
+    com_fuso = _chave_historico(datetime(2025, 3, 12, 11, 0, 0, 999000, tzinfo=timezone(timedelta(hours=-3))),
+                                origem, 2)
+    assert sem_fuso == com_fuso == (datetime(2025, 3, 12, 14, 0, 0, 999000), origem, 2)
+
+
+def test_chave_historico_desempata_pelo_bucket_e_pela_posicao():
+    data = datetime(2025, 3, 12)
+    primeiro, segundo = ObjectId(), ObjectId()
+    chaves = [_chave_historico(data, segundo, 0), _chave_historico(data, primeiro, 1),
+              _chave_historico(data, primeiro, 0)]
+    assert sorted(chaves) == [(data, primeiro, 0), (data, primeiro, 1), (data, segundo, 0)]
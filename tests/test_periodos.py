@@ -0,0 +1,55 @@
+# tests/test_periodos.py
+from datetime import date, datetime, time
+
+import pytest
+
+from handlers.relatorios_handlers import intervalo_do_periodo, MAX_DIAS_PERIODO
+
+# Quarta-feira
+HOJE = date(2025, 3, 12)
+
+
+def _dias(intervalo: dict) -> tuple:
+    return intervalo["start"].date(), intervalo["end"].date()
+
+
+@pytest.mark.parametrize("periodo, inicio, fim", [
+    ("hoje", date(2025, 3, 12), date(2025, 3, 12)),
+    ("ontem", date(2025, 3, 11), date(2025, 3, 11)),
+    ("semana_atual", date(2025, 3, 10), date(2025, 3, 16)),
+    ("semana_passada", date(2025, 3, 3), date(2025, 3, 9)),
+    ("mes_atual", date(2025, 3, 1), date(2025, 3, 31)),
+    ("mes_passado", date(2025, 2, 1), date(2025, 2, 28)),
+    ("ultimos_7_dias", date(2025, 3, 6), date(2025, 3, 12)),
+    ("7_dias_anteriores", date(2025, 2, 27), date(2025, 3, 5)),
+    ("ultimos_1_dias", date(2025, 3, 12), date(2025, 3, 12)),
+])
+def test_periodos_nomeados(periodo, inicio, fim):
+    assert _dias(intervalo_do_periodo(periodo, HOJE)) == (inicio, fim)
+
+
+def test_intervalo_cobre_o_dia_inteiro_em_sao_paulo():
+    intervalo = intervalo_do_periodo("hoje", HOJE)
+    assert intervalo["start"].time() == time.min
+    assert intervalo["end"].time() == time.max
+    assert intervalo["start"].tzinfo.zone == "America/Sao_Paulo"
+    assert intervalo["start"].utcoffset() == intervalo["end"].utcoffset() == datetime.fromisoformat(
+        "2025-03-12T00:00-03:00").utcoffset()
+
+
+def test_virada_de_ano():
+    assert _dias(intervalo_do_periodo("mes_passado", date(2025, 1, 15))) == (date(2024, 12, 1), date(2024, 12, 31))
+    assert _dias(intervalo_do_periodo("semana_atual", date(2025, 1, 1))) == (date(2024, 12, 30), date(2025, 1, 5))
+    assert _dias(intervalo_do_periodo("mes_atual", date(2024, 12, 31))) == (date(2024, 12, 1), date(2024, 12, 31))
+
+
+def test_limite_de_dias():
+    assert intervalo_do_periodo(f"ultimos_{MAX_DIAS_PERIODO}_dias", HOJE) is not None
+    assert intervalo_do_periodo(f"ultimos_{MAX_DIAS_PERIODO + 1}_dias", HOJE) is None
+    assert intervalo_do_periodo(f"{MAX_DIAS_PERIODO + 1}_dias_anteriores", HOJE) is None
+
+
+@pytest.mark.parametrize("periodo", ["", "amanha", "ultimos_0_dias", "ultimos_x_dias", "ultimos_-3_dias",
+                                     "0_dias_anteriores", "ultimos_7", "7_dias"])
+def test_periodo_invalido(periodo):
+    assert intervalo_do_periodo(periodo, HOJE) is None